@@ -0,0 +1,209 @@
+"""
+End-to-end chapter download benchmark against the local fake site.
+
+For every engine, worker count and parse-worker count, downloads the same chapter range through
+BookScraper.iter_chapters and reports chapters/sec, p50/p95/p99 chapter latency
+(first attempt to final result, retries included), peak RSS growth and request
+amplification (requests the site received per chapter requested).
+
+The site runs in its own process so that serving pages does not compete with
+the downloader for the GIL.
+
+    python -m benchmarks.bench_downloader --chapters 500 --workers 5 20 50 \\
+        --error-rate 0.02 --throttle-rate 0.01 --truncate-rate 0.01
+
+    # Parse throughput with a process pool next to 50 fetch threads
+    python -m benchmarks.bench_downloader --workers 50 --parse-workers 0 4 8 16 --paragraphs 200
+"""
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from benchmarks.fake_site import FakeSite, SiteConfig, url_templates
+from src.core.scraper import BookScraper
+from src.utils.retry import RetryPolicy
+
+@dataclass
+class BenchResult:
+    engine: str
+    workers: int
+    parse_workers: int
+    chapters: int
+    succeeded: int
+    seconds: float
+    chapters_per_sec: float
+    p50: float
+    p95: float
+    p99: float
+    peak_rss_mb: float
+    requests: int
+    amplification: float
+    statuses: Dict[str, int]
+
+class RSSSampler:
+    """Samples resident memory in a background thread and keeps the peak."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current() -> int:
+        """Resident set size in bytes (peak so far where /proc is unavailable)."""
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return usage if sys.platform == 'darwin' else usage * 1024
+
+    def __enter__(self):
+        self.baseline = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def growth(self) -> int:
+        return max(self.peak - self.baseline, 0)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def _serve(config: SiteConfig, port: int) -> None:
+    FakeSite(config, port=port).serve_forever()
+
+def _site_call(base_url: str, path: str) -> Dict:
+    with urllib.request.urlopen(base_url + path) as response:
+        return json.loads(response.read())
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def run_one(base_url: str, engine: str, workers: int, parse_workers: int, chapters: int,
+            retry_policy: RetryPolicy) -> BenchResult:
+    """Download chapters 1..chapters once and measure it."""
+    _site_call(base_url, '/__reset')
+    with tempfile.TemporaryDirectory() as library:
+        with BookScraper(Path(library), max_workers=workers, engine=engine, parse_workers=parse_workers,
+                         retry_policy=retry_policy, http_cache_bytes=0) as scraper:
+            scraper.url_builder.templates.update(url_templates(base_url))
+            book = scraper.get_book('bench-novel')
+
+            latencies = []
+            succeeded = 0
+            # Per-chapter console output is not part of what is measured
+            with RSSSampler() as rss, contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                for result in scraper.iter_chapters(book, 1, chapters):
+                    if result.error is None:
+                        succeeded += 1
+                        latencies.append(result.elapsed)
+                seconds = time.perf_counter() - start
+
+    stats = _site_call(base_url, '/__stats')
+    return BenchResult(
+        engine=engine,
+        workers=workers,
+        parse_workers=parse_workers,
+        chapters=chapters,
+        succeeded=succeeded,
+        seconds=round(seconds, 3),
+        chapters_per_sec=round(succeeded / seconds, 1),
+        p50=round(percentile(latencies, 50), 3),
+        p95=round(percentile(latencies, 95), 3),
+        p99=round(percentile(latencies, 99), 3),
+        peak_rss_mb=round(rss.growth / 2 ** 20, 1),
+        requests=stats['requests'],
+        amplification=round(stats['requests'] / chapters, 3),
+        statuses=stats['statuses']
+    )
+
+COLUMNS = ['engine', 'workers', 'parse_workers', 'succeeded', 'seconds', 'chapters_per_sec',
+           'p50', 'p95', 'p99', 'peak_rss_mb', 'amplification']
+
+def print_header() -> None:
+    print('  '.join(c.rjust(max(len(c), 8)) for c in COLUMNS))
+
+def print_row(result: BenchResult) -> None:
+    print('  '.join(str(getattr(result, c)).rjust(max(len(c), 8)) for c in COLUMNS), flush=True)
+
+def main(argv: Optional[List[str]] = None) -> List[BenchResult]:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=300)
+    parser.add_argument('--engines', nargs='+', default=list(BookScraper.ENGINES), choices=BookScraper.ENGINES)
+    parser.add_argument('--workers', nargs='+', type=int, default=[5, 20, 50])
+    parser.add_argument('--parse-workers', nargs='+', type=int, default=[0],
+                        help='Parse pool sizes to try (0 = parse in the fetch workers)')
+    parser.add_argument('--base-delay', type=float, default=0.2, help='Retry backoff base in seconds')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+    site_defaults = SiteConfig()
+    for field in fields(SiteConfig):
+        if field.name != 'chapters':
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(getattr(site_defaults, field.name)),
+                                default=getattr(site_defaults, field.name))
+    args = parser.parse_args(argv)
+
+    site_config = SiteConfig(**{
+        field.name: getattr(args, field.name) for field in fields(SiteConfig) if field.name != 'chapters'
+    }, chapters=args.chapters)
+    retry_policy = RetryPolicy(base_delay=args.base_delay)
+
+    port = _free_port()
+    server = multiprocessing.Process(target=_serve, args=(site_config, port), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            _site_call(base_url, '/__stats')
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    results = []
+    print_header()
+    try:
+        for engine in args.engines:
+            for workers in args.workers:
+                for parse_workers in args.parse_workers:
+                    results.append(run_one(base_url, engine, workers, parse_workers, args.chapters, retry_policy))
+                    print_row(results[-1])
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'site': asdict(site_config), 'results': [asdict(r) for r in results]}, f, indent=2)
+    return results
+
+if __name__ == '__main__':
+    main()
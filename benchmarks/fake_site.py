@@ -0,0 +1,263 @@
+"""
+Local stand-in for the novel site, serving the markup HTMLParser and
+ContentValidator expect.
+
+Chapter pages, each book's paginated chapter list, the hot-novel list (with
+pagination) and search results are generated on the fly. Latency, server errors, throttling (429 + Retry-After),
+truncated pages and pages with bytes that are not UTF-8 are configurable, so
+downloader changes can be measured (and tested) offline and reproducibly.
+
+Run standalone:
+    python -m benchmarks.fake_site --port 8000 --latency 0.05 --error-rate 0.02
+"""
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Union
+from urllib.parse import urlparse, parse_qs
+import argparse
+import json
+import random
+import re
+import threading
+import time
+
+CHAPTER_PATH = re.compile(r'^/(?P<book>[^/]+)/chapter-(?P<n>\d+)\.html$')
+BOOK_PATH = re.compile(r'^/(?P<book>[^/]+)\.html$')
+WORDS = (
+    "the sect elder frowned as his disciple stepped into the hall carrying a sword "
+    "that hummed with spiritual energy while the heavens rumbled far above the peak "
+    "and a thousand cultivators held their breath waiting for the tribulation"
+).split()
+NAVIGATION = (
+    '<div id="header"><ul class="navbar">'
+    + ''.join(f'<li><a href="/genre/{w}">{w.title()}</a></li>' for w in WORDS[:20])
+    + '</ul></div>'
+)
+
+def url_templates(base_url: str) -> Dict[str, str]:
+    """URLBuilder templates for a fake site served at base_url."""
+    return {
+        'novelfull': f"{base_url}/{{book_name}}/chapter-{{chapter_number}}.html",
+        'book': f"{base_url}/{{book_name}}.html?page={{page}}",
+        'search': f"{base_url}/search?keyword={{search_term}}",
+        'hot_novels': f"{base_url}/hot-novel?page={{page}}",
+    }
+
+@dataclass
+class SiteConfig:
+    """Behaviour of the fake site."""
+    chapters: int = 1000  # Chapters per book; higher numbers are 404s
+    paragraphs: int = 30  # Paragraphs per chapter page
+    latency: float = 0.05  # Median response latency in seconds
+    latency_sigma: float = 0.5  # Log-normal spread of the latency (0 = constant)
+    error_rate: float = 0.0  # Fraction of chapter requests answered with 500
+    throttle_rate: float = 0.0  # Fraction answered with 429 and Retry-After
+    retry_after: float = 1.0
+    truncate_rate: float = 0.0  # Fraction cut off before the chapter content
+    bad_byte_rate: float = 0.0  # Fraction with a stray non-UTF-8 byte in the chapter text
+    toc_page_size: int = 50  # Chapters per page of a book's chapter list
+    hot_pages: int = 5
+    novels_per_page: int = 20
+    seed: int = 0
+
+class FakeSite:
+    """Threaded HTTP/1.1 server with request counters, usable as a context manager."""
+
+    def __init__(self, config: Optional[SiteConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or SiteConfig()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.statuses: Dict[int, int] = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_templates(self) -> Dict[str, str]:
+        """Templates for URLBuilder that point every request at this site."""
+        return url_templates(self.base_url)
+
+    def start(self) -> 'FakeSite':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'requests': self.requests, 'statuses': dict(self.statuses)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.statuses.clear()
+            self._random.seed(self.config.seed)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _draw(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def _latency(self) -> float:
+        with self._lock:
+            if self.config.latency_sigma <= 0:
+                return self.config.latency
+            return self.config.latency * self._random.lognormvariate(0, self.config.latency_sigma)
+
+    def _count(self, status: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def _chapter_page(self, book: str, n: int) -> str:
+        rng = random.Random(f"{book}/{n}")
+        paragraphs = ''.join(
+            f"<p>{' '.join(rng.choices(WORDS, k=60))}.</p>" for _ in range(self.config.paragraphs)
+        )
+        return (
+            f'<html><head><title>{book} - Chapter {n}</title></head><body>{NAVIGATION}'
+            f'<a class="chapter-title"><span class="chapter-text">Chapter {n}</span></a>'
+            f'<div id="chapter-content"><h3>Chapter {n}: {rng.choice(WORDS).title()}</h3>{paragraphs}</div>'
+            '</body></html>'
+        )
+
+    def _toc_page(self, book: str, page: int) -> str:
+        pages = max(1, -(-self.config.chapters // self.config.toc_page_size))
+        page = min(max(page, 1), pages)
+        first = (page - 1) * self.config.toc_page_size + 1
+        last = min(page * self.config.toc_page_size, self.config.chapters)
+        rows = ''.join(
+            f'<li><a href="/{book}/chapter-{n}.html" title="Chapter {n}">Chapter {n}</a></li>'
+            for n in range(first, last + 1)
+        )
+        # Like the real site, the last page has no "Last" link
+        pagination = '<ul class="pagination">' + ''.join(
+            f'<li><a href="/{book}.html?page={p}">{p}</a></li>' for p in range(max(1, page - 2), page)
+        )
+        if page < pages:
+            pagination += f'<li class="last"><a href="/{book}.html?page={pages}">Last</a></li>'
+        return (
+            f'<html><body>{NAVIGATION}<div id="list-chapter"><ul class="list-chapter">{rows}</ul>'
+            f'{pagination}</ul></div></body></html>'
+        )
+
+    def _hot_page(self, page: int) -> str:
+        page = min(max(page, 1), self.config.hot_pages)  # Like the real site, overflow repeats the last page
+        rows = ''.join(
+            f'<div class="row"><h3 class="truyen-title"><a href="/novel-{page}-{i}.html">Novel {page}-{i}</a></h3>'
+            f'<span class="author">Author {i}</span></div>'
+            for i in range(self.config.novels_per_page)
+        )
+        pagination = (
+            '<ul class="pagination">'
+            + ''.join(f'<li><a href="/hot-novel?page={p}">{p}</a></li>' for p in range(1, min(self.config.hot_pages, 5) + 1))
+            + f'<li class="last"><a href="/hot-novel?page={self.config.hot_pages}">Last</a></li></ul>'
+        )
+        return f'<html><body>{NAVIGATION}<div class="list-truyen">{rows}</div>{pagination}</body></html>'
+
+    def _search_page(self, keyword: str) -> str:
+        rows = ''.join(
+            f'<div class="row"><h3 class="truyen-title"><a href="/{keyword}-{i}.html">{keyword.title()} {i}</a></h3>'
+            f'<span class="author">Author {i}</span><div class="excerpt">A tale of {keyword}.</div></div>'
+            for i in range(10)
+        )
+        return f'<html><body><div class="col-truyen-main">{rows}</div></body></html>'
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == '/__stats':
+                    return self._send(200, json.dumps(site.stats()), count=False)
+                if url.path == '/__reset':
+                    site.reset()
+                    return self._send(200, '{}', count=False)
+
+                time.sleep(site._latency())
+                if match := CHAPTER_PATH.match(url.path):
+                    n = int(match.group('n'))
+                    if n < 1 or n > site.config.chapters:
+                        return self._send(404, '<html><body>404 Not Found</body></html>')
+                    draw = site._draw()
+                    if draw < site.config.error_rate:
+                        return self._send(500, '<html><body>Internal Server Error</body></html>')
+                    draw -= site.config.error_rate
+                    if draw < site.config.throttle_rate:
+                        return self._send(429, 'Too Many Requests', {'Retry-After': str(site.config.retry_after)})
+                    draw -= site.config.throttle_rate
+                    page = site._chapter_page(match.group('book'), n)
+                    if draw < site.config.truncate_rate:
+                        page = page[:page.index('<a class="chapter-title">')]
+                    elif draw - site.config.truncate_rate < site.config.bad_byte_rate:
+                        # Still declared as UTF-8, like a mis-encoded source page
+                        data = page.encode('utf-8')
+                        at = data.index(b'<p>') + 3
+                        return self._send(200, data[:at] + b'\xff' + data[at:])
+                    return self._send(200, page)
+                if match := BOOK_PATH.match(url.path):
+                    return self._send(200, site._toc_page(match.group('book'), int(query.get('page', ['1'])[0])))
+                if url.path == '/hot-novel':
+                    return self._send(200, site._hot_page(int(query.get('page', ['1'])[0])))
+                if url.path == '/search':
+                    return self._send(200, site._search_page(query.get('keyword', [''])[0]))
+                return self._send(404, '<html><body>404 Not Found</body></html>')
+
+            def _send(self, status: int, body: Union[str, bytes], headers: Optional[Dict[str, str]] = None,
+                      count: bool = True):
+                if count:
+                    site._count(status)
+                data = body if isinstance(body, bytes) else body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    for field, value in asdict(SiteConfig()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(value), default=value)
+    args = vars(parser.parse_args())
+    host, port = args.pop('host'), args.pop('port')
+
+    site = FakeSite(SiteConfig(**args), host, port)
+    print(f"Serving fake novel site on {site.base_url}")
+    for name, template in site.url_templates().items():
+        print(f"  {name}: {template}")
+    try:
+        site.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
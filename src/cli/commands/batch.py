@@ -0,0 +1,105 @@
+import click
+from rich.console import Console
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeElapsedColumn
+from rich.table import Table
+from pathlib import Path
+
+from src.core.batch import BookProgress, load_jobs
+from src.core.scraper import BookScraper
+from src.cli.config import Config
+from src.utils.metrics import PeriodicExporter
+
+@click.command()
+@click.argument('job_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', '-w', default=None, type=int,
+              help='Concurrent downloads shared by all books (default: max_workers from config)')
+@click.option('--active-books', default=8, show_default=True,
+              help='Books downloading at the same time (0 = all)')
+@click.option('--end', '-e', default=None, type=int,
+              help='Ending chapter for entries without one (default: each book\'s latest chapter)')
+@click.option('--output', '-o', help='Output directory')
+@click.option('--format', '-f', 'formats', default=['html'], multiple=True,
+              type=click.Choice(['html', 'txt', 'epub']), help='Output format for entries without one')
+@click.option('--engine', default='thread', type=click.Choice(BookScraper.ENGINES),
+              help='Download engine: worker threads or a single asyncio event loop')
+@click.option('--parse-workers', default=0, show_default=True,
+              help='Processes parsing pages while --workers keep fetching (0 = parse in the fetch workers)')
+@click.option('--resume/--no-resume', default=True,
+              help='Skip chapters already downloaded by an earlier run (default: resume)')
+@click.option('--mirror', 'mirrors', multiple=True,
+              help='Site to download chapters from, in preference order (repeat for several; default: mirrors from config)')
+@click.option('--metrics-out', type=click.Path(dir_okay=False),
+              help='Write run metrics to this file (.prom for Prometheus text, otherwise JSON)')
+def batch(job_file: str, workers: int, active_books: int, end: int, output: str, formats: tuple,
+          engine: str, parse_workers: int, resume: bool, mirrors: tuple, metrics_out: str):
+    """Download many novels in one process, listed in JOB_FILE (text or YAML)."""
+    config = Config()
+    output_dir = Path(output) if output else config.get_output_dir()
+    console = Console()
+
+    try:
+        jobs = load_jobs(Path(job_file), formats=formats, end=end)
+    except (ValueError, KeyError, TypeError) as e:
+        raise click.BadParameter(str(e), param_hint='JOB_FILE')
+    if not jobs:
+        console.print("[yellow]No novels listed in the job file.[/yellow]")
+        return
+
+    with BookScraper(
+        output_dir,
+        max_workers=workers or config.get('max_workers', 5),
+        engine=engine,
+        parse_workers=parse_workers,
+        mirrors=mirrors or config.get_mirrors(),
+        rate_limiter=config.get_rate_limiter(),
+        http_cache_bytes=config.get_http_cache_bytes()
+    ) as scraper, Progress(
+        TextColumn("{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TextColumn("[red]{task.fields[failed]}[/red]"),
+        TimeElapsedColumn(),
+        console=console
+    ) as progress:
+        overall = progress.add_task(f"[bold]{len(jobs)} novels", total=len(jobs), failed='')
+        rows = {}
+
+        def update(book: BookProgress) -> None:
+            if book.book not in rows:
+                rows[book.book] = progress.add_task(book.book, total=book.total, failed='')
+            failed = f"{book.failed} failed" if book.failed else ''
+            progress.update(rows[book.book], completed=book.completed, failed=failed)
+            if book.finished:
+                # Finished books leave the live display and are listed above it
+                progress.remove_task(rows[book.book])
+                status = "[green]done[/green]" if book.output else "[red]failed[/red]"
+                progress.console.print(
+                    f"{status} {book.book}: {book.stored} new chapters"
+                    + (f", {book.skipped} already stored" if book.skipped else '')
+                    + (f", [red]{book.failed} failed[/red]" if book.failed else '')
+                )
+                progress.advance(overall)
+
+        exporter = PeriodicExporter(scraper.metrics, Path(metrics_out)).start() if metrics_out else None
+        try:
+            results = scraper.download_books(jobs, resume=resume, max_active_books=active_books,
+                                             progress_callback=update)
+        finally:
+            if exporter:
+                exporter.stop()
+
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Novel")
+    table.add_column("New", justify="right")
+    table.add_column("Skipped", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Output")
+    for book in results.values():
+        table.add_row(
+            book.book, str(book.stored), str(book.skipped),
+            f"[red]{book.failed}[/red]" if book.failed else '0',
+            str(book.output) if book.output else "[red]-[/red]"
+        )
+    console.print(table)
+    if metrics_out:
+        console.print(f"[dim]Metrics written to {metrics_out}[/dim]")
@@ -4,28 +4,78 @@ from pathlib import Path
 
 from src.core.scraper import BookScraper
 from src.cli.config import Config
+from src.utils.metrics import PeriodicExporter
 
 @click.command()
 @click.argument('novel_name')
 @click.option('--start', '-s', default=1, help='Starting chapter')
-@click.option('--end', '-e', default=50, help='Ending chapter')
+@click.option('--end', '-e', default=None, type=int, help='Ending chapter (default: the latest chapter)')
 @click.option('--workers', '-w', default=5, help='Number of concurrent downloads')
 @click.option('--output', '-o', help='Output directory')
-@click.option('--format', '-f', default='html', type=click.Choice(['html', 'txt']), help='Output format')
-def download(novel_name: str, start: int, end: int, workers: int, output: str, format: str):
+@click.option('--format', '-f', 'formats', default=['html'], multiple=True,
+              type=click.Choice(['html', 'txt', 'epub']), help='Output format (repeat for several)')
+@click.option('--engine', default='thread', type=click.Choice(BookScraper.ENGINES),
+              help='Download engine: worker threads or a single asyncio event loop')
+@click.option('--parse-workers', default=0, show_default=True,
+              help='Processes parsing pages while --workers keep fetching (0 = parse in the fetch workers)')
+@click.option('--mirror', 'mirrors', multiple=True,
+              help='Site to download chapters from, in preference order (repeat for several; default: mirrors from config)')
+@click.option('--resume/--no-resume', default=True,
+              help='Skip chapters already downloaded by an earlier run (default: resume)')
+@click.option('--metrics-out', type=click.Path(dir_okay=False),
+              help='Write run metrics to this file (.prom for Prometheus text, otherwise JSON)')
+@click.option('--metrics-interval', default=10.0, show_default=True,
+              help='Seconds between metrics file updates during the download')
+def download(novel_name: str, start: int, end: int, workers: int, output: str, formats: tuple, engine: str,
+             parse_workers: int, mirrors: tuple, resume: bool, metrics_out: str, metrics_interval: float):
     """Download chapters from a novel."""
     config = Config()
     output_dir = Path(output) if output else config.get_output_dir()
     
     console = Console()
-    scraper = BookScraper(output_dir, max_workers=workers)
     
-    console.print(f"[green]Downloading {novel_name} chapters {start}-{end}[/green]")
+    console.print(f"[green]Downloading {novel_name} chapters {start}-{end or 'latest'}[/green]")
     
-    output_file = scraper.download_book(novel_name, start, end)
+    with BookScraper(
+        output_dir,
+        max_workers=workers,
+        engine=engine,
+        parse_workers=parse_workers,
+        mirrors=mirrors or config.get_mirrors(),
+        rate_limiter=config.get_rate_limiter(),
+        http_cache_bytes=config.get_http_cache_bytes()
+    ) as scraper:
+        exporter = None
+        if metrics_out:
+            exporter = PeriodicExporter(scraper.metrics, Path(metrics_out), metrics_interval).start()
+        try:
+            output_file = scraper.download_book(novel_name, start, end, resume=resume, formats=formats)
+        finally:
+            if exporter:
+                exporter.stop()
+        book = scraper.get_book(novel_name)
+        stats = scraper.fetcher.stats
+        mirror_scores = scraper.router.snapshot() if len(scraper.mirrors) > 1 else {}
     print(output_file)
     
+    if stats.requests:
+        console.print(
+            f"[dim]{stats.requests} requests over {stats.connections_opened} connections "
+            f"({stats.connections_reused} reused)[/dim]"
+        )
+    for host, score in mirror_scores.items():
+        latency = f"{score['latency']:.2f}s" if score['latency'] is not None else '-'
+        console.print(
+            f"[dim]{host}: {score['successes']} ok, {score['failures']} failed, "
+            f"latency {latency}, health {score['health']:.2f}[/dim]"
+        )
+    if metrics_out:
+        console.print(f"[dim]Metrics written to {metrics_out}[/dim]")
+    
     if output_file:
         console.print(f"[green]Successfully downloaded to: {output_file}[/green]")
+        for fmt in formats[1:]:
+            if book.export_path(fmt).exists():
+                console.print(f"[green]Also written: {book.export_path(fmt)}[/green]")
     else:
         console.print("[red]Failed to download novel.[/red]")
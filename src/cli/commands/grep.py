@@ -0,0 +1,42 @@
+import click
+from rich.console import Console
+from rich.table import Table
+from rich.text import Text
+
+from src.utils.file_handler import FileHandler
+from src.utils.search_index import TOKEN
+from src.cli.config import Config
+
+@click.command()
+@click.argument('query')
+@click.option('--limit', '-l', default=20, help='Maximum number of hits')
+@click.option('--book', '-b', default=None, help='Only search this novel')
+def grep(query: str, limit: int, book: str):
+    """Search the text of downloaded chapters."""
+    config = Config()
+    console = Console()
+    
+    file_handler = FileHandler(config.get_output_dir())
+    try:
+        hits = file_handler.chapter_index.search(
+            query, limit, book=book.lower().replace(' ', '-') if book else None
+        )
+    finally:
+        file_handler.close()
+    
+    if not hits:
+        console.print("[yellow]No matching chapters found.[/yellow]")
+        return
+    
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Book", style="dim")
+    table.add_column("Chapter", justify="right")
+    table.add_column("Snippet")
+    
+    words = TOKEN.findall(query)
+    for hit in hits:
+        snippet = Text(hit.snippet)
+        snippet.highlight_words(words, style="bold yellow", case_sensitive=False)
+        table.add_row(hit.book, str(hit.chapter_number), snippet)
+    
+    console.print(table)
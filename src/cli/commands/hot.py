@@ -8,14 +8,20 @@ from src.cli.config import Config
 @click.command()
 @click.option('--limit', '-l', default=10, help='Maximum number of results')
 @click.option('--page', '-p', default=1, help='Page number')
-def hot(limit: int, page: int):
+@click.option('--cache-ttl', default=None, type=int, help='Cache duration in seconds')
+def hot(limit: int, page: int, cache_ttl: int):
     """List trending/hot novels."""
     config = Config()
-    scraper = BookScraper(config.get_output_dir())
     console = Console()
     
     with console.status("Fetching hot novels..."):
-        novels = scraper.get_hot_novels()
+        with BookScraper(
+            config.get_output_dir(),
+            rate_limiter=config.get_rate_limiter(),
+            http_cache_bytes=config.get_http_cache_bytes(),
+            cache_ttl=cache_ttl or config.get('cache_ttl')
+        ) as scraper:
+            novels = scraper.get_hot_novels()
     
     if not novels:
         console.print("[yellow]No hot novels found.[/yellow]")
@@ -12,21 +12,17 @@ from src.cli.config import Config
 def list_books(detailed: bool, sort: str):
     """List downloaded novels."""
     config = Config()
-    scraper = BookScraper(config.get_output_dir())
     console = Console()
     
-    novels = scraper.get_downloaded_books()
+    # Sorting is done by the catalog's indexes
+    order = {'name': 'title', 'date': 'updated', 'chapters': 'chapters'}[sort]
+    with BookScraper(config.get_output_dir()) as scraper:
+        novels = scraper.get_downloaded_books(order)
     
     if not novels:
         console.print("[yellow]No downloaded novels found.[/yellow]")
         return
     
-    # Sort novels
-    if sort == 'name':
-        novels.sort(key=lambda x: x.title)
-    elif sort == 'chapters':
-        novels.sort(key=lambda x: len(x.chapters) if x.chapters else 0, reverse=True)
-    
     # Create table
     table = Table(show_header=True, header_style="bold magenta")
     table.add_column("Title", style="dim")
@@ -0,0 +1,124 @@
+import click
+from rich.console import Console
+from rich.table import Table
+from pathlib import Path
+import time
+
+from src.core.scraper import BookScraper
+from src.core.lease_worker import LeaseWorker, WorkerStats
+from src.cli.config import Config
+from src.utils.lease_queue import SQLiteLeaseQueue
+
+@click.group()
+@click.option('--queue', 'queue_path', required=True, envvar='BOOKSCRAPER_QUEUE',
+              type=click.Path(dir_okay=False),
+              help='Shared queue file, on storage every node can reach (env: BOOKSCRAPER_QUEUE)')
+@click.pass_context
+def queue(ctx: click.Context, queue_path: str):
+    """Spread downloads over several nodes through a shared chapter queue."""
+    ctx.obj = SQLiteLeaseQueue(Path(queue_path))
+    ctx.call_on_close(ctx.obj.close)
+
+@queue.command()
+@click.argument('novel_name')
+@click.option('--start', '-s', default=1, help='Starting chapter')
+@click.option('--end', '-e', default=None, type=int, help='Ending chapter (default: the latest chapter)')
+@click.option('--output', '-o', help='Output directory')
+@click.option('--format', '-f', 'formats', default=['html'], multiple=True,
+              type=click.Choice(['html', 'txt', 'epub']), help='Output format (repeat for several)')
+@click.option('--resume/--no-resume', default=True,
+              help='Leave out chapters already in the library (default: resume)')
+@click.pass_obj
+def add(lease_queue: SQLiteLeaseQueue, novel_name: str, start: int, end: int, output: str,
+        formats: tuple, resume: bool):
+    """Queue a novel's chapters for workers."""
+    config = Config()
+    output_dir = Path(output) if output else config.get_output_dir()
+    with BookScraper(output_dir, http_cache_bytes=0) as scraper:
+        job_id, count = scraper.enqueue_book(lease_queue, novel_name, start, end, resume=resume, formats=formats)
+    Console().print(f"[green]Queued {count} chapters of {novel_name} as job {job_id}[/green]")
+
+@queue.command()
+@click.option('--workers', '-w', default=5, help='Number of concurrent downloads on this node')
+@click.option('--engine', default='thread', type=click.Choice(BookScraper.ENGINES),
+              help='Download engine: worker threads or a single asyncio event loop')
+@click.option('--parse-workers', default=0, show_default=True,
+              help='Processes parsing pages while --workers keep fetching (0 = parse in the fetch workers)')
+@click.option('--batch', 'batch_size', default=None, type=int,
+              help='Leases claimed at a time (default: twice --workers)')
+@click.option('--lease', 'lease_seconds', default=120.0, show_default=True,
+              help='Seconds before a silent worker\'s chapters are handed to another worker')
+@click.option('--forever', is_flag=True, help='Keep waiting for new jobs instead of exiting when the queue is empty')
+@click.pass_obj
+def work(lease_queue: SQLiteLeaseQueue, workers: int, engine: str, parse_workers: int,
+         batch_size: int, lease_seconds: float, forever: bool):
+    """Download queued chapters on this node."""
+    config = Config()
+    console = Console()
+
+    def report(stats: WorkerStats) -> None:
+        console.print(f"[dim]{stats.completed} chapters done, {stats.failed} failed[/dim]")
+
+    # Chapters go back through the queue; the local library only holds this node's HTTP cache
+    with BookScraper(
+        config.get_output_dir(),
+        max_workers=workers,
+        engine=engine,
+        parse_workers=parse_workers,
+        rate_limiter=config.get_rate_limiter(),
+        http_cache_bytes=config.get_http_cache_bytes()
+    ) as scraper:
+        worker = LeaseWorker(lease_queue, scraper.downloader, batch_size or 2 * workers, lease_seconds)
+        console.print(f"[green]Worker {worker.worker_id} started[/green]")
+        try:
+            stats = worker.run(forever=forever, on_batch=report)
+        except KeyboardInterrupt:
+            # Unfinished leases expire and are picked up by other workers
+            stats = worker.stats
+    console.print(
+        f"[green]{stats.completed} chapters downloaded[/green], {stats.failed} failed"
+        + (f", {stats.duplicates} already done by another worker" if stats.duplicates else '')
+    )
+
+@queue.command()
+@click.option('--output', '-o', help='Output directory')
+@click.option('--watch', 'interval', default=0.0,
+              help='Keep collecting every this many seconds until all jobs are finished')
+@click.pass_obj
+def collect(lease_queue: SQLiteLeaseQueue, output: str, interval: float):
+    """Store chapters finished by workers in the library."""
+    config = Config()
+    output_dir = Path(output) if output else config.get_output_dir()
+    console = Console()
+    with BookScraper(output_dir, http_cache_bytes=0) as scraper:
+        while True:
+            for book in scraper.collect_leases(lease_queue).values():
+                if book.finished:
+                    status = "[green]done[/green]" if book.output else "[red]failed[/red]"
+                    console.print(f"{status} {book.book}: {book.output or 'no chapters stored'}")
+                elif book.stored:
+                    console.print(f"[dim]{book.book}: {book.stored} chapters stored[/dim]")
+            if not interval or not lease_queue.jobs():
+                break
+            time.sleep(interval)
+
+@queue.command()
+@click.pass_obj
+def status(lease_queue: SQLiteLeaseQueue):
+    """Show the chapters of every job by state."""
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Job", justify="right")
+    table.add_column("Novel")
+    table.add_column("Chapters")
+    for column in ('Pending', 'Leased', 'Done', 'Failed'):
+        table.add_column(column, justify="right")
+    table.add_column("Finished")
+    for job in lease_queue.jobs(unfinished=False):
+        counts = lease_queue.progress(job.id)
+        table.add_row(
+            str(job.id), job.book, f"{job.start}-{job.end}",
+            str(counts['pending']), str(counts['leased']), str(counts['done']),
+            f"[red]{counts['failed']}[/red]" if counts['failed'] else '0',
+            "yes" if job.finished else "no"
+        )
+    Console().print(table)
@@ -11,15 +11,24 @@ from src.cli.config import Config
 @click.option('--limit', '-l', default=10, help='Maximum number of results')
 @click.option('--detailed', '-d', is_flag=True, help='Show detailed descriptions')
 @click.option('--cache-ttl', default=3600, help='Cache duration in seconds')
-def search(query: str, limit: int, detailed: bool, cache_ttl: int):
+@click.option('--offline', '--local', 'offline', is_flag=True,
+              help='Search the local index of novels seen before instead of the site')
+def search(query: str, limit: int, detailed: bool, cache_ttl: int, offline: bool):
     """Search for novels by title or keywords."""
     config = Config()
-    scraper = BookScraper(config.get_output_dir())
-    
     console = Console()
     
     with console.status(f"Searching for '{query}'..."):
-        results = scraper.search_novels(query)
+        with BookScraper(
+            config.get_output_dir(),
+            rate_limiter=config.get_rate_limiter(),
+            http_cache_bytes=config.get_http_cache_bytes(),
+            cache_ttl=cache_ttl
+        ) as scraper:
+            if offline:
+                results = scraper.search_local(query, limit)
+            else:
+                results = scraper.search_novels(query)
     
     if not results:
         console.print("[yellow]No results found.[/yellow]")
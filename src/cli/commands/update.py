@@ -0,0 +1,103 @@
+import click
+from rich.console import Console
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeElapsedColumn
+from rich.table import Table
+from pathlib import Path
+
+from src.core.batch import BookProgress
+from src.core.scraper import BookScraper
+from src.cli.config import Config
+from src.utils.metrics import PeriodicExporter
+
+@click.command()
+@click.argument('novel_names', nargs=-1)
+@click.option('--all', 'update_all', is_flag=True, help='Update every novel in the library')
+@click.option('--workers', '-w', default=None, type=int,
+              help='Concurrent downloads shared by all novels (default: max_workers from config)')
+@click.option('--active-books', default=8, show_default=True,
+              help='Novels downloading at the same time (0 = all)')
+@click.option('--output', '-o', help='Output directory')
+@click.option('--engine', default='thread', type=click.Choice(BookScraper.ENGINES),
+              help='Download engine: worker threads or a single asyncio event loop')
+@click.option('--parse-workers', default=0, show_default=True,
+              help='Processes parsing pages while --workers keep fetching (0 = parse in the fetch workers)')
+@click.option('--mirror', 'mirrors', multiple=True,
+              help='Site to download chapters from, in preference order (repeat for several; default: mirrors from config)')
+@click.option('--metrics-out', type=click.Path(dir_okay=False),
+              help='Write run metrics to this file (.prom for Prometheus text, otherwise JSON)')
+def update(novel_names: tuple, update_all: bool, workers: int, active_books: int, output: str,
+           engine: str, parse_workers: int, mirrors: tuple, metrics_out: str):
+    """Download chapters published since the last download of NOVEL_NAMES (or --all)."""
+    if not novel_names and not update_all:
+        raise click.UsageError("Name the novels to update or pass --all")
+    if novel_names and update_all:
+        raise click.UsageError("Pass either novel names or --all, not both")
+
+    config = Config()
+    output_dir = Path(output) if output else config.get_output_dir()
+    console = Console()
+
+    with BookScraper(
+        output_dir,
+        max_workers=workers or config.get('max_workers', 5),
+        engine=engine,
+        parse_workers=parse_workers,
+        mirrors=mirrors or config.get_mirrors(),
+        rate_limiter=config.get_rate_limiter(),
+        http_cache_bytes=config.get_http_cache_bytes()
+    ) as scraper, Progress(
+        TextColumn("{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        console=console
+    ) as progress:
+        rows = {}
+
+        def report(book: BookProgress) -> None:
+            if not book.total:
+                return
+            if book.book not in rows:
+                rows[book.book] = progress.add_task(book.book, total=book.total)
+            progress.update(rows[book.book], completed=book.completed)
+            if book.finished:
+                progress.remove_task(rows[book.book])
+                progress.console.print(
+                    f"[green]{book.book}[/green]: {book.stored} new chapters"
+                    + (f", [red]{book.failed} failed[/red]" if book.failed else '')
+                )
+
+        exporter = PeriodicExporter(scraper.metrics, Path(metrics_out)).start() if metrics_out else None
+        try:
+            results = scraper.update_books(None if update_all else novel_names, max_active_books=active_books,
+                                           progress_callback=report)
+        finally:
+            if exporter:
+                exporter.stop()
+        stats = scraper.fetcher.stats
+
+    if not results:
+        console.print("[yellow]No downloaded novels to update.[/yellow]")
+        return
+    updated = [book for book in results.values() if book.total]
+    current = [book for book in results.values() if not book.total and not book.errors]
+    unknown = [book for book in results.values() if book.errors]
+    if updated:
+        table = Table(show_header=True, header_style="bold magenta")
+        table.add_column("Novel")
+        table.add_column("New", justify="right")
+        table.add_column("Failed", justify="right")
+        table.add_column("Output")
+        for book in updated:
+            table.add_row(
+                book.book, str(book.stored),
+                f"[red]{book.failed}[/red]" if book.failed else '0',
+                str(book.output) if book.output else "[red]-[/red]"
+            )
+        console.print(table)
+    console.print(f"{len(updated)} updated, {len(current)} up to date"
+                  + (f", [yellow]{len(unknown)} without a chapter list[/yellow]" if unknown else ''))
+    if stats.requests:
+        console.print(f"[dim]{stats.requests} requests over {stats.connections_opened} connections[/dim]")
+    if metrics_out:
+        console.print(f"[dim]Metrics written to {metrics_out}[/dim]")
@@ -1,12 +1,16 @@
 from pathlib import Path
 import yaml
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+from src.utils.rate_limiter import RateLimiter
 
 DEFAULT_CONFIG = {
     'output_dir': '~/novels',
     'max_workers': 5,
     'default_format': 'html',
     'cache_ttl': 3600,
+    'http_cache_mb': 512,
+    'mirrors': ['novelfull'],
     'sites': {
         'novelfull': {
             'enabled': True,
@@ -52,6 +56,18 @@ class Config:
         self.config[key] = value
         self._save_config(self.config)
     
+    def get_rate_limiter(self) -> RateLimiter:
+        """Build the per-host rate limiter from the sites.*.rate_limit settings."""
+        return RateLimiter.from_config(self.get('sites', {}))
+    
+    def get_http_cache_bytes(self) -> int:
+        """Size cap of the HTTP conditional-request cache in bytes (0 disables it)."""
+        return int(self.get('http_cache_mb', DEFAULT_CONFIG['http_cache_mb'])) * 1024 * 1024
+    
+    def get_mirrors(self) -> List[str]:
+        """Sites chapters are downloaded from, in preference order."""
+        return list(self.get('mirrors') or DEFAULT_CONFIG['mirrors'])
+    
     def get_output_dir(self) -> Path:
         """Get output directory as Path object."""
         output_dir = self.get('output_dir', '~/novels')
@@ -6,11 +6,21 @@ from src.cli.commands.download import download
 from src.cli.commands.hot import hot
 from src.cli.commands.list import list_books
 from src.cli.commands.config import config
+from src.cli.commands.grep import grep
+from src.cli.commands.batch import batch
+from src.cli.commands.queue import queue
+from src.cli.commands.update import update
+from src.utils.log import setup_logging
 
 @click.group()
-def cli():
+@click.option('--log-level', default='WARNING', show_default=True,
+              type=click.Choice(['DEBUG', 'INFO', 'WARNING', 'ERROR'], case_sensitive=False),
+              help='Minimum level of log messages to show')
+@click.option('--log-file', type=click.Path(dir_okay=False),
+              help='Write log messages to this file instead of the terminal')
+def cli(log_level: str, log_file: str):
     """BookScraper CLI - Download and manage web novels."""
-    pass
+    setup_logging(log_level, log_file)
 
 # Add commands
 cli.add_command(search)
@@ -18,6 +28,10 @@ cli.add_command(download)
 cli.add_command(hot)
 cli.add_command(list_books, name='list')
 cli.add_command(config)
+cli.add_command(grep)
+cli.add_command(batch)
+cli.add_command(queue)
+cli.add_command(update)
 
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,452 @@
+from typing import Optional, List, Callable, Dict, Iterable, Iterator, AsyncIterator, Awaitable, Sequence, Tuple
+import asyncio
+import contextlib
+
+import aiohttp
+
+from src.core.downloader import ChapterTask, DownloadResult
+from src.core.extractor import ChapterExtractor, ExtractionResult, extract_page, new_parse_pool
+from src.utils.rate_limiter import RateLimiter
+from src.utils.retry import RetryPolicy, RetryBudget, DelayQueue
+from src.utils.http_cache import HTTPCache
+from src.utils.log import get_logger
+from src.utils.metrics import Metrics
+from src.utils.mirrors import MirrorRouter
+from src.models.book import Book
+
+logger = get_logger(__name__)
+
+class AsyncChapterDownloader:
+    """
+    Downloads chapters on a single asyncio event loop using aiohttp.
+
+    Exposes the same download_chapters contract as ChapterDownloader, but keeps
+    up to max_concurrency requests in flight without an OS thread per request.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 100,
+        max_retries: int = 3,
+        timeout: int = 10,
+        limit_per_host: int = 0,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        http_cache: Optional[HTTPCache] = None,
+        metrics: Optional[Metrics] = None,
+        parse_workers: int = 0,
+        parse_queue: Optional[int] = None,
+        router: Optional[MirrorRouter] = None
+    ):
+        """
+        Args:
+            max_concurrency: Maximum number of chapters in flight at once
+            max_retries: Attempts per chapter in the main pass (ignored with retry_policy)
+            timeout: Total request timeout in seconds
+            limit_per_host: Maximum open connections per host (0 = no extra limit)
+            rate_limiter: Per-host limiter awaited before every request
+            retry_policy: Shared retry policy (default: RetryPolicy(max_attempts=max_retries))
+            http_cache: Response cache used for conditional (ETag/Last-Modified)
+                requests; not closed by close(), as it is usually shared
+            metrics: Receives stage timings, status codes, retries and queue depths
+            parse_workers: Processes that validate and extract fetched pages
+                (0 = parse on the event loop, blocking it meanwhile)
+            parse_queue: Fetched pages allowed to wait for a parse worker; further
+                workers hold their page, and stop fetching, until one is free
+                (default: 2 * parse_workers)
+            router: Chooses between a task's mirrors and scores them by every
+                attempt's outcome
+        """
+        self.max_concurrency = max_concurrency
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=max_retries)
+        self.max_retries = self.retry_policy.max_attempts
+        self.timeout = timeout
+        self.limit_per_host = limit_per_host
+        self.rate_limiter = rate_limiter
+        self.http_cache = http_cache
+        self.metrics = metrics or Metrics()
+        self.extractor = ChapterExtractor(metrics=self.metrics)
+        self.parse_workers = parse_workers
+        self.parse_queue = parse_queue or 2 * parse_workers
+        self._parse_pool = None
+        self._parse_slots: Optional[asyncio.Semaphore] = None  # Bound to the running loop, made per run
+        self._parsing = 0
+        self.router = router or MirrorRouter()
+
+    def download_chapters(
+        self,
+        book: Book,
+        url_template: str,
+        start_chapter: int,
+        end_chapter: int,
+        progress_callback: Optional[Callable] = None
+    ) -> List[DownloadResult]:
+        """
+        Download chapters concurrently on a fresh event loop.
+
+        Must not be called from a running event loop; use download_chapters_async there.
+        """
+        return asyncio.run(self.download_chapters_async(
+            book, url_template, start_chapter, end_chapter, progress_callback
+        ))
+
+    async def download_chapters_async(
+        self,
+        book: Book,
+        url_template: str,
+        start_chapter: int,
+        end_chapter: int,
+        progress_callback: Optional[Callable] = None
+    ) -> List[DownloadResult]:
+        """Download chapters and return every result sorted by chapter."""
+        results = [
+            result async for result in self.aiter_chapters(
+                book, url_template, start_chapter, end_chapter, progress_callback
+            )
+        ]
+        return sorted(results, key=lambda x: x.chapter_number)
+
+    def iter_chapters(
+        self,
+        book: Book,
+        url_template: str,
+        start_chapter: int,
+        end_chapter: int,
+        progress_callback: Optional[Callable] = None,
+        chapters: Optional[Sequence[int]] = None
+    ) -> Iterator[DownloadResult]:
+        """
+        Synchronous view of aiter_chapters for non-async callers.
+
+        The event loop runs in the calling thread and only advances while the caller
+        waits for the next result, so no extra threads are involved.
+        """
+        return self._drive(self.aiter_chapters(
+            book, url_template, start_chapter, end_chapter, progress_callback, chapters
+        ))
+
+    async def aiter_chapters(
+        self,
+        book: Book,
+        url_template: str,
+        start_chapter: int,
+        end_chapter: int,
+        progress_callback: Optional[Callable] = None,
+        chapters: Optional[Sequence[int]] = None
+    ) -> AsyncIterator[DownloadResult]:
+        """
+        Yield chapter results in completion order as soon as each one is final.
+
+        Finished results wait in a queue bounded by max_concurrency, so a slow
+        consumer pauses the workers instead of letting results pile up in memory.
+        Pass chapters to download an explicit set of chapter numbers instead of
+        the range.
+        """
+        if chapters is None:
+            chapters = range(start_chapter, end_chapter + 1)
+        total_chapters = len(chapters)
+        completed = 0
+        tasks = (ChapterTask(n, url_template.format(chapter_number=n)) for n in chapters)
+        async for result in self.aiter_tasks(tasks):
+            completed += 1
+            if progress_callback:
+                progress_callback(completed, total_chapters)
+            yield result
+
+    def iter_tasks(self, tasks: Iterable[ChapterTask]) -> Iterator[DownloadResult]:
+        """Synchronous view of aiter_tasks, run like iter_chapters."""
+        return self._drive(self.aiter_tasks(tasks))
+
+    @staticmethod
+    def _drive(results: AsyncIterator[DownloadResult]) -> Iterator[DownloadResult]:
+        """Run an async result stream on a private event loop, one result per step."""
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    async def aiter_tasks(self, tasks: Iterable[ChapterTask]) -> AsyncIterator[DownloadResult]:
+        """
+        Like aiter_chapters, for chapters of any number of books.
+
+        tasks is consumed lazily as workers free up, so its order decides which
+        chapters go next. Each result carries its task's book.
+        """
+        finished: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrency)
+        done = object()
+
+        async def produce() -> None:
+            try:
+                await self._run(tasks, finished.put)
+            finally:
+                await finished.put(done)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while (result := await finished.get()) is not done:
+                self.metrics.set_gauge('results_queue', finished.qsize())
+                yield result
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await producer
+
+    async def _run(
+        self,
+        tasks: Iterable[ChapterTask],
+        on_result: Callable[[DownloadResult], Awaitable[None]]
+    ) -> None:
+        """Main pass plus dead-letter pass over one aiohttp session."""
+        dead_letters: List[Tuple[ChapterTask, int]] = []
+        started: Dict[ChapterTask, float] = {}
+        tried: Dict[ChapterTask, List[str]] = {}
+        if self.parse_workers:
+            if self._parse_pool is None:
+                self._parse_pool = new_parse_pool(self.parse_workers)
+            self._parse_slots = asyncio.Semaphore(self.parse_queue)
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=300
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            jobs = ((task, 0, self.retry_policy.max_attempts) for task in tasks)
+            await self._schedule(
+                session, jobs, self.retry_policy.new_budget(), dead_letters, started, tried, on_result
+            )
+            if dead_letters:
+                extra = self.retry_policy.dead_letter_attempts
+                jobs = ((task, attempts, attempts + extra) for task, attempts in dead_letters)
+                await self._schedule(session, jobs, None, None, started, tried, on_result)
+
+    async def _schedule(
+        self,
+        session: aiohttp.ClientSession,
+        jobs: Iterator[Tuple[ChapterTask, int, int]],
+        budget: Optional[RetryBudget],
+        dead_letters: Optional[List[Tuple[ChapterTask, int]]],
+        started: Dict[ChapterTask, float],
+        tried: Dict[ChapterTask, List[str]],
+        on_result: Callable[[DownloadResult], Awaitable[None]]
+    ) -> None:
+        """
+        Run (task, attempts, attempt_limit) jobs on max_concurrency workers.
+
+        Workers pull ready retries first, then new chapters, from shared queues, so at
+        most max_concurrency chapters are in flight and a chapter waiting out its
+        backoff never holds a worker. started maps tasks to the time of their
+        first attempt, and tried to the URLs of their attempts so far, across
+        passes. Failed attempts move to an untried mirror as in ChapterDownloader.
+        """
+        retries = DelayQueue()
+        active = 0
+        loop = asyncio.get_running_loop()
+        # Idle workers sleep on this until a retry is parked or an attempt ends
+        wake = asyncio.Condition()
+
+        def report_depths() -> None:
+            self.metrics.set_gauge('in_flight', active)
+            self.metrics.set_gauge('retry_queue', len(retries))
+
+        async def finish(task: ChapterTask, result: DownloadResult) -> None:
+            now = loop.time()
+            result.elapsed = now - started.pop(task, now)
+            tried.pop(task, None)
+            result.book = task.book
+            self.metrics.inc('chapters_failed' if result.error else 'chapters_downloaded')
+            await on_result(result)
+
+        async def worker() -> None:
+            nonlocal active
+            while True:
+                job = retries.pop_ready() or next(jobs, None)
+                if job is None:
+                    wait_for = retries.next_ready_in()
+                    async with wake:
+                        if wait_for is None and active == 0:
+                            wake.notify_all()
+                            return
+                        # Another worker may still park a retry, or a backoff may elapse
+                        with contextlib.suppress(asyncio.TimeoutError):
+                            await asyncio.wait_for(wake.wait(), wait_for)
+                    continue
+
+                task, attempts, attempt_limit = job
+                if attempts == 0:
+                    started[task] = loop.time()
+                    if budget:
+                        budget.record_attempt()
+                active += 1
+                report_depths()
+                url = self.router.next_url(task.urls, tried.setdefault(task, []))
+                try:
+                    result = await self._download_once(session, task, url)
+                except Exception as e:
+                    # A bad page or a broken parse worker fails this attempt, not the run
+                    result = DownloadResult(
+                        chapter_number=task.chapter_number,
+                        content=None,
+                        validation=None,
+                        error=f"Unexpected error: {str(e)}"
+                    )
+                finally:
+                    active -= 1
+                    report_depths()
+                attempts += 1
+                result.attempts = attempts
+                failover = result.error is not None and self.router.untried(task.urls, tried[task])
+
+                if result.error is None or not (result.retryable or failover):
+                    await finish(task, result)
+                elif attempts < attempt_limit and (budget is None or budget.try_spend()):
+                    self.metrics.inc('mirror_failovers' if failover else 'retries')
+                    delay = 0.0 if failover else self.retry_policy.delay(attempts)
+                    retries.push((task, attempts, attempt_limit), delay)
+                elif dead_letters is not None:
+                    self.metrics.inc('dead_letters')
+                    dead_letters.append((task, attempts))
+                else:
+                    logger.warning("Chapter %d - All %d attempts failed. Last error: %s",
+                                   task.chapter_number, attempts, result.error)
+                    result.error = f"Failed after {attempts} attempts: {result.error}"
+                    await finish(task, result)
+                async with wake:
+                    wake.notify_all()
+
+        await asyncio.gather(*(worker() for _ in range(self.max_concurrency)))
+
+    async def _download_once(self, session: aiohttp.ClientSession, task: ChapterTask, url: str) -> DownloadResult:
+        """Make a single download attempt at url (one of the task's mirrors); retrying is left to the scheduler."""
+        chapter_number = task.chapter_number
+        loop = asyncio.get_running_loop()
+        fetch_start = loop.time()
+        try:
+            content = await self._fetch(session, url)
+        except _HTTPFailure as e:
+            logger.debug("Chapter %d - %s - status %s - %s", chapter_number, url, e.status, e.error)
+            retryable = self.retry_policy.is_retryable(e.status)
+            if retryable:
+                # Outages and throttling count against the mirror; a missing page does not
+                self.router.record(url, ok=False)
+            return DownloadResult(
+                chapter_number=chapter_number,
+                content=None,
+                validation=None,
+                error=e.error,
+                retryable=retryable
+            )
+
+        if not content or len(content.strip()) == 0:
+            self.router.record(url, ok=False)
+            return DownloadResult(
+                chapter_number=chapter_number,
+                content=None,
+                validation=None,
+                error=f"Empty or invalid content received for chapter {chapter_number}",
+                retryable=True
+            )
+
+        fetch_seconds = loop.time() - fetch_start
+        if self._parse_pool:
+            extraction = await self._extract_in_pool(content, chapter_number)
+        else:
+            extraction = self.extractor.extract(content, chapter_number)
+        validation = extraction.validation
+        self.router.record(url, ok=validation.is_valid, seconds=fetch_seconds)
+        if validation.is_valid:
+            return DownloadResult(
+                chapter_number=chapter_number,
+                content=extraction.chapter.content,
+                validation=validation,
+                error=None,
+                chapter=extraction.chapter
+            )
+        logger.info("Chapter %d - Validation failed: %s", chapter_number, validation.errors)
+        return DownloadResult(
+            chapter_number=chapter_number,
+            content=None,
+            validation=validation,
+            error=f"Content validation failed: {', '.join(validation.errors)}",
+            retryable=True
+        )
+
+    async def _extract_in_pool(self, content: str, chapter_number: int) -> ExtractionResult:
+        """Parse a page in the process pool, waiting for a free slot in the bounded handoff."""
+        async with self._parse_slots:
+            self._parsing += 1
+            self.metrics.set_gauge('parse_queue', self._parsing)
+            try:
+                extraction, seconds = await asyncio.get_running_loop().run_in_executor(
+                    self._parse_pool, extract_page, content, chapter_number
+                )
+            finally:
+                self._parsing -= 1
+                self.metrics.set_gauge('parse_queue', self._parsing)
+        self.metrics.observe('parse', seconds)
+        return extraction
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> str:
+        """
+        Single GET honouring the rate limiter and revalidating cached copies.
+
+        The cache's SQLite index and body files are read and written on worker
+        threads, so disk I/O never stalls the event loop.
+        """
+        cached = await asyncio.to_thread(self.http_cache.get, url) if self.http_cache else None
+        if cached and self.http_cache.is_fresh(cached):
+            self.metrics.inc('http_cache_hits')
+            return cached.body
+
+        status = None
+        try:
+            if self.rate_limiter:
+                with self.metrics.time('rate_limit_wait'):
+                    await self.rate_limiter.acquire_async(url)
+            with self.metrics.time('fetch'):
+                async with session.get(url, headers=HTTPCache.conditional_headers(cached)) as response:
+                    status = response.status
+                    self.metrics.record_status(status)
+                    if self.rate_limiter:
+                        self.rate_limiter.record(url, response.status, response.headers.get('Retry-After'))
+                    if response.status == 304 and cached:
+                        self.metrics.inc('http_cache_revalidated')
+                        await asyncio.to_thread(self.http_cache.refresh, url)
+                        return cached.body
+                    response.raise_for_status()
+                    self.metrics.inc('bytes_received', len(await response.read()))
+                    # Decodes the body read above; stray bytes become U+FFFD as with requests
+                    content = await response.text(errors='replace')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if status is None:
+                self.metrics.record_status(None)
+            raise _HTTPFailure(status, str(e) or type(e).__name__) from e
+
+        if self.http_cache:
+            await asyncio.to_thread(self.http_cache.store, url, content,
+                                    response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return content
+
+    def close(self) -> None:
+        """Sessions are scoped to a single run; stops the parse pool. The HTTP cache is left to its owner."""
+        if self._parse_pool:
+            self._parse_pool.shutdown(cancel_futures=True)
+            self._parse_pool = None
+
+class _HTTPFailure(Exception):
+    """A failed request, carrying the HTTP status (None for network errors)."""
+
+    def __init__(self, status: Optional[int], error: str):
+        super().__init__(error)
+        self.status = status
+        self.error = error
@@ -0,0 +1,117 @@
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple, TypeVar
+import yaml
+
+from src.utils.exporters import EXPORTERS
+
+T = TypeVar('T')
+
+FORMATS = ('html', *EXPORTERS)
+
+@dataclass
+class BatchJob:
+    """One book of a batch download."""
+    novel: str
+    start: int = 1
+    end: Optional[int] = None  # Latest chapter
+    formats: Tuple[str, ...] = ('html',)
+
+@dataclass
+class BookProgress:
+    """Where one book of a batch stands; reported after every chapter result."""
+    book: str
+    total: int  # Chapters to download in this run (after resume)
+    skipped: int = 0  # Requested chapters already stored by an earlier run
+    stored: int = 0
+    failed: int = 0
+    finished: bool = False  # All results are in and the output files are written
+    output: Optional[Path] = None
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def completed(self) -> int:
+        return self.stored + self.failed
+
+def load_jobs(path: Path, formats: Tuple[str, ...] = ('html',), end: Optional[int] = None) -> List[BatchJob]:
+    """
+    Read a batch file.
+
+    A .yaml/.yml file holds a list (optionally under 'books') whose items are
+    either a novel name or a mapping with novel, start, end and formats. Any
+    other file is plain text with one 'novel [start] [end]' per line; blank
+    lines and lines starting with '#' are ignored. formats and end are the
+    defaults for entries that do not give their own; without an end an entry
+    runs to the book's latest chapter. Raises ValueError for an unknown
+    format, so a typo fails before anything is downloaded.
+    """
+    path = Path(path)
+    _check_formats(formats, str(path))
+    jobs = []
+    if path.suffix in ('.yaml', '.yml'):
+        with open(path) as f:
+            data = yaml.safe_load(f) or []
+        if isinstance(data, dict):
+            data = data.get('books', [])
+        for entry in data:
+            if isinstance(entry, str):
+                entry = {'novel': entry}
+            entry_formats = entry.get('formats', formats)
+            if isinstance(entry_formats, str):
+                entry_formats = (entry_formats,)
+            _check_formats(entry_formats, f"{path}: {entry['novel']}")
+            jobs.append(BatchJob(
+                novel=str(entry['novel']),
+                start=int(entry.get('start', 1)),
+                end=int(entry['end']) if entry.get('end') is not None else end,
+                formats=tuple(entry_formats)
+            ))
+        return jobs
+
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            try:
+                numbers = [int(value) for value in fields[1:3]]
+            except ValueError:
+                raise ValueError(f"{path}:{line_number}: start and end must be numbers") from None
+            jobs.append(BatchJob(
+                novel=fields[0],
+                start=numbers[0] if numbers else 1,
+                end=numbers[1] if len(numbers) > 1 else end,
+                formats=formats
+            ))
+    return jobs
+
+def _check_formats(formats: Iterable[str], where: str) -> None:
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ValueError(f"{where}: unknown format {', '.join(map(repr, unknown))} "
+                         f"(choose from {', '.join(FORMATS)})")
+
+def round_robin(streams: Iterable[Iterator[T]], active: int = 0) -> Iterator[T]:
+    """
+    Interleave streams one item at a time.
+
+    At most `active` streams (0 = all) take turns; when one runs dry the next
+    waiting stream joins. Streams are pulled lazily, so a stream's setup work
+    only happens once it becomes active.
+    """
+    waiting = iter(streams)
+    ring: Deque[Iterator[T]] = deque()
+    while True:
+        while not active or len(ring) < active:
+            stream = next(waiting, None)
+            if stream is None:
+                break
+            ring.append(stream)
+        if not ring:
+            return
+        stream = ring.popleft()
+        for item in stream:
+            yield item
+            ring.append(stream)
+            break
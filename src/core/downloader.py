@@ -1,33 +1,90 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Optional, List, Tuple, Callable
-from pathlib import Path
-import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Optional, List, Tuple, Callable, Dict, Iterable, Iterator, NamedTuple, Sequence, Union
 from dataclasses import dataclass
-from queue import Queue, Empty
 import time
-import random
 
 from src.utils.html_fetcher import HTMLFetcher
-from src.utils.validator import ContentValidator, ValidationResult
+from src.utils.rate_limiter import RateLimiter
+from src.utils.retry import RetryPolicy, RetryBudget, DelayQueue
+from src.utils.validator import ValidationResult
+from src.utils.log import get_logger
+from src.utils.metrics import Metrics
+from src.utils.mirrors import MirrorRouter
+from src.core.parser import ParsedChapter
+from src.core.extractor import ChapterExtractor, ExtractionResult, extract_page, new_parse_pool
 from src.models.book import Book
 
+logger = get_logger(__name__)
+
 @dataclass
 class DownloadResult:
     chapter_number: int
     content: Optional[str]
     validation: Optional[ValidationResult]
     error: Optional[str] = None
+    chapter: Optional[ParsedChapter] = None  # Cleaned chapter; content holds its HTML
+    attempts: int = 0
+    retryable: bool = False  # Whether a failure is transient and worth another attempt
+    elapsed: float = 0.0  # Seconds from the first attempt to this final result
+    book: Optional[str] = None  # Book the chapter belongs to, as given in its ChapterTask
+
+class ChapterTask(NamedTuple):
+    """One chapter to download; book tells results apart when several books share a run."""
+    chapter_number: int
+    url: str
+    book: Optional[str] = None
+    mirrors: Tuple[str, ...] = ()  # The same chapter on other sites, in preference order
+    
+    @property
+    def urls(self) -> Tuple[str, ...]:
+        return (self.url, *self.mirrors)
 
 class ChapterDownloader:
     """Handles concurrent chapter downloads with validation and progress tracking."""
     
-    def __init__(self, max_workers: int = 5, max_retries: int = 3, chunk_size: int = 10):
+    def __init__(
+        self,
+        max_workers: int = 5,
+        max_retries: int = 3,
+        chunk_size: int = 10,
+        fetcher: Optional[HTMLFetcher] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics: Optional[Metrics] = None,
+        parse_workers: int = 0,
+        parse_queue: Optional[int] = None,
+        router: Optional[MirrorRouter] = None
+    ):
+        """
+        Args:
+            max_workers: Fetch threads
+            chunk_size: Chapters being fetched at once (at least max_workers)
+            parse_workers: Processes that validate and extract fetched pages
+                (0 = parse in the fetch threads, under the GIL)
+            parse_queue: Fetched pages allowed to wait for a parse worker before
+                fetching pauses (default: 2 * parse_workers)
+            router: Chooses between a task's mirrors and scores them by every
+                attempt's outcome
+        """
         self.max_workers = max_workers
-        self.max_retries = max_retries
-        self.chunk_size = chunk_size  # Process chapters in chunks to avoid memory issues
-        self.validator = ContentValidator()
-        self._progress_queue = Queue()
-        self._stop_event = threading.Event()
+        self.parse_workers = parse_workers
+        self.parse_queue = parse_queue or 2 * parse_workers
+        self._parse_pool = None
+        self.metrics = metrics or (fetcher.metrics if fetcher else Metrics())
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=max_retries)
+        self.max_retries = self.retry_policy.max_attempts
+        self.chunk_size = chunk_size  # Maximum chapters in flight, bounds memory use
+        # One fetcher shared by all workers so keep-alive connections are reused
+        # across chapters; its per-host pool is sized to the worker count.
+        self._owns_fetcher = fetcher is None
+        self.fetcher = fetcher or HTMLFetcher(
+            retry_policy=self.retry_policy,
+            pool_maxsize=max_workers,
+            rate_limiter=rate_limiter,
+            metrics=self.metrics
+        )
+        self.extractor = ChapterExtractor(metrics=self.metrics)
+        self.router = router or MirrorRouter()
     
     def download_chapters(
         self,
@@ -38,135 +95,281 @@ class ChapterDownloader:
         progress_callback: Optional[Callable] = None
     ) -> List[DownloadResult]:
         """
-        Download chapters concurrently using a worker pool pattern.
-        Implements chunking for better memory management and rate limiting.
+        Download chapters concurrently and return every result sorted by chapter.
+        Prefer iter_chapters for large ranges; this holds all results in memory.
         """
-        all_results = []
-        total_chapters = end_chapter - start_chapter + 1
+        results = self.iter_chapters(book, url_template, start_chapter, end_chapter, progress_callback)
+        return sorted(results, key=lambda x: x.chapter_number)
+    
+    def iter_chapters(
+        self,
+        book: Book,
+        url_template: str,
+        start_chapter: int,
+        end_chapter: int,
+        progress_callback: Optional[Callable] = None,
+        chapters: Optional[Sequence[int]] = None
+    ) -> Iterator[DownloadResult]:
+        """
+        Yield chapter results in completion order as soon as each one is final.
         
-        # Start progress monitoring if callback provided
-        if progress_callback:
-            progress_thread = threading.Thread(
-                target=self._monitor_progress,
-                args=(total_chapters, progress_callback)
-            )
-            progress_thread.daemon = True
-            progress_thread.start()
-
+        Downloads run on a sliding-window scheduler with at most chunk_size chapters
+        in flight, so a consumer that handles each result before asking for the next
+        keeps memory bounded by that window. Closing the generator early cancels
+        chapters that have not started yet. Pass chapters to download an explicit
+        set of chapter numbers (e.g. only the ones missing) instead of the range.
+        """
+        if chapters is None:
+            chapters = range(start_chapter, end_chapter + 1)
+        total_chapters = len(chapters)
+        completed = 0
+        tasks = (ChapterTask(n, url_template.format(chapter_number=n)) for n in chapters)
+        
+        for result in self.iter_tasks(tasks):
+            completed += 1
+            if progress_callback:
+                progress_callback(completed, total_chapters)
+            yield result
+    
+    def iter_tasks(self, tasks: Iterable[ChapterTask]) -> Iterator[DownloadResult]:
+        """
+        Like iter_chapters, for chapters of any number of books.
+        
+        tasks is consumed lazily, one task per free slot in the window, so its
+        order decides which chapters go next (see batch.round_robin). Each
+        result carries its task's book.
+        """
+        return self._run_window(tasks)
+    
+    def _run_window(self, tasks: Iterable[ChapterTask]) -> Iterator[DownloadResult]:
+        """
+        Yield final results in completion order from one long-lived thread pool.
+        
+        Every submission is a single attempt. A transient failure is parked in a
+        delay queue (while the run's retry budget lasts) and its worker moves on to
+        another chapter. Chapters still failing after the main pass get a
+        dead-letter pass once everything else is done.
+        """
+        dead_letters: List[Tuple[ChapterTask, int]] = []
+        started: Dict[ChapterTask, float] = {}
+        tried: Dict[ChapterTask, List[str]] = {}
+        jobs = ((task, 0, self.retry_policy.max_attempts) for task in tasks)
+        
+        if self.parse_workers and self._parse_pool is None:
+            self._parse_pool = new_parse_pool(self.parse_workers)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
         try:
-            # Process chapters in chunks to manage memory
-            for chunk_start in range(start_chapter, end_chapter + 1, self.chunk_size):
-                chunk_end = min(chunk_start + self.chunk_size - 1, end_chapter)
-                chunk_results = self._process_chapter_chunk(
-                    url_template, 
-                    chunk_start, 
-                    chunk_end
-                )
-                all_results.extend(chunk_results)
-
+            yield from self._schedule(executor, jobs, self.retry_policy.new_budget(), dead_letters, started, tried)
+            if dead_letters:
+                extra = self.retry_policy.dead_letter_attempts
+                jobs = ((task, attempts, attempts + extra) for task, attempts in dead_letters)
+                yield from self._schedule(executor, jobs, None, None, started, tried)
         finally:
-            # Cleanup
-            self._stop_event.set()
-            if progress_callback:
-                progress_thread.join(timeout=1.0)
-
-        return sorted(all_results, key=lambda x: x.chapter_number)
+            # Don't start queued chapters if the consumer stopped iterating early
+            executor.shutdown(wait=True, cancel_futures=True)
     
-    def _process_chapter_chunk(
-        self, 
-        url_template: str, 
-        start: int, 
-        end: int
-    ) -> List[DownloadResult]:
-        """Process a chunk of chapters using thread pool."""
-        results = []
+    def _schedule(
+        self,
+        executor: ThreadPoolExecutor,
+        jobs: Iterator[Tuple[ChapterTask, int, int]],
+        budget: Optional[RetryBudget],
+        dead_letters: Optional[List[Tuple[ChapterTask, int]]],
+        started: Dict[ChapterTask, float],
+        tried: Dict[ChapterTask, List[str]]
+    ) -> Iterator[DownloadResult]:
+        """
+        Sliding-window scheduler over (task, attempts, attempt_limit) jobs.
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_chapter = {
-                executor.submit(
-                    self._download_with_retry,
-                    url_template,
-                    chapter_num
-                ): chapter_num
-                for chapter_num in range(start, end + 1)
-            }
-
-            for future in as_completed(future_to_chapter):
+        A new job is submitted as soon as any in-flight one completes, so a slow
+        chapter only occupies its own worker instead of stalling the others. Retries
+        that have waited out their backoff take precedence over new chapters.
+        started maps tasks to the time of their first attempt, and tried to the
+        URLs of their attempts so far, across passes.
+        
+        A failed attempt of a task with mirrors is retried on a mirror not yet
+        tried for it, right away and even if the failure is not retryable on
+        the same site (e.g. a 404).
+        
+        With a parse pool, fetch threads only fetch: each fetched page moves to
+        the pool, and no new fetch starts while parse_queue pages are waiting
+        there, which bounds the pages held in memory.
+        """
+        window = max(self.chunk_size, self.max_workers)
+        retries = DelayQueue()
+        in_flight: Dict[Future, Tuple[ChapterTask, int, int]] = {}
+        parsing: Dict[Future, Tuple[ChapterTask, int, int]] = {}
+        fetch_seconds: Dict[ChapterTask, float] = {}  # Of pages waiting in the parse pool
+        fetch = self._fetch_page if self._parse_pool else self._download_once
+        
+        def fill() -> None:
+            while len(in_flight) < window and (not self._parse_pool or len(parsing) < self.parse_queue):
+                job = retries.pop_ready() or next(jobs, None)
+                if job is None:
+                    return
+                task, attempts, _ = job
+                if attempts == 0:
+                    started[task] = time.monotonic()
+                    if budget:
+                        budget.record_attempt()
+                url = self.router.next_url(task.urls, tried.setdefault(task, []))
+                future = executor.submit(fetch, task, url, attempts + 1)
+                in_flight[future] = job
+        
+        def report_depths() -> None:
+            self.metrics.set_gauge('in_flight', len(in_flight))
+            self.metrics.set_gauge('retry_queue', len(retries))
+            if self._parse_pool:
+                self.metrics.set_gauge('parse_queue', len(parsing))
+        
+        fill()
+        report_depths()
+        while in_flight or parsing or len(retries):
+            if not in_flight and not parsing:
+                # Nothing can run until a backoff elapses; only the scheduler waits
+                time.sleep(retries.next_ready_in())
+                fill()
+                report_depths()
+                continue
+            
+            done, _ = wait(
+                [*in_flight, *parsing], timeout=retries.next_ready_in(), return_when=FIRST_COMPLETED
+            )
+            finished: List[Tuple[ChapterTask, DownloadResult]] = []
+            for future in done:
+                parsed = future in parsing
+                job = parsing.pop(future) if parsed else in_flight.pop(future)
+                task, attempts, attempt_limit = job
                 try:
-                    result = future.result()
-                    results.append(result)
-                    self._progress_queue.put(1)
+                    if parsed:
+                        extraction, seconds = future.result()
+                        self.metrics.observe('parse', seconds)
+                        result = self._result_from(extraction, task.chapter_number, attempts + 1)
+                        self.router.record(tried[task][-1], ok=result.error is None, seconds=fetch_seconds.pop(task))
+                    elif isinstance(page := future.result(), tuple):
+                        # Fetched; the attempt completes once a parse worker is done with it
+                        html, fetch_seconds[task] = page
+                        parsing[self._parse_pool.submit(extract_page, html, task.chapter_number)] = job
+                        continue
+                    else:
+                        result = page
                 except Exception as e:
-                    chapter_num = future_to_chapter[future]
-                    results.append(DownloadResult(
-                        chapter_number=chapter_num,
+                    fetch_seconds.pop(task, None)
+                    result = DownloadResult(
+                        chapter_number=task.chapter_number,
                         content=None,
                         validation=None,
-                        error=f"Unexpected error: {str(e)}"
-                    ))
-                    self._progress_queue.put(1)
-
-        return results
+                        error=f"Unexpected error: {str(e)}",
+                        attempts=attempts + 1
+                    )
+                attempts += 1
+                failover = result.error is not None and self.router.untried(task.urls, tried[task])
+                
+                if result.error is None or not (result.retryable or failover):
+                    finished.append((task, result))
+                elif attempts < attempt_limit and (budget is None or budget.try_spend()):
+                    self.metrics.inc('mirror_failovers' if failover else 'retries')
+                    delay = 0.0 if failover else self.retry_policy.delay(attempts)
+                    retries.push((task, attempts, attempt_limit), delay)
+                elif dead_letters is not None:
+                    self.metrics.inc('dead_letters')
+                    dead_letters.append((task, attempts))
+                else:
+                    logger.warning("Chapter %d - All %d attempts failed. Last error: %s",
+                                   task.chapter_number, attempts, result.error)
+                    result.error = f"Failed after {attempts} attempts: {result.error}"
+                    finished.append((task, result))
+            
+            now = time.monotonic()
+            for task, result in finished:
+                result.elapsed = now - started.pop(task, now)
+                tried.pop(task, None)
+                result.book = task.book
+                self.metrics.inc('chapters_failed' if result.error else 'chapters_downloaded')
+            
+            # Refill before handing results out so workers never wait on the consumer
+            fill()
+            report_depths()
+            for _, result in finished:
+                yield result
     
-    def _download_with_retry(
-        self,
-        url_template: str,
-        chapter_number: int,
-    ) -> DownloadResult:
-        """Download a single chapter with exponential backoff retry logic."""
-        last_error = None
+    def _download_once(self, task: ChapterTask, url: str, attempt: int) -> DownloadResult:
+        """Make a single download attempt at url; retrying is left to the scheduler."""
+        page = self._fetch_page(task, url, attempt)
+        if isinstance(page, DownloadResult):
+            return page
+        html, seconds = page
+        result = self._result_from(self.extractor.extract(html, task.chapter_number), task.chapter_number, attempt)
+        self.router.record(url, ok=result.error is None, seconds=seconds)
+        return result
+    
+    def _fetch_page(self, task: ChapterTask, url: str, attempt: int) -> Union[Tuple[str, float], DownloadResult]:
+        """
+        Fetch a chapter page from url (one of the task's mirrors).
         
-        for attempt in range(self.max_retries):
-            try:
-                with HTMLFetcher() as fetcher:
-                    url = url_template.format(chapter_number=chapter_number)
-                    content = fetcher.fetch(url)
-                    
-                    # Debug logging
-                    print(f"Chapter {chapter_number} - Content received: {bool(content)} - Length: {len(content) if content else 0}")
-                    
-                    if not content or len(content.strip()) == 0:
-                        raise ValueError(f"Empty or invalid content received for chapter {chapter_number}")
-                    
-                    validation = self.validator.validate_chapter(content, chapter_number)
-                    
-                    # Debug validation results
-                    if validation.is_valid:
-                        print(f"Chapter {chapter_number} - Validation successful")
-                        return DownloadResult(
-                            chapter_number=chapter_number,
-                            content=content,
-                            validation=validation,
-                            error=None  # Explicitly set to None for successful downloads
-                        )
-                    else:
-                        print(f"Chapter {chapter_number} - Validation failed: {validation.errors}")
-                        last_error = f"Content validation failed: {', '.join(validation.errors)}"
-                    
-            except Exception as e:
-                print(f"Chapter {chapter_number} - Attempt {attempt + 1} failed: {str(e)}")
-                last_error = str(e)
-            
-            # Exponential backoff with jitter
-            delay = (2 ** attempt) + (random.random() * 0.1)
-            time.sleep(delay)
+        Returns the page's HTML and fetch seconds, or the failed result. A fetched
+        page's outcome is recorded with the router once it has been validated.
+        """
+        chapter_number = task.chapter_number
+        fetch_start = time.monotonic()
+        response = self.fetcher.get(url)
+        content = response.text
+        logger.debug("Chapter %d - attempt %d - %s - status %s - %d chars",
+                     chapter_number, attempt, url, response.status, len(content) if content else 0)
+        
+        if not response.ok:
+            retryable = self.retry_policy.is_retryable(response.status)
+            if retryable:
+                # Outages and throttling count against the mirror; a missing page does not
+                self.router.record(url, ok=False)
+            return DownloadResult(
+                chapter_number=chapter_number,
+                content=None,
+                validation=None,
+                error=response.error,
+                attempts=attempt,
+                retryable=retryable
+            )
+        
+        if len(content.strip()) == 0:
+            self.router.record(url, ok=False)
+            return DownloadResult(
+                chapter_number=chapter_number,
+                content=None,
+                validation=None,
+                error=f"Empty or invalid content received for chapter {chapter_number}",
+                attempts=attempt,
+                retryable=True
+            )
+        return content, time.monotonic() - fetch_start
+    
+    def _result_from(self, extraction: ExtractionResult, chapter_number: int, attempt: int) -> DownloadResult:
+        """Turn a parsed page into the attempt's result."""
+        validation = extraction.validation
+        if validation.is_valid:
+            return DownloadResult(
+                chapter_number=chapter_number,
+                content=extraction.chapter.content,  # Only the extracted chapter, not the raw page
+                validation=validation,
+                error=None,  # Explicitly set to None for successful downloads
+                chapter=extraction.chapter,
+                attempts=attempt
+            )
         
-        # If we get here, all attempts failed
-        print(f"Chapter {chapter_number} - All attempts failed. Last error: {last_error}")
+        logger.info("Chapter %d - Validation failed: %s", chapter_number, validation.errors)
+        # Truncated or partially rendered pages usually succeed on a later attempt
         return DownloadResult(
             chapter_number=chapter_number,
             content=None,
-            validation=None,
-            error=f"Failed after {self.max_retries} attempts: {last_error}"
+            validation=validation,
+            error=f"Content validation failed: {', '.join(validation.errors)}",
+            attempts=attempt,
+            retryable=True
         )
     
-    def _monitor_progress(self, total_chapters: int, callback: Callable) -> None:
-        """Monitor and report download progress."""
-        completed = 0
-        
-        while not self._stop_event.is_set() and completed < total_chapters:
-            try:
-                completed += self._progress_queue.get(timeout=0.1)
-                callback(completed, total_chapters)
-            except Empty:
-                continue
+    def close(self) -> None:
+        """Stop the parse pool, and release pooled connections if this downloader created its own fetcher."""
+        if self._parse_pool:
+            self._parse_pool.shutdown(cancel_futures=True)
+            self._parse_pool = None
+        if self._owns_fetcher:
+            self.fetcher.close()
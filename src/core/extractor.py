@@ -0,0 +1,88 @@
+from typing import Optional, Tuple
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import time
+from bs4 import BeautifulSoup
+
+from src.core.parser import HTMLParser, ParsedChapter
+from src.utils.validator import ContentValidator, ValidationResult
+from src.utils.metrics import Metrics
+
+@dataclass
+class ExtractionResult:
+    """Cleaned chapter and validation outcome produced from a single parse."""
+    chapter: Optional[ParsedChapter]
+    validation: ValidationResult
+
+class ChapterExtractor:
+    """Parses a chapter page once with lxml and runs validation and extraction on the same tree."""
+    
+    def __init__(
+        self,
+        parser: Optional[HTMLParser] = None,
+        validator: Optional[ContentValidator] = None,
+        metrics: Optional[Metrics] = None
+    ):
+        self.parser = parser or HTMLParser()
+        self.validator = validator or ContentValidator()
+        self.metrics = metrics or Metrics()
+    
+    def extract(self, html: str, chapter_number: int) -> ExtractionResult:
+        """Validate the page and, if it is valid, extract the cleaned chapter."""
+        try:
+            with self.metrics.time('parse'):
+                soup = BeautifulSoup(html, 'lxml')
+        except Exception as e:
+            return ExtractionResult(
+                chapter=None,
+                validation=ValidationResult(is_valid=False, errors=[f"Parse error: {str(e)}"], warnings=[])
+            )
+        
+        with self.metrics.time('validate'):
+            validation = self.validator.validate_soup(soup, chapter_number)
+        if not validation.is_valid:
+            return ExtractionResult(chapter=None, validation=validation)
+        
+        with self.metrics.time('extract'):
+            chapter = self.parser.parse_chapter_soup(soup, chapter_number)
+        if chapter is None:
+            validation.is_valid = False
+            validation.errors.append("Chapter content could not be extracted")
+        return ExtractionResult(chapter=chapter, validation=validation)
+
+# Per-process extractor for parse pool workers
+_worker_extractor: Optional[ChapterExtractor] = None
+
+def extract_page(html: str, chapter_number: int) -> Tuple[ExtractionResult, float]:
+    """
+    ChapterExtractor.extract for a parse pool worker process.
+
+    Returns the result and the seconds spent, since the worker's own metrics
+    never reach the parent process.
+    """
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = ChapterExtractor()
+    start = time.perf_counter()
+    extraction = _worker_extractor.extract(html, chapter_number)
+    return extraction, time.perf_counter() - start
+
+def new_parse_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool for extract_page.
+
+    Workers come from a fork server (spawn where unavailable) rather than a
+    fork of the downloading process, which has fetch threads running.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # Workers then fork from a server that has already imported bs4 and lxml
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    # Start the workers now so their startup overlaps the first fetches
+    for _ in range(workers):
+        pool.submit(int)
+    return pool
@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import os
+import socket
+import threading
+
+from src.core.downloader import ChapterDownloader, ChapterTask
+from src.core.async_downloader import AsyncChapterDownloader
+from src.utils.lease_queue import LeaseQueue, Lease
+from src.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+@dataclass
+class WorkerStats:
+    """What a LeaseWorker has done so far."""
+    claimed: int = 0
+    completed: int = 0
+    failed: int = 0
+    duplicates: int = 0  # Chapters another worker had already completed
+
+class LeaseWorker:
+    """
+    Downloads chapters leased from a shared LeaseQueue.
+
+    Leases are claimed in batches and fed to the downloader as ChapterTasks,
+    so fetching, retries and validation work exactly as for a local download,
+    with this node's own connection pool and rate limits; a chapter that still
+    fails after that is given up rather than handed back. Leases still being
+    worked on are renewed every third of their length; a worker that dies simply
+    lets its leases expire and another worker picks them up.
+    """
+
+    def __init__(
+        self,
+        queue: LeaseQueue,
+        downloader: Union[ChapterDownloader, AsyncChapterDownloader],
+        batch_size: int = 20,
+        lease_seconds: float = 120.0,
+        worker_id: Optional[str] = None
+    ):
+        """
+        Args:
+            queue: Shared lease queue
+            downloader: Engine that downloads the leased chapters
+            batch_size: Leases claimed at a time; keep it near the worker count
+                so chapters are not held away from other nodes
+            lease_seconds: Lease length; a chapter is reassigned this long after
+                its worker stops renewing it
+            worker_id: Owner name recorded on leases (default: host:pid)
+        """
+        self.queue = queue
+        self.downloader = downloader
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = WorkerStats()
+        self._stop = threading.Event()
+
+    def run(
+        self,
+        forever: bool = False,
+        poll_interval: float = 5.0,
+        on_batch: Optional[Callable[[WorkerStats], None]] = None
+    ) -> WorkerStats:
+        """
+        Work until the queue has nothing pending or leased (or until stop()).
+
+        With forever, keep polling for new jobs instead of returning. Leases held
+        by other workers keep this one waiting, so it can take over if they expire.
+        """
+        while not self._stop.is_set():
+            leases = self.queue.claim(self.worker_id, self.batch_size, self.lease_seconds)
+            if leases:
+                self._work(leases)
+                if on_batch:
+                    on_batch(self.stats)
+                continue
+            progress = self.queue.progress()
+            if not forever and not progress['pending'] and not progress['leased']:
+                break
+            self._stop.wait(poll_interval)
+        return self.stats
+
+    def stop(self) -> None:
+        """Finish the current batch and return from run()."""
+        self._stop.set()
+
+    def _work(self, leases: List[Lease]) -> None:
+        self.stats.claimed += len(leases)
+        # Results come back as (book, chapter_number); the job id stands in for
+        # the book, as a job holds each chapter once
+        held: Dict[Tuple[str, int], Lease] = {(str(lease.job), lease.chapter_number): lease for lease in leases}
+        held_lock = threading.Lock()
+        done = threading.Event()
+
+        def renew() -> None:
+            # Backoffs can keep a batch busy without results, so renew on a timer
+            while not done.wait(self.lease_seconds / 3):
+                with held_lock:
+                    lease_ids = [lease.id for lease in held.values()]
+                if lease_ids:
+                    self.queue.renew(self.worker_id, lease_ids, self.lease_seconds)
+
+        renewer = threading.Thread(target=renew, daemon=True)
+        renewer.start()
+        tasks = [ChapterTask(chapter_number, lease.url, book) for (book, chapter_number), lease in held.items()]
+        try:
+            for result in self.downloader.iter_tasks(tasks):
+                with held_lock:
+                    lease = held.pop((result.book, result.chapter_number))
+                if result.error is None and result.content:
+                    if self.queue.complete(lease.id, result.content):
+                        self.stats.completed += 1
+                    else:
+                        self.stats.duplicates += 1
+                else:
+                    logger.warning("Lease %d (chapter %d) failed: %s", lease.id, lease.chapter_number, result.error)
+                    # The downloader has already spent its retries and dead-letter pass
+                    # on the chapter, so re-queueing it would multiply them by the
+                    # queue's attempts; those are left for leases lost with their worker
+                    self.queue.fail(self.worker_id, lease.id, result.error or "No content", retryable=False)
+                    self.stats.failed += 1
+        finally:
+            done.set()
+            renewer.join()
@@ -1,6 +1,14 @@
 from typing import Optional, List, Tuple
 from bs4 import BeautifulSoup
 from dataclasses import dataclass
+from html import escape
+import re
+from src.utils.search_index import SearchEntry
+from src.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+PAGE_NUMBER = re.compile(r'[?&]page=(\d+)')
 
 @dataclass
 class ParsedChapter:
@@ -18,30 +26,32 @@ class HTMLParser:
     def parse_chapter(self, html: str, chapter_number: int) -> Optional[ParsedChapter]:
         """Parse chapter content from HTML."""
         try:
-            soup = BeautifulSoup(html, 'lxml')
-            content_div = soup.find('div', id=self.content_id)
-            
-            if not content_div:
-                print(f"Could not find content div for chapter {chapter_number}")
-                return None
-            
-            # Extract title
-            title_tag = content_div.find(['h2', 'h3'])
-            title = title_tag.text if title_tag else f"Chapter {chapter_number}"
-            
-            # Extract paragraphs
-            paragraphs = []
-            for p in content_div.find_all('p'):
-                text = p.text.strip()
-                if text:
-                    paragraphs.append(f"<p>{text}</p>")
-            
-            content = f"<h1>{title}</h1>\n" + "\n".join(paragraphs)
-            return ParsedChapter(title=title, content=content, chapter_number=chapter_number)
-            
+            return self.parse_chapter_soup(BeautifulSoup(html, 'lxml'), chapter_number)
         except Exception as e:
-            print(f"Error parsing chapter {chapter_number}: {str(e)}")
+            logger.warning("Error parsing chapter %d: %s", chapter_number, e)
+            return None
+    
+    def parse_chapter_soup(self, soup: BeautifulSoup, chapter_number: int) -> Optional[ParsedChapter]:
+        """Extract the cleaned chapter from an already parsed page."""
+        content_div = soup.find('div', id=self.content_id)
+        
+        if not content_div:
+            logger.debug("Could not find content div for chapter %d", chapter_number)
             return None
+        
+        # Extract title
+        title_tag = content_div.find(['h2', 'h3'])
+        title = title_tag.text.strip() if title_tag else f"Chapter {chapter_number}"
+        
+        # Extract paragraphs
+        paragraphs = []
+        for p in content_div.find_all('p'):
+            text = p.text.strip()
+            if text:
+                paragraphs.append(f"<p>{escape(text)}</p>")
+        
+        content = f"<h1>{escape(title)}</h1>\n" + "\n".join(paragraphs)
+        return ParsedChapter(title=title, content=content, chapter_number=chapter_number)
     
     def parse_hot_novels(self, html: str) -> List[Tuple[str, str]]:
         """Parse hot novels list from HTML."""
@@ -55,12 +65,50 @@ class HTMLParser:
                     url = link.get('href', '')
                     novels.append((title, url))
         except Exception as e:
-            print(f"Error parsing hot novels list: {str(e)}")
+            logger.warning("Error parsing hot novels list: %s", e)
         
         return novels
     
+    def parse_chapter_list(self, html: str) -> List[Tuple[str, str]]:
+        """Parse (title, url) of every chapter listed on a page of a book's table of contents."""
+        chapters = []
+        try:
+            soup = BeautifulSoup(html, 'lxml')
+            for chapter_list in soup.find_all('ul', class_='list-chapter'):
+                for link in chapter_list.select('li a[href]'):
+                    chapters.append((link.get('title') or link.text.strip(), link['href']))
+        except Exception as e:
+            logger.warning("Error parsing chapter list: %s", e)
+        
+        return chapters
+    
+    def parse_last_page(self, html: str) -> Optional[int]:
+        """Read the last page number from a listing's pagination control, if present."""
+        try:
+            soup = BeautifulSoup(html, 'lxml')
+            pagination = soup.find('ul', class_='pagination')
+            if not pagination:
+                return None
+            
+            # Prefer the explicit "Last" link, otherwise the highest page linked
+            last = pagination.find('li', class_='last')
+            links = last.find_all('a') if last else pagination.find_all('a')
+            pages = [
+                int(match.group(1))
+                for link in links
+                if (match := PAGE_NUMBER.search(link.get('href', '')))
+            ]
+            return max(pages) if pages else None
+        except Exception as e:
+            logger.warning("Error parsing pagination: %s", e)
+            return None
+    
     def parse_search_results(self, html_content: str) -> List[Tuple[str, str, str]]:
         """Parse search results from HTML content."""
+        return [entry_to_result(entry) for entry in self.parse_search_entries(html_content)]
+    
+    def parse_search_entries(self, html_content: str) -> List[SearchEntry]:
+        """Parse search results into structured entries (title, url, author, excerpt)."""
         results = []
         soup = BeautifulSoup(html_content, 'lxml')
         
@@ -83,16 +131,21 @@ class HTMLParser:
                 continue
             
             desc_elem = row.find("div", class_="excerpt")
-            description = desc_elem.text.strip() if desc_elem else "No description available"
+            description = desc_elem.text.strip() if desc_elem else None
             
             author_elem = row.find("span", class_="author")
-            if author_elem:
-                author = author_elem.text.strip()
-                description = f"Author: {author}\n{description}"
+            author = author_elem.text.strip() if author_elem else None
             
             if not href.startswith("http"):
                 href = f"https://novelfull.net{href}"
             
-            results.append((title, href, description))
+            results.append(SearchEntry(title=title, url=href, author=author, description=description))
         
         return results
+
+def entry_to_result(entry: SearchEntry) -> Tuple[str, str, str]:
+    """The (title, url, description) tuple search results are displayed as."""
+    description = entry.description or "No description available"
+    if entry.author:
+        description = f"Author: {entry.author}\n{description}"
+    return (entry.title, entry.url, description)
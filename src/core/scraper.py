@@ -1,121 +1,668 @@
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import itertools
+import time
+from urllib.parse import urljoin, urlparse
 from tqdm import tqdm
 
 from src.models.book import Book
 from src.utils.url_builder import URLBuilder
 from src.utils.html_fetcher import HTMLFetcher
+from src.utils.rate_limiter import RateLimiter
+from src.utils.retry import RetryPolicy
+from src.utils.http_cache import HTTPCache
 from src.utils.file_handler import FileHandler
-from src.core.parser import HTMLParser, ParsedChapter
-from src.core.downloader import ChapterDownloader
+from src.utils.exporters import EXPORTERS
+from src.utils.search_index import SearchEntry
+from src.utils.journal import ChapterJournal, FETCHED, VALIDATED, STORED, FAILED
+from src.utils.log import get_logger
+from src.utils.metrics import Metrics
+from src.utils.mirrors import MirrorRouter
+from src.utils.lease_queue import LeaseQueue
+from src.utils.chapter_list import ChapterList
+from src.core.parser import HTMLParser, ParsedChapter, entry_to_result
+from src.core.downloader import ChapterDownloader, ChapterTask, DownloadResult
+from src.core.async_downloader import AsyncChapterDownloader
+from src.core.batch import BatchJob, BookProgress, round_robin
 from src.utils.cache import cached
 
+logger = get_logger(__name__)
+
+DEFAULT_END_CHAPTER = 50  # For books whose chapter list cannot be read
+
 class BookScraper:
     """Main scraper class that coordinates all components."""
     
-    def __init__(self, output_dir: Path, max_workers: int = 5):
+    ENGINES = ('thread', 'async')
+    
+    def __init__(
+        self,
+        output_dir: Path,
+        max_workers: int = 5,
+        engine: str = 'thread',
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        http_cache_bytes: int = 512 * 1024 * 1024,
+        cache_ttl: Optional[int] = None,
+        metrics: Optional[Metrics] = None,
+        parse_workers: int = 0,
+        mirrors: Sequence[str] = ('novelfull',)
+    ):
+        """
+        Args:
+            output_dir: Library directory
+            max_workers: Worker threads ('thread') or in-flight requests ('async')
+            engine: Chapter download engine, one of ENGINES
+            rate_limiter: Per-host limiter shared by every request (see RateLimiter.from_config)
+            retry_policy: The one retry policy for fetches and chapter downloads
+            http_cache_bytes: Size cap of the conditional-request cache (0 disables it)
+            cache_ttl: Seconds search, hot-list and chapter-list results are cached (default: 1 hour)
+            metrics: Shared by every component of the run (default: a fresh Metrics)
+            parse_workers: Processes that parse chapter pages while max_workers
+                keep fetching (0 = parse in the fetching workers)
+            mirrors: Sites (URLBuilder template names) to download chapters from,
+                in preference order; a chapter that fails on one is retried on
+                the next, and routing follows each site's health and latency
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown download engine: {engine}")
+        if not mirrors:
+            raise ValueError("At least one mirror is required")
+        
         self.file_handler = FileHandler(output_dir)
+        self.max_workers = max_workers
+        self.cache_ttl = cache_ttl
+        self.metrics = metrics or Metrics()
         self.url_builder = URLBuilder()
+        self.mirrors = tuple(mirrors)
+        self.router = MirrorRouter()
         self.parser = HTMLParser()
-        self.downloader = ChapterDownloader(max_workers=max_workers)
-        self.novels: List[Book] = self.file_handler.load_books()
+        retry_policy = retry_policy or RetryPolicy()
+        http_cache = None
+        if http_cache_bytes:
+            http_cache = HTTPCache(self.file_handler.base_path / '.cache' / 'http', max_bytes=http_cache_bytes)
+        # Shared by search, hot-list and chapter downloads so every request
+        # reuses the same keep-alive connection pool.
+        self.fetcher = HTMLFetcher(
+            retry_policy=retry_policy,
+            pool_maxsize=max_workers,
+            rate_limiter=rate_limiter,
+            http_cache=http_cache,
+            metrics=self.metrics
+        )
+        if engine == 'async':
+            self.downloader = AsyncChapterDownloader(
+                max_concurrency=max_workers,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+                http_cache=http_cache,
+                metrics=self.metrics,
+                parse_workers=parse_workers,
+                router=self.router
+            )
+        else:
+            self.downloader = ChapterDownloader(
+                max_workers=max_workers,
+                fetcher=self.fetcher,
+                retry_policy=retry_policy,
+                metrics=self.metrics,
+                parse_workers=parse_workers,
+                router=self.router
+            )
+    
+    @property
+    def novels(self) -> List[Book]:
+        """Every book in the library catalog."""
+        return self.file_handler.load_books()
     
-    # @cached(ttl=3600)  # Cache search results for 1 hour
+    @cached(ttl=3600)  # Cache search results for 1 hour
     def search_novels(self, query: str) -> List[Tuple[str, str, str]]:
-        """Search for novels matching query."""
+        """Search for novels matching query, adding the results to the local search index."""
         search_url = self.url_builder.get_search_url(query)
         
-        with HTMLFetcher() as fetcher:
-            content = fetcher.fetch(search_url)
-            if not content:
-                return []
-            
-            results = self.parser.parse_search_results(content)
-            return results
-
-        return []
+        content = self.fetcher.fetch(search_url)
+        if not content:
+            return []
+        
+        entries = self.parser.parse_search_entries(content)
+        self.file_handler.search_index.add(entries)
+        return [entry_to_result(entry) for entry in entries]
+    
+    def search_local(self, query: str, limit: int = 10) -> List[Tuple[str, str, str]]:
+        """Search the local index of every novel seen so far, without touching the network."""
+        return [entry_to_result(entry) for entry in self.file_handler.search_index.search(query, limit)]
 
-    # @cached(ttl=3600)  # Cache hot novels for 1 hour
     def get_hot_novels(self) -> List[Book]:
         """Fetch and update the list of hot novels."""
-        page = 1
-        new_novels = []
-        previous_page_novels = None
-        
-        with HTMLFetcher() as fetcher:
-            while True:
-                url = self.url_builder.get_hot_novels_url(page)
-                if not (html := fetcher.fetch(url)):
-                    break
-                
-                novels = self.parser.parse_hot_novels(html)
-                
-                # Break if no novels found or if we got the same novels as previous page
-                if not novels or novels == previous_page_novels:
-                    break
-                    
-                new_novels.extend(novels)
-                previous_page_novels = novels
-                page += 1
+        new_novels = self._fetch_hot_novel_list()
         
         # Convert to Book objects
-        self.novels = [
+        novels = [
             Book(title=title, folder_path=self.file_handler.base_path / title.lower().replace(' ', '-'))
             for title, _ in new_novels
         ]
         
-        self.file_handler.save_books(self.novels)
-        return self.novels
+        # Downloaded chapters of books already in the library are kept
+        self.file_handler.save_books(novels, keep_chapters=True)
+        listing_url = self.url_builder.get_hot_novels_url(1)
+        self.file_handler.search_index.add(
+            SearchEntry(title=title, url=urljoin(listing_url, url)) for title, url in new_novels
+        )
+        return novels
     
-    def download_book(self, book_name: str, start_chapter: int = 1, end_chapter: int = 50) -> Optional[Path]:
-        """Download a book's chapters and combine them into a single file."""
-        book_name = book_name.lower().replace(' ', '-')
+    @cached(ttl=3600)  # Cache hot novels for 1 hour
+    def _fetch_hot_novel_list(self) -> List[Tuple[str, str]]:
+        """
+        Crawl the hot-list pages and return (title, url) pairs.
+        
+        Page 1's pagination control gives the last page, and the remaining pages
+        are fetched concurrently over the shared pool. Without it the pages are
+        walked one at a time until one comes back empty.
+        """
+        if not (first_page := self.fetcher.fetch(self.url_builder.get_hot_novels_url(1))):
+            return []
+        
+        last_page = self.parser.parse_last_page(first_page)
+        if last_page is None:
+            pages = self._walk_hot_pages(first_page)
+        else:
+            pages = itertools.chain([first_page], self._fetch_pages(
+                [self.url_builder.get_hot_novels_url(page) for page in range(2, last_page + 1)]
+            ))
         
-        # Create or get book
-        book = next((b for b in self.novels if b.formatted_title == book_name), None)
+        new_novels = []
+        previous_page_novels = None
+        for html in pages:
+            novels = self.parser.parse_hot_novels(html) if html else None
+            
+            # Stop if no novels found or if we got the same novels as previous page
+            if not novels or novels == previous_page_novels:
+                break
+            
+            new_novels.extend(novels)
+            previous_page_novels = novels
+        
+        return new_novels
+    
+    def _fetch_pages(self, urls: List[str]) -> List[Optional[str]]:
+        """Fetch listing pages concurrently over the shared pool, returned in order."""
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            return list(executor.map(self.fetcher.fetch, urls))
+    
+    def _walk_hot_pages(self, first_page: str) -> Iterator[Optional[str]]:
+        """Sequential fallback for listings without a pagination control."""
+        yield first_page
+        page = 2
+        while html := self.fetcher.fetch(self.url_builder.get_hot_novels_url(page)):
+            yield html
+            page += 1
+    
+    def get_book(self, book_name: str) -> Book:
+        """Return the library entry for a book, creating it if it is new."""
+        book_name = book_name.lower().replace(' ', '-')
+        book = self.file_handler.get_book(book_name)
         if not book:
             book = Book(
                 title=book_name,
                 folder_path=self.file_handler.base_path / book_name
             )
-            self.novels.append(book)
+        return book
+    
+    def get_chapter_list(
+        self,
+        book: Book,
+        at_least: Optional[int] = None,
+        refresh: bool = False
+    ) -> Optional[ChapterList]:
+        """
+        The book's table of contents, from its cache if younger than cache_ttl.
         
-        # Setup progress bar
-        pbar = tqdm(total=(end_chapter - start_chapter + 1), desc=f"Downloading {book_name}")
-        
-        def update_progress(completed: int, total: int):
-            pbar.n = completed
-            pbar.refresh()
-        
-        # Download chapters
-        results = self.downloader.download_chapters(
-            book,
-            self.url_builder.get_chapter_url(book_name, "{chapter_number}"),
-            start_chapter,
-            end_chapter,
-            progress_callback=update_progress
+        A stale cache, one listing fewer than at_least chapters, or any cache with
+        refresh, is brought up to date by re-reading its last page, whose
+        pagination also shows whether pages were added; only those new pages are
+        fetched after it. A book seen for the first time costs one request per
+        page, fetched concurrently.
+        Returns None if the site has no chapter list for the book.
+        """
+        cached = self.file_handler.load_chapter_list(book)
+        if (cached and not refresh and cached.is_fresh(self.cache_ttl or 3600)
+                and (at_least is None or cached.latest >= at_least)):
+            return cached
+        
+        chapter_list = self._fetch_chapter_list(book, cached)
+        if chapter_list is None:
+            # An outdated list still beats guessing chapter URLs
+            return cached
+        self.file_handler.save_chapter_list(book, chapter_list)
+        return chapter_list
+    
+    def _fetch_chapter_list(self, book: Book, cached: Optional[ChapterList]) -> Optional[ChapterList]:
+        """Read the chapter list pages, from the cached list's last page on if there is one."""
+        slug = book.formatted_title
+        first_page = cached.last_page if cached else 1
+        first_url = self.url_builder.get_book_url(slug, first_page)
+        if not (html := self.fetcher.fetch(first_url)):
+            return None
+        
+        # On the last page the pagination only links back, so never go below it
+        last_page = max(self.parser.parse_last_page(html) or first_page, first_page)
+        urls = [self.url_builder.get_book_url(slug, page) for page in range(first_page + 1, last_page + 1)]
+        pages = [(first_url, html)] + list(zip(urls, self._fetch_pages(urls)))
+        
+        entries = list(cached.entries[:cached.last_page_start]) if cached else []
+        last_page_start = len(entries)
+        for page_url, page_html in pages:
+            page_entries = self.parser.parse_chapter_list(page_html) if page_html else []
+            if not page_entries:
+                # A missing page would shift every later chapter number
+                logger.warning("Could not read chapter list page %s", page_url)
+                return None
+            last_page_start = len(entries)
+            entries.extend((title, urljoin(page_url, url)) for title, url in page_entries)
+        
+        return ChapterList(
+            entries=entries,
+            last_page=last_page,
+            last_page_start=last_page_start,
+            fetched_at=time.time()
         )
+    
+    def _plan_chapters(
+        self,
+        book: Book,
+        start_chapter: int,
+        end_chapter: Optional[int]
+    ) -> Tuple[range, Optional[ChapterList]]:
+        """
+        The requested chapters that exist, and the chapter list to take their URLs from.
         
-        pbar.close()
+        end_chapter defaults to the latest chapter, and chapters past it are left
+        out instead of being requested. Without a chapter list, chapter URLs
+        follow the site's numbered template and end_chapter defaults to
+        DEFAULT_END_CHAPTER.
+        """
+        chapter_list = self.get_chapter_list(book, at_least=end_chapter)
+        if chapter_list is None:
+            if end_chapter is None:
+                logger.warning("No chapter list for %s, assuming chapters %d-%d",
+                               book.formatted_title, start_chapter, DEFAULT_END_CHAPTER)
+                end_chapter = DEFAULT_END_CHAPTER
+        elif end_chapter is None or end_chapter > chapter_list.latest:
+            if end_chapter is not None:
+                logger.info("%s has %d chapters, not %d", book.formatted_title, chapter_list.latest, end_chapter)
+            end_chapter = chapter_list.latest
+        return range(start_chapter, end_chapter + 1), chapter_list
+    
+    def _chapter_tasks(
+        self,
+        book: Book,
+        chapters: Iterable[int],
+        chapter_list: Optional[ChapterList]
+    ) -> Iterator[ChapterTask]:
+        """
+        Tasks for the given chapters on every mirror.
         
-        # Process results
-        successful_chapters = []
-        for result in results:
-            if result.content and result.validation and result.validation.is_valid:
-                if self.file_handler.save_chapter(book, result.chapter_number, result.content):
-                    successful_chapters.append(result.chapter_number)
+        Chapter URLs follow each mirror's numbered chapter template, except on
+        the mirror the chapter list was read from, where the listed URL is used.
+        A chapter list read from a site that is not one of the mirrors only
+        decides which chapters exist; its URLs are not downloaded from.
+        """
+        slug = book.formatted_title
+        url_templates = [self.url_builder.get_chapter_url(slug, "{chapter_number}", site) for site in self.mirrors]
+        hosts = [urlparse(template).netloc for template in url_templates]
+        for chapter_number in chapters:
+            urls = [template.format(chapter_number=chapter_number) for template in url_templates]
+            listed = chapter_list.url(chapter_number) if chapter_list else None
+            if listed and urlparse(listed).netloc in hosts:
+                urls[hosts.index(urlparse(listed).netloc)] = listed
+            yield ChapterTask(chapter_number, urls[0], slug, tuple(urls[1:]))
+    
+    def iter_chapters(
+        self,
+        book: Book,
+        start_chapter: int,
+        end_chapter: int,
+        progress_callback: Optional[Callable] = None,
+        chapters: Optional[Sequence[int]] = None
+    ) -> Iterator[DownloadResult]:
+        """
+        Stream chapter results in completion order as they are downloaded.
+        
+        Nothing is stored; consumers are expected to handle each result (and drop
+        it) before asking for the next, which keeps memory bounded by the
+        downloader's in-flight window. chapters restricts the download to those
+        chapter numbers instead of the whole range. Chapters fail over across
+        the mirrors like download_book's, with listed URLs taken from the book's
+        saved chapter list if it has one.
+        """
+        if chapters is None:
+            chapters = range(start_chapter, end_chapter + 1)
+        tasks = self._chapter_tasks(book, chapters, self.file_handler.load_chapter_list(book))
+        for completed, result in enumerate(self.downloader.iter_tasks(tasks), 1):
+            if progress_callback:
+                progress_callback(completed, len(chapters))
+            yield result
+    
+    def download_book(
+        self,
+        book_name: str,
+        start_chapter: int = 1,
+        end_chapter: Optional[int] = None,
+        resume: bool = True,
+        formats: Sequence[str] = ('html',)
+    ) -> Optional[Path]:
+        """
+        Download a book's chapters and combine them into a single file per format.
+        
+        Chapters are looked up in the book's chapter list (see get_chapter_list),
+        so only chapters that exist are fetched; end_chapter defaults to the
+        latest one. Every chapter's progress is recorded in the book's journal. With resume,
+        chapters already stored by an earlier (possibly interrupted) run are skipped.
+        The HTML file is appended to; other formats (txt, epub) are rewritten from
+        the whole stored book in one pass. Returns the file of the first format.
+        """
+        book = self.get_book(book_name)
+        requested, chapter_list = self._plan_chapters(book, start_chapter, end_chapter)
+        
+        with self.file_handler.open_journal(book) as journal:
+            todo = self._chapters_to_fetch(book, requested, journal, resume)
+            skipped = len(requested) - len(todo)
+            if skipped:
+                logger.info("Resuming %s: skipping %d of %d chapters already downloaded, fetching %d",
+                            book.formatted_title, skipped, len(requested), len(todo))
+            
+            successful_chapters = self._download_into(book, todo, journal, chapter_list) if todo else []
+        
+        return self._finish_book(book, successful_chapters, todo, requested, formats)
+    
+    def download_books(
+        self,
+        jobs: Iterable[BatchJob],
+        resume: bool = True,
+        max_active_books: int = 8,
+        progress_callback: Optional[Callable[[BookProgress], None]] = None
+    ) -> Dict[str, BookProgress]:
+        """
+        Download many books in one run, through this scraper's single downloader.
+        
+        The downloader's worker budget, connection pool and per-host rate limits
+        are shared by all books. Chapters are handed out round-robin across up to
+        max_active_books books (0 = all at once); when a book has no chapters left
+        to hand out the next one joins. All chapter lists are read concurrently,
+        and every book's journal checked, before the first chapter is scheduled;
+        books with nothing left to fetch are finished right away. Each other book
+        is saved and combined/exported as soon as its last result is in, and
+        progress_callback receives the book's BookProgress after every result.
+        Returns the final progress per book.
+        """
+        progress: Dict[str, BookProgress] = {}
+        running: Dict[str, Tuple[BatchJob, Book, ChapterJournal, range, List[int], List[int]]] = {}
+        
+        books: Dict[str, Tuple[BatchJob, Book]] = {}
+        for job in jobs:
+            book = self.get_book(job.novel)
+            if book.formatted_title in books:
+                logger.warning("Skipping repeated batch entry for %s", book.formatted_title)
+            else:
+                books[book.formatted_title] = (job, book)
+        # Chapter lists are read concurrently up front, not one book at a time inside the scheduler
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(books)))) as executor:
+            plans = list(executor.map(lambda entry: self._plan_chapters(entry[1], entry[0].start, entry[0].end),
+                                      books.values()))
+        
+        def finish(slug: str) -> None:
+            job, book, journal, requested, todo, successful = running.pop(slug)
+            journal.close()
+            book_progress = progress[slug]
+            book_progress.output = self._finish_book(book, successful, todo, requested, job.formats)
+            book_progress.finished = True
+        
+        def report(slug: str) -> None:
+            if progress_callback:
+                progress_callback(progress[slug])
+        
+        with contextlib.ExitStack() as journals:
+            # Everything but fetching happens here, before the downloader starts pulling
+            # tasks, so no journal or export work runs inside its scheduler (or event loop)
+            book_chapters = []
+            for (job, book), (requested, chapter_list) in zip(books.values(), plans):
+                slug = book.formatted_title
+                journal = journals.enter_context(self.file_handler.open_journal(book))
+                todo = self._chapters_to_fetch(book, requested, journal, resume)
+                progress[slug] = BookProgress(book=slug, total=len(todo), skipped=len(requested) - len(todo))
+                running[slug] = (job, book, journal, requested, todo, [])
+                if todo:
+                    book_chapters.append(self._chapter_tasks(book, todo, chapter_list))
+                else:
+                    finish(slug)
+                report(slug)
+            
+            tasks = round_robin(book_chapters, max_active_books)
+            for result in self.downloader.iter_tasks(tasks):
+                _, book, journal, _, _, successful = running[result.book]
+                book_progress = progress[result.book]
+                if self._store_result(book, result, journal):
+                    successful.append(result.chapter_number)
+                    book_progress.stored += 1
+                else:
+                    book_progress.failed += 1
+                if book_progress.completed == book_progress.total:
+                    finish(result.book)
+                report(result.book)
+        return progress
+    
+    def enqueue_book(
+        self,
+        queue: LeaseQueue,
+        book_name: str,
+        start_chapter: int = 1,
+        end_chapter: Optional[int] = None,
+        resume: bool = True,
+        formats: Sequence[str] = ('html',)
+    ) -> Tuple[int, int]:
+        """
+        Split a book download into chapter leases for workers on other nodes.
+        
+        Chapters are planned as in download_book: from the book's chapter list,
+        and with resume leaving out the ones already in this library. Returns
+        the job id and the number of chapters queued.
+        """
+        book = self.get_book(book_name)
+        requested, chapter_list = self._plan_chapters(book, start_chapter, end_chapter)
+        with self.file_handler.open_journal(book) as journal:
+            todo = self._chapters_to_fetch(book, requested, journal, resume)
+        job_id = queue.add_job(
+            book.formatted_title, requested.start, requested.stop - 1, formats,
+            ((task.chapter_number, task.url) for task in self._chapter_tasks(book, todo, chapter_list))
+        )
+        return job_id, len(todo)
+    
+    def collect_leases(self, queue: LeaseQueue, batch_size: int = 200) -> Dict[str, BookProgress]:
+        """
+        Store chapters that workers completed into the library.
+        
+        Can be called while workers are still running; each call takes what has
+        arrived so far. Once a job has no chapters pending or leased its book is
+        combined/exported like a local download and the job is finished. Returns
+        the progress of every unfinished job, with stored counting this call only.
+        """
+        progress: Dict[str, BookProgress] = {}
+        for job in queue.jobs():
+            book = self.get_book(job.book)
+            counts = queue.progress(job.id)
+            book_progress = progress[job.book] = BookProgress(
+                book=job.book, total=sum(counts.values()), failed=counts['failed']
+            )
+            with self.file_handler.open_journal(book) as journal:
+                while results := queue.results(job.id, batch_size):
+                    for _, chapter_number, content in results:
+                        if self._store_chapter(book, chapter_number, content, journal):
+                            book_progress.stored += 1
+                    # Chapters that could not be saved are collected too; their
+                    # journal entry says failed and a later enqueue retries them
+                    queue.mark_collected(lease_id for lease_id, _, _ in results)
+                
+                counts = queue.progress(job.id)
+                if counts['pending'] or counts['leased']:
+                    continue
+                requested = range(job.start, job.end + 1)
+                stored = sorted(journal.stored().intersection(requested))
+            
+            todo = list(requested) if book_progress.total else []
+            book_progress.output = self._finish_book(book, stored, todo, requested, job.formats)
+            book_progress.finished = True
+            queue.finish_job(job.id)
+        return progress
+    
+    def update_books(
+        self,
+        book_names: Optional[Iterable[str]] = None,
+        max_active_books: int = 8,
+        progress_callback: Optional[Callable[[BookProgress], None]] = None
+    ) -> Dict[str, BookProgress]:
+        """
+        Fetch the chapters published since each book was last downloaded.
+        
+        book_names defaults to every library book with downloaded chapters. All
+        chapter lists are refreshed first, concurrently and usually with one
+        request per book; books with new chapters then download them together
+        through download_books, starting after the newest stored chapter. New
+        chapters are appended to the book's HTML file, and the book's other
+        existing outputs (txt, epub) are rewritten. Books that are up to date
+        report total 0 and keep their files untouched.
+        """
+        if book_names is None:
+            books = [book for book in self.file_handler.load_books() if book.chapters]
+        else:
+            books = [self.get_book(name) for name in book_names]
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(books)))) as executor:
+            chapter_lists = list(executor.map(lambda book: self.get_chapter_list(book, refresh=True), books))
+        
+        progress: Dict[str, BookProgress] = {}
+        jobs = []
+        for book, chapter_list in zip(books, chapter_lists):
+            newest = max(book.chapters or [0])
+            if chapter_list is None:
+                logger.warning("No chapter list for %s, cannot tell whether it has new chapters",
+                               book.formatted_title)
+                progress[book.formatted_title] = BookProgress(
+                    book=book.formatted_title, total=0, finished=True, errors=["No chapter list"]
+                )
+            elif chapter_list.latest <= newest:
+                progress[book.formatted_title] = BookProgress(book=book.formatted_title, total=0, finished=True)
             else:
-                print(f"Chapter {result.chapter_number} failed: {result.error}")
-                if result.validation and result.validation.warnings:
-                    print(f"Warnings: {', '.join(result.validation.warnings)}")
+                formats = tuple(fmt for fmt in ('html', *EXPORTERS) if book.export_path(fmt).exists()) or ('html',)
+                jobs.append(BatchJob(book.formatted_title, start=newest + 1, end=chapter_list.latest, formats=formats))
         
+        if progress_callback:
+            for book_progress in progress.values():
+                progress_callback(book_progress)
+        progress.update(self.download_books(jobs, max_active_books=max_active_books,
+                                            progress_callback=progress_callback))
+        return progress
+    
+    def _chapters_to_fetch(
+        self,
+        book: Book,
+        requested: range,
+        journal: ChapterJournal,
+        resume: bool
+    ) -> List[int]:
+        """The requested chapters still to download; with resume, stored ones are left out."""
+        if not resume:
+            return list(requested)
+        already_stored = set(book.chapters or []) | journal.stored()
+        return [n for n in requested if n not in already_stored]
+    
+    def _finish_book(
+        self,
+        book: Book,
+        successful_chapters: List[int],
+        todo: List[int],
+        requested: range,
+        formats: Sequence[str]
+    ) -> Optional[Path]:
+        """Record newly stored chapters and write the output files; returns the first format's file."""
         if successful_chapters:
-            book.chapters = successful_chapters
-            self.file_handler.save_books(self.novels)
-            return self.file_handler.combine_chapters(book, min(successful_chapters), max(successful_chapters))
+            book.chapters = sorted(set(book.chapters or []) | set(successful_chapters))
+            self.file_handler.save_book(book)
+            self.file_handler.flush_index()
+        
+        outputs = {}
+        if 'html' in formats:
+            # Also picks up chapters stored by an interrupted run that never got combined
+            outputs['html'] = self.file_handler.combine_chapters(book, requested.start, requested.stop - 1)
+        outputs.update(self.file_handler.export_book(book, [fmt for fmt in formats if fmt != 'html']))
         
+        output_file = outputs.get(formats[0])
+        if successful_chapters or not todo:
+            return output_file
         return None
     
-    def get_downloaded_books(self) -> List[Book]:
-        """Get list of all downloaded books."""
-        return self.novels
+    def _download_into(
+        self,
+        book: Book,
+        chapters: List[int],
+        journal: ChapterJournal,
+        chapter_list: Optional[ChapterList]
+    ) -> List[int]:
+        """Download the given chapters, writing each through to disk and the journal."""
+        # Setup progress bar
+        pbar = tqdm(total=len(chapters), desc=f"Downloading {book.formatted_title}")
+        
+        # Write each chapter through to disk as soon as it is downloaded
+        successful_chapters = []
+        try:
+            for result in self.downloader.iter_tasks(self._chapter_tasks(book, chapters, chapter_list)):
+                if self._store_result(book, result, journal):
+                    successful_chapters.append(result.chapter_number)
+                pbar.update(1)
+        finally:
+            pbar.close()
+        
+        return successful_chapters
+    
+    def _store_result(self, book: Book, result: DownloadResult, journal: ChapterJournal) -> bool:
+        """Write a finished chapter through to disk and the journal; False if it failed."""
+        if result.content and result.validation and result.validation.is_valid:
+            journal.record(result.chapter_number, VALIDATED)
+            return self._store_chapter(book, result.chapter_number, result.content, journal)
+        
+        # A page that arrived but failed validation is 'fetched', anything else 'failed'
+        journal.record(result.chapter_number, FETCHED if result.validation else FAILED, result.error)
+        logger.warning("%s chapter %d failed: %s", book.formatted_title, result.chapter_number, result.error)
+        if result.validation and result.validation.warnings:
+            logger.info("Chapter %d warnings: %s", result.chapter_number, ', '.join(result.validation.warnings))
+        return False
+    
+    def _store_chapter(self, book: Book, chapter_number: int, content: str, journal: ChapterJournal) -> bool:
+        """Write validated chapter content to the book's pack and record it as stored."""
+        with self.metrics.time('write'):
+            saved = self.file_handler.save_chapter(book, chapter_number, content)
+        if saved:
+            journal.record(chapter_number, STORED)
+            return True
+        journal.record(chapter_number, FAILED, "Could not save chapter")
+        return False
+    
+    def get_downloaded_books(self, order: str = 'title') -> List[Book]:
+        """Get list of all downloaded books, sorted by one of Catalog.ORDERS."""
+        return self.file_handler.load_books(order)
+    
+    def close(self) -> None:
+        """Close the shared HTTP connection pool, the parse pool and the library catalog."""
+        self.downloader.close()
+        self.fetcher.close()
+        self.file_handler.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
@@ -19,4 +19,8 @@ class Book:
     @property
     def html_path(self) -> Path:
         """Returns the path to the combined HTML file."""
-        return self.folder_path / f"{self.formatted_title}.html"
+        return self.export_path('html')
+    
+    def export_path(self, extension: str) -> Path:
+        """Returns the path of the whole-book file in the given format."""
+        return self.folder_path / f"{self.formatted_title}.{extension}"
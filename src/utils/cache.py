@@ -1,67 +1,198 @@
-from typing import Optional, Any, Callable
+from typing import Optional, Any, Callable, Tuple
 from pathlib import Path
-import json
+from collections import OrderedDict
+from dataclasses import dataclass
 import hashlib
+import os
+import tempfile
+import threading
 import time
 from functools import wraps
 import pickle
 
+_MISSING = object()
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a Cache."""
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    negative_hits: int = 0  # Hits on a cached empty/None result
+    evictions: int = 0
+    expired: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
 class Cache:
-    """Simple file-based cache with TTL support."""
-    
-    def __init__(self, cache_dir: Path, ttl: int = 3600):
+    """
+    Two-tier cache with TTL support: an in-process LRU in front of a bounded,
+    file-based tier.
+
+    Disk entries are written atomically (temp file + rename) and their expiry time
+    is stored as the file's mtime, so periodic sweeps only need to stat files.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl: int = 3600,
+        memory_entries: int = 256,
+        max_disk_entries: int = 4096,
+        sweep_interval: int = 600
+    ):
         """
         Initialize cache.
-        
+
         Args:
             cache_dir: Directory to store cache files
-            ttl: Time to live in seconds (default: 1 hour)
+            ttl: Default time to live in seconds (default: 1 hour)
+            memory_entries: Capacity of the in-process LRU tier
+            max_disk_entries: Capacity of the disk tier; entries closest to expiry go first
+            sweep_interval: Seconds between sweeps of expired disk entries
         """
         self.cache_dir = cache_dir
         self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.sweep_interval = sweep_interval
+        self.stats = CacheStats()
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-    
+        self._last_sweep = 0.0
+        self._maybe_sweep()
+
     def _get_cache_path(self, key: str) -> Path:
         """Generate cache file path from key."""
         hash_key = hashlib.sha256(key.encode()).hexdigest()
         return self.cache_dir / f"{hash_key}.cache"
-    
+
     def get(self, key: str) -> Optional[Any]:
         """Retrieve item from cache if it exists and hasn't expired."""
+        found, value = self.lookup(key)
+        return value if found else None
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value); unlike get, distinguishes a cached None from a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return True, value
+                del self._memory[key]
+                self.stats.expired += 1
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is _MISSING:
+                self.stats.misses += 1
+                return False, None
+            self.stats.disk_hits += 1
+        return True, value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Store item in both tiers, expiring after ttl seconds (default: self.ttl)."""
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        self._remember(key, expires, value)
+
         cache_path = self._get_cache_path(key)
-        if not cache_path.exists():
-            return None
-            
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
         try:
-            with open(cache_path, 'rb') as f:
-                data = pickle.load(f)
-                
-            if time.time() - data['timestamp'] > self.ttl:
-                cache_path.unlink()
-                return None
-                
-            return data['value']
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.utime(tmp_path, (expires, expires))
+            os.replace(tmp_path, cache_path)
         except Exception:
-            return None
-    
-    def set(self, key: str, value: Any) -> None:
-        """Store item in cache with timestamp."""
-        cache_path = self._get_cache_path(key)
-        data = {
-            'timestamp': time.time(),
-            'value': value
-        }
-        
-        with open(cache_path, 'wb') as f:
-            pickle.dump(data, f)
-    
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._maybe_sweep()
+
     def clear(self) -> None:
         """Clear all cached items."""
+        with self._lock:
+            self._memory.clear()
         for cache_file in self.cache_dir.glob("*.cache"):
-            cache_file.unlink()
+            cache_file.unlink(missing_ok=True)
 
-def cached(ttl: int = 3600):
-    """Decorator for caching function results."""
+    def sweep(self) -> None:
+        """Delete expired disk entries and trim the disk tier to max_disk_entries."""
+        now = time.time()
+        live = []
+        expired = evicted = 0
+        for cache_file in self.cache_dir.glob("*.cache"):
+            try:
+                expires = cache_file.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if expires <= now:
+                cache_file.unlink(missing_ok=True)
+                expired += 1
+            else:
+                live.append((expires, cache_file))
+
+        if len(live) > self.max_disk_entries:
+            live.sort()
+            for _, cache_file in live[:len(live) - self.max_disk_entries]:
+                cache_file.unlink(missing_ok=True)
+                evicted += 1
+        with self._lock:
+            self.stats.expired += expired
+            self.stats.evictions += evicted
+        self._last_sweep = now
+
+    def _maybe_sweep(self) -> None:
+        if time.time() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def _remember(self, key: str, expires: float, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = (expires, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self.stats.evictions += 1
+
+    def _read_disk(self, key: str, now: float) -> Any:
+        cache_path = self._get_cache_path(key)
+        try:
+            expires = cache_path.stat().st_mtime
+            if expires <= now:
+                cache_path.unlink(missing_ok=True)
+                return _MISSING
+            with open(cache_path, 'rb') as f:
+                value = pickle.load(f)
+        except Exception:
+            return _MISSING
+
+        self._remember(key, expires, value)
+        return value
+
+def make_key(func: Callable, args: tuple, kwargs: dict) -> str:
+    """Build a stable cache key from the function's qualified name and its arguments."""
+    name = f"{func.__module__}.{func.__qualname__}"
+    try:
+        payload = pickle.dumps((args, sorted(kwargs.items())), protocol=4)
+    except Exception:
+        payload = repr((args, sorted(kwargs.items()))).encode()
+    return f"{name}:{hashlib.sha256(payload).hexdigest()}"
+
+def cached(ttl: int = 3600, negative_ttl: int = 60):
+    """
+    Decorator for caching method results.
+
+    Empty results (None or an empty container) are cached too, for negative_ttl
+    seconds, so repeated misses don't re-run the function. An instance attribute
+    cache_ttl, when set, overrides ttl.
+    """
     def decorator(func: Callable):
         @wraps(func)
         def wrapper(self, *args, **kwargs):
@@ -69,15 +200,20 @@ def cached(ttl: int = 3600):
             if not hasattr(self, '_cache'):
                 cache_dir = self.file_handler.base_path / '.cache'
                 self._cache = Cache(cache_dir, ttl)
-            
-            # Generate cache key
-            key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-            result = self._cache.get(key)
-            
-            if result is None:
-                result = func(self, *args, **kwargs)
-                self._cache.set(key, result)
-            
+
+            key = make_key(func, args, kwargs)
+            found, result = self._cache.lookup(key)
+            if found:
+                if not result:
+                    with self._cache._lock:
+                        self._cache.stats.negative_hits += 1
+                return result
+
+            result = func(self, *args, **kwargs)
+            if result:
+                self._cache.set(key, result, getattr(self, 'cache_ttl', None) or ttl)
+            else:
+                self._cache.set(key, result, negative_ttl)
             return result
         return wrapper
     return decorator
@@ -0,0 +1,144 @@
+from pathlib import Path
+from typing import Iterable, List, Optional
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from src.models.book import Book
+from src.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+class Catalog:
+    """
+    SQLite-backed library catalog, one row per book keyed by its slug.
+
+    Lookups go through the slug primary key and every listing order has its
+    own index, instead of a scan and sort; single books are updated in place,
+    and every write is a transaction, so a crash can never leave a half-written
+    library behind.
+    """
+
+    ORDERS = {
+        'title': 'title COLLATE NOCASE',
+        'chapters': 'chapter_count DESC, title COLLATE NOCASE',
+        'updated': 'updated_at DESC',
+    }
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS books ('
+                ' slug TEXT PRIMARY KEY, title TEXT NOT NULL, folder_path TEXT NOT NULL,'
+                ' chapters TEXT, chapter_count INTEGER NOT NULL DEFAULT 0,'
+                ' description TEXT, author TEXT, updated_at REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS books_title ON books (title COLLATE NOCASE)')
+            self._db.execute(
+                'CREATE INDEX IF NOT EXISTS books_chapters ON books (chapter_count DESC, title COLLATE NOCASE)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS books_updated ON books (updated_at DESC)')
+
+    def get(self, slug: str) -> Optional[Book]:
+        """Return the book with this slug (see Book.formatted_title), if any."""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT title, folder_path, chapters, description, author FROM books WHERE slug = ?',
+                (slug,)
+            ).fetchone()
+        return self._to_book(row) if row else None
+
+    def books(self, order: str = 'title') -> List[Book]:
+        """All books, sorted by one of ORDERS."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT title, folder_path, chapters, description, author FROM books'
+                f' ORDER BY {self.ORDERS[order]}'
+            ).fetchall()
+        return [self._to_book(row) for row in rows]
+
+    def upsert(self, book: Book) -> None:
+        """Insert or update a single book."""
+        self.upsert_many([book])
+
+    def upsert_many(self, books: Iterable[Book], keep_chapters: bool = False) -> None:
+        """
+        Insert or update books in one transaction.
+
+        With keep_chapters, existing rows keep their chapter list and update time
+        and only pick up metadata; used when listing sites rather than downloads
+        produce the books, so the 'updated' order follows downloads. New rows
+        from listings get update time 0 (never downloaded).
+        """
+        chapters_update = ('' if keep_chapters else
+                           ', chapters = excluded.chapters, chapter_count = excluded.chapter_count,'
+                           ' updated_at = excluded.updated_at')
+        now = 0.0 if keep_chapters else time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT (slug) DO UPDATE SET title = excluded.title,'
+                ' folder_path = excluded.folder_path,'
+                ' description = COALESCE(excluded.description, description),'
+                f' author = COALESCE(excluded.author, author){chapters_update}',
+                [self._to_row(book, now) for book in books]
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM books').fetchone()[0]
+
+    def migrate_pickle(self, pickle_path: Path) -> int:
+        """
+        Import a legacy books.pkl once, then rename it to books.pkl.migrated.
+
+        Returns the number of books imported.
+        """
+        pickle_path = Path(pickle_path)
+        if not pickle_path.exists():
+            return 0
+        try:
+            with open(pickle_path, 'rb') as f:
+                books = pickle.load(f)
+        except Exception:
+            logger.exception("Error migrating %s", pickle_path)
+            return 0
+        self.upsert_many(books)
+        os.replace(pickle_path, pickle_path.with_name(pickle_path.name + '.migrated'))
+        return len(books)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _to_row(book: Book, now: float) -> tuple:
+        chapters = sorted(book.chapters) if book.chapters else None
+        return (
+            book.formatted_title,
+            book.title,
+            str(book.folder_path),
+            json.dumps(chapters) if chapters else None,
+            len(chapters) if chapters else 0,
+            book.description,
+            book.author,
+            now
+        )
+
+    @staticmethod
+    def _to_book(row: tuple) -> Book:
+        title, folder_path, chapters, description, author = row
+        return Book(
+            title=title,
+            folder_path=Path(folder_path),
+            chapters=json.loads(chapters) if chapters else None,
+            description=description,
+            author=author
+        )
@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+from html import unescape
+from pathlib import Path
+from typing import Callable, List, Optional
+import re
+import sqlite3
+import threading
+from src.utils.search_index import TOKEN, match_expression
+
+TAG = re.compile(r'<[^>]+>')
+WHITESPACE = re.compile(r'\s+')
+
+@dataclass
+class ChapterHit:
+    """A chapter matching a full-text query."""
+    book: str
+    chapter_number: int
+    snippet: str
+
+class ChapterIndex:
+    """
+    Incremental full-text index (SQLite FTS5) over downloaded chapter text.
+
+    The FTS table is contentless and the chapters table only maps its rowids to
+    (book, chapter), so the index holds postings and nothing else; the text of
+    the few chapters a search returns is read back through read_chapter to
+    build their snippets. Chapters are added one at a time as they are stored,
+    never by rescanning the library, and committed in batches of batch_size
+    (or by flush()); a crash can lose the last batch from the index, never a
+    chapter from the library.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        read_chapter: Optional[Callable[[str, int], Optional[str]]] = None,
+        snippet_chars: int = 160,
+        batch_size: int = 100
+    ):
+        """
+        Args:
+            db_path: Index file, created if missing
+            read_chapter: Returns the stored HTML of (book, chapter_number), for snippets
+            snippet_chars: Length of a hit's snippet
+            batch_size: Chapters added per commit
+        """
+        self.db_path = Path(db_path)
+        self.read_chapter = read_chapter
+        self.snippet_chars = snippet_chars
+        self.batch_size = batch_size
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        with self._db:
+            self._db.executescript('''
+                CREATE TABLE IF NOT EXISTS chapters (
+                    id INTEGER PRIMARY KEY, book TEXT NOT NULL, chapter INTEGER NOT NULL,
+                    UNIQUE (book, chapter));
+                CREATE VIRTUAL TABLE IF NOT EXISTS chapters_fts USING fts5(
+                    text, content='', tokenize='unicode61 remove_diacritics 2');
+            ''')
+        if 'text' in (row[1] for row in self._db.execute('PRAGMA table_info(chapters)')):
+            # Older indexes kept a second, compressed copy of every chapter for snippets
+            self._db.execute('ALTER TABLE chapters DROP COLUMN text')
+            self._db.execute('VACUUM')
+
+    def add(self, book: str, chapter_number: int, html: str, previous_html: Optional[str] = None) -> None:
+        """
+        Index (or re-index) one chapter of a book.
+
+        previous_html is the text the chapter was indexed with, if it was; its
+        postings are removed. Without it they stay behind under a rowid nothing
+        refers to any more, which costs space but never shows up in results.
+        """
+        text = self.to_text(html)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT id FROM chapters WHERE book = ? AND chapter = ?', (book, chapter_number)
+            ).fetchone()
+            if row:
+                if previous_html is not None:
+                    # Contentless tables need the original text to remove its postings
+                    self._db.execute(
+                        "INSERT INTO chapters_fts (chapters_fts, rowid, text) VALUES ('delete', ?, ?)",
+                        (row[0], self.to_text(previous_html))
+                    )
+                self._db.execute('DELETE FROM chapters WHERE id = ?', row)
+            cursor = self._db.execute(
+                'INSERT INTO chapters (book, chapter) VALUES (?, ?)', (book, chapter_number)
+            )
+            self._db.execute(
+                'INSERT INTO chapters_fts (rowid, text) VALUES (?, ?)', (cursor.lastrowid, text)
+            )
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._commit()
+
+    def flush(self) -> None:
+        """Commit the chapters added since the last commit."""
+        with self._lock:
+            self._commit()
+
+    def search(self, query: str, limit: int = 20, book: Optional[str] = None) -> List[ChapterHit]:
+        """Best matching chapters (bm25), optionally within one book."""
+        match = match_expression(query)
+        if not match:
+            return []
+        sql = (
+            'SELECT c.book, c.chapter FROM chapters_fts JOIN chapters c ON c.id = chapters_fts.rowid'
+            ' WHERE chapters_fts MATCH ?'
+        )
+        params: list = [match]
+        if book:
+            sql += ' AND c.book = ?'
+            params.append(book)
+        sql += ' ORDER BY bm25(chapters_fts) LIMIT ?'
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+
+        words = TOKEN.findall(query)
+        return [ChapterHit(book, chapter_number, self._snippet(book, chapter_number, words))
+                for book, chapter_number in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM chapters').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._db.close()
+
+    @staticmethod
+    def to_text(html: str) -> str:
+        """Plain text of a stored chapter."""
+        return WHITESPACE.sub(' ', unescape(TAG.sub(' ', html))).strip()
+
+    def _commit(self) -> None:
+        if self._pending:
+            self._db.commit()
+            self._pending = 0
+
+    def _snippet(self, book: str, chapter_number: int, words: List[str]) -> str:
+        """A window of the chapter's text around the first match of any query word."""
+        html = self.read_chapter(book, chapter_number) if self.read_chapter else None
+        if not html:
+            return ''
+        text = self.to_text(html)
+        pattern = re.compile(r'\b(?:' + '|'.join(re.escape(w) for w in words) + ')', re.IGNORECASE)
+        match = pattern.search(text)
+        start = max(0, match.start() - self.snippet_chars // 3) if match else 0
+        end = min(len(text), start + self.snippet_chars)
+        snippet = text[start:end]
+        if start > 0:
+            snippet = '…' + snippet
+        if end < len(text):
+            snippet += '…'
+        return snippet
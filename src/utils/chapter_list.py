@@ -0,0 +1,62 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+import json
+import os
+import time
+
+@dataclass
+class ChapterList:
+    """
+    A book's table of contents, as read from the site's paginated chapter list.
+
+    Chapter n is entries[n - 1], so chapter numbers follow the site's order
+    whatever its chapter URLs look like. Where the last page starts is kept so
+    a refresh only needs to re-read that page and any after it.
+    """
+    entries: List[Tuple[str, str]] = field(default_factory=list)  # (title, absolute url)
+    last_page: int = 1
+    last_page_start: int = 0  # Index in entries of the first chapter on last_page
+    fetched_at: float = 0.0
+
+    @property
+    def latest(self) -> int:
+        """Number of the newest chapter."""
+        return len(self.entries)
+
+    def url(self, chapter_number: int) -> Optional[str]:
+        """URL of a chapter, or None if the book has no such chapter."""
+        if 1 <= chapter_number <= len(self.entries):
+            return self.entries[chapter_number - 1][1]
+        return None
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['ChapterList']:
+        """Read a saved chapter list; None if there is none or it is unreadable."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(
+                entries=[tuple(entry) for entry in data['entries']],
+                last_page=data['last_page'],
+                last_page_start=data['last_page_start'],
+                fetched_at=data['fetched_at']
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: Path) -> None:
+        """Write the chapter list atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(json.dumps({
+            'entries': self.entries,
+            'last_page': self.last_page,
+            'last_page_start': self.last_page_start,
+            'fetched_at': self.fetched_at
+        }), encoding='utf-8')
+        os.replace(tmp_path, path)
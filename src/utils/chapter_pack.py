@@ -0,0 +1,207 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+EXPORTED = 0x01  # Chapter has been appended to the combined HTML file
+
+class _Entry(NamedTuple):
+    offset: int
+    length: int
+    crc: int
+    flags: int
+
+class ChapterPack:
+    """
+    Per-book packed chapter store.
+
+    chapters.pack holds one zlib-compressed block per chapter, appended and never
+    rewritten in place; chapters.idx is an append-only list of fixed-size records
+    (chapter, offset, length, crc32, flags) in which the last record for a chapter
+    wins. Reading a chapter is an index lookup, a slice of the memory-mapped pack
+    and one decompress. A torn record from a crash is ignored on load.
+    """
+
+    RECORD = struct.Struct('<IQIIB')
+
+    def __init__(self, book_dir: Path, level: int = 6):
+        """
+        Args:
+            book_dir: The book's directory (created on first write)
+            level: zlib compression level
+        """
+        self.book_dir = Path(book_dir)
+        self.pack_path = self.book_dir / 'chapters.pack'
+        self.index_path = self.book_dir / 'chapters.idx'
+        self.level = level
+        self._entries: Dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+        self._pack = None
+        self._index = None
+        self._map: Optional[mmap.mmap] = None
+        self._load()
+        if self._garbage_bytes() > max(self._live_bytes(), 1024 * 1024):
+            self.compact()
+
+    def append(self, chapter_number: int, content: str) -> bool:
+        """
+        Store a chapter, replacing any earlier copy; an identical copy is kept
+        with its flags. Returns False if the content was already stored.
+        """
+        block = zlib.compress(content.encode('utf-8'), self.level)
+        with self._lock:
+            # A re-download of the same text keeps its block and its EXPORTED flag
+            old = self._entries.get(chapter_number)
+            if old is not None and old.length == len(block) and old.crc == zlib.crc32(block):
+                if self._map is None or old.offset + old.length > len(self._map):
+                    self._remap()
+                if self._map[old.offset:old.offset + old.length] == block:
+                    return False
+            self._open_for_append()
+            offset = self._pack.seek(0, os.SEEK_END)
+            self._pack.write(block)
+            entry = _Entry(offset, len(block), zlib.crc32(block), 0)
+            self._write_record(chapter_number, entry)
+            self._entries[chapter_number] = entry
+        return True
+
+    def read(self, chapter_number: int) -> Optional[str]:
+        """Return a chapter's content, or None if it is not in the pack."""
+        with self._lock:
+            entry = self._entries.get(chapter_number)
+            if entry is None:
+                return None
+            if self._map is None or entry.offset + entry.length > len(self._map):
+                self._remap()
+            block = self._map[entry.offset:entry.offset + entry.length]
+        if zlib.crc32(block) != entry.crc:
+            raise IOError(f"Chapter {chapter_number} is corrupt in {self.pack_path}")
+        return zlib.decompress(block).decode('utf-8')
+
+    def iter_chapters(self, chapter_numbers: Iterable[int]) -> Iterator[Tuple[int, str]]:
+        """Yield (number, content) for the requested chapters present in the pack, one at a time."""
+        for chapter_number in chapter_numbers:
+            if chapter_number in self._entries:
+                yield chapter_number, self.read(chapter_number)
+
+    def chapters(self) -> List[int]:
+        """Sorted numbers of every stored chapter."""
+        return sorted(self._entries)
+
+    def pending_export(self, start: int, end: int) -> List[int]:
+        """Chapters in [start, end] not yet appended to the combined file."""
+        return sorted(
+            n for n, entry in self._entries.items()
+            if start <= n <= end and not entry.flags & EXPORTED
+        )
+
+    def exported(self) -> List[int]:
+        """Sorted numbers of the chapters already in the combined file."""
+        return sorted(n for n, entry in self._entries.items() if entry.flags & EXPORTED)
+
+    def mark_exported(self, chapter_numbers: Iterable[int]) -> None:
+        """Flag chapters as appended to the combined file."""
+        with self._lock:
+            self._open_for_append()
+            for chapter_number in chapter_numbers:
+                entry = self._entries[chapter_number]
+                entry = entry._replace(flags=entry.flags | EXPORTED)
+                self._write_record(chapter_number, entry)
+                self._entries[chapter_number] = entry
+
+    def compact(self) -> None:
+        """Rewrite the pack and index without superseded blocks and records."""
+        with self._lock:
+            self._close_files()
+            tmp_pack = self.pack_path.with_suffix('.pack.tmp')
+            tmp_index = self.index_path.with_suffix('.idx.tmp')
+            entries = {}
+            with open(self.pack_path, 'rb') as src, open(tmp_pack, 'wb') as pack, open(tmp_index, 'wb') as index:
+                for chapter_number in sorted(self._entries):
+                    old = self._entries[chapter_number]
+                    src.seek(old.offset)
+                    block = src.read(old.length)
+                    entry = old._replace(offset=pack.tell())
+                    pack.write(block)
+                    index.write(self.RECORD.pack(chapter_number, *entry))
+                    entries[chapter_number] = entry
+                for f in (pack, index):
+                    f.flush()
+                    os.fsync(f.fileno())
+            # A crash between the two renames is finished off by _load
+            os.replace(tmp_pack, self.pack_path)
+            os.replace(tmp_index, self.index_path)
+            self._entries = entries
+
+    def close(self) -> None:
+        """Flush the pack and index to stable storage and close them."""
+        with self._lock:
+            self._close_files()
+
+    def __contains__(self, chapter_number: int) -> bool:
+        return chapter_number in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self) -> None:
+        tmp_pack = self.pack_path.with_suffix('.pack.tmp')
+        tmp_index = self.index_path.with_suffix('.idx.tmp')
+        if tmp_index.exists():
+            if tmp_pack.exists():
+                # Compaction never got to swap anything in
+                tmp_pack.unlink()
+                tmp_index.unlink()
+            else:
+                # The compacted pack is in place; its index must follow
+                os.replace(tmp_index, self.index_path)
+        if not self.index_path.exists():
+            return
+        data = self.index_path.read_bytes()
+        usable = len(data) - len(data) % self.RECORD.size
+        pack_size = self.pack_path.stat().st_size if self.pack_path.exists() else 0
+        for chapter_number, *fields in self.RECORD.iter_unpack(data[:usable]):
+            entry = _Entry(*fields)
+            if entry.offset + entry.length <= pack_size:
+                self._entries[chapter_number] = entry
+        if usable != len(data):
+            # Drop a torn trailing record so the next append starts aligned
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(usable)
+
+    def _open_for_append(self) -> None:
+        if self._pack is None:
+            self.book_dir.mkdir(parents=True, exist_ok=True)
+            self._pack = open(self.pack_path, 'ab', buffering=0)
+            self._index = open(self.index_path, 'ab', buffering=0)
+
+    def _write_record(self, chapter_number: int, entry: _Entry) -> None:
+        self._index.write(self.RECORD.pack(chapter_number, *entry))
+
+    def _remap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        with open(self.pack_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close_files(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        for f in (self._pack, self._index):
+            if f is not None:
+                os.fsync(f.fileno())
+                f.close()
+        self._pack = None
+        self._index = None
+
+    def _live_bytes(self) -> int:
+        return sum(entry.length for entry in self._entries.values())
+
+    def _garbage_bytes(self) -> int:
+        if not self.pack_path.exists():
+            return 0
+        return self.pack_path.stat().st_size - self._live_bytes()
@@ -0,0 +1,218 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from html import escape, unescape
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+import re
+import uuid
+import zipfile
+from src.models.book import Book
+
+HEADING = re.compile(r'<h[1-3][^>]*>(.*?)</h[1-3]>', re.DOTALL | re.IGNORECASE)
+PARAGRAPH = re.compile(r'<p[^>]*>(.*?)</p>', re.DOTALL | re.IGNORECASE)
+TAG = re.compile(r'<[^>]+>')
+# Entity references XML understands without a DTD
+NON_XML_ENTITY = re.compile(r'&(?!(?:amp|lt|gt|quot|apos|#\d+|#x[0-9a-fA-F]+);)')
+
+def chapter_blocks(chapter_number: int, content: str) -> Tuple[str, List[str]]:
+    """
+    Split stored chapter HTML into a title and paragraphs.
+
+    Tags are stripped but entities are kept, so the blocks are still escaped
+    text (as HTMLParser stores it); use plain_text for the literal characters.
+    """
+    def text(fragment: str) -> str:
+        return TAG.sub('', fragment).strip()
+
+    heading = HEADING.search(content)
+    title = text(heading.group(1)) if heading else f"Chapter {chapter_number}"
+    paragraphs = [p for p in (text(m) for m in PARAGRAPH.findall(content)) if p]
+    if not paragraphs:
+        body = text(HEADING.sub('', content))
+        paragraphs = [body] if body else []
+    return title, paragraphs
+
+def plain_text(escaped: str) -> str:
+    """Undo the escaping of a chapter block."""
+    if '&' not in escaped:
+        return escaped
+    text = (escaped.replace('&quot;', '"').replace('&#x27;', "'")
+            .replace('&lt;', '<').replace('&gt;', '>'))
+    # Anything beyond what html.escape produces goes through the full decoder
+    return unescape(text) if '&' in text.replace('&amp;', '') else text.replace('&amp;', '&')
+
+def xml_text(escaped: str) -> str:
+    """A chapter block made safe for XHTML (HTML-only entities such as &nbsp; are decoded)."""
+    if '&' in escaped and NON_XML_ENTITY.search(escaped):
+        return escape(plain_text(escaped))
+    return escaped
+
+class Exporter(ABC):
+    """
+    Writes a book to one file, a chapter at a time.
+
+    Subclasses only ever hold the current chapter in memory (plus a title per
+    chapter where the format needs a table of contents).
+    """
+
+    extension = ''
+
+    def __init__(self, book: Book, path: Optional[Path] = None):
+        self.book = book
+        self.path = Path(path) if path else book.export_path(self.extension)
+        self._tmp_path = self.path.with_name(self.path.name + '.tmp')
+
+    @abstractmethod
+    def open(self) -> None:
+        """Start writing to the temporary file."""
+
+    @abstractmethod
+    def write_chapter(self, chapter_number: int, title: str, paragraphs: List[str]) -> None:
+        """Write one chapter, given as escaped blocks (see chapter_blocks)."""
+
+    def close(self) -> Path:
+        """Finish the file and move it into place."""
+        self._finish()
+        self._tmp_path.replace(self.path)
+        return self.path
+
+    def abort(self) -> None:
+        """Discard a partially written export."""
+        try:
+            self._finish()
+        finally:
+            self._tmp_path.unlink(missing_ok=True)
+
+    @abstractmethod
+    def _finish(self) -> None:
+        """Write whatever the format needs after the last chapter and close the file."""
+
+class TextExporter(Exporter):
+    """Plain UTF-8 text: a title line per chapter followed by its paragraphs."""
+
+    extension = 'txt'
+
+    def open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._file.write(f"{self.book.title}\n\n")
+
+    def write_chapter(self, chapter_number: int, title: str, paragraphs: List[str]) -> None:
+        title = plain_text(title)
+        self._file.write(f"\n{title}\n{'=' * len(title)}\n\n")
+        self._file.write(''.join(plain_text(paragraph) + "\n\n" for paragraph in paragraphs))
+
+    def _finish(self) -> None:
+        self._file.close()
+
+class EpubExporter(Exporter):
+    """
+    EPUB 3 written straight into the zip archive.
+
+    The mimetype entry goes first and uncompressed, as the format requires;
+    each chapter becomes its own XHTML entry as it arrives, and the package
+    document and navigation are written last from the collected titles.
+    """
+
+    extension = 'epub'
+
+    CONTAINER = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">\n'
+        '  <rootfiles>\n'
+        '    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>\n'
+        '  </rootfiles>\n'
+        '</container>\n'
+    )
+
+    def open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._zip = zipfile.ZipFile(self._tmp_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        self._zip.writestr('META-INF/container.xml', self.CONTAINER)
+        self._toc: List[Tuple[int, str]] = []
+
+    def write_chapter(self, chapter_number: int, title: str, paragraphs: List[str]) -> None:
+        title = xml_text(title)
+        body = '\n'.join(f'<p>{xml_text(p)}</p>' for p in paragraphs)
+        self._zip.writestr(
+            f'OEBPS/chapter_{chapter_number}.xhtml',
+            self._xhtml(title, f'<h1>{title}</h1>\n{body}')
+        )
+        self._toc.append((chapter_number, title))
+
+    def _finish(self) -> None:
+        try:
+            nav = '\n'.join(
+                f'<li><a href="chapter_{n}.xhtml">{title}</a></li>' for n, title in self._toc
+            )
+            self._zip.writestr('OEBPS/nav.xhtml', self._xhtml(
+                'Contents', f'<nav epub:type="toc"><h1>Contents</h1><ol>\n{nav}\n</ol></nav>'
+            ))
+            self._zip.writestr('OEBPS/content.opf', self._package())
+        finally:
+            self._zip.close()
+
+    def _package(self) -> str:
+        manifest = '\n'.join(
+            f'<item id="c{n}" href="chapter_{n}.xhtml" media-type="application/xhtml+xml"/>'
+            for n, _ in self._toc
+        )
+        spine = '\n'.join(f'<itemref idref="c{n}"/>' for n, _ in self._toc)
+        author = f'<dc:creator>{escape(self.book.author)}</dc:creator>\n' if self.book.author else ''
+        identifier = uuid.uuid5(uuid.NAMESPACE_URL, self.book.formatted_title)
+        modified = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'<dc:identifier id="id">urn:uuid:{identifier}</dc:identifier>\n'
+            f'<dc:title>{escape(self.book.title)}</dc:title>\n'
+            f'{author}'
+            '<dc:language>en</dc:language>\n'
+            f'<meta property="dcterms:modified">{modified}</meta>\n'
+            '</metadata>\n'
+            '<manifest>\n'
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+            f'{manifest}\n'
+            '</manifest>\n'
+            f'<spine>\n{spine}\n</spine>\n'
+            '</package>\n'
+        )
+
+    @staticmethod
+    def _xhtml(title: str, body: str) -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<!DOCTYPE html>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">\n'
+            f'<head><title>{title}</title></head>\n'
+            f'<body>\n{body}\n</body>\n'
+            '</html>\n'
+        )
+
+EXPORTERS: Dict[str, Type[Exporter]] = {
+    TextExporter.extension: TextExporter,
+    EpubExporter.extension: EpubExporter,
+}
+
+def export_chapters(chapters: Iterable[Tuple[int, str]], exporters: List[Exporter]) -> Dict[str, Path]:
+    """
+    Feed each chapter to every exporter in a single pass over the chapters,
+    splitting it into blocks only once.
+
+    Returns the written file per extension. On error every partial file is
+    discarded and the previous exports are left untouched.
+    """
+    for exporter in exporters:
+        exporter.open()
+    try:
+        for chapter_number, content in chapters:
+            title, paragraphs = chapter_blocks(chapter_number, content)
+            for exporter in exporters:
+                exporter.write_chapter(chapter_number, title, paragraphs)
+    except BaseException:
+        for exporter in exporters:
+            exporter.abort()
+        raise
+    return {exporter.extension: exporter.close() for exporter in exporters}
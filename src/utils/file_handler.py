@@ -1,7 +1,21 @@
 from pathlib import Path
-from typing import List, Optional
-import pickle
+from typing import BinaryIO, Dict, Iterable, List, Optional
+import os
 from src.models.book import Book
+from src.utils.catalog import Catalog
+from src.utils.chapter_index import ChapterIndex
+from src.utils.chapter_list import ChapterList
+from src.utils.chapter_pack import ChapterPack
+from src.utils.exporters import EXPORTERS, export_chapters
+from src.utils.journal import ChapterJournal
+from src.utils.log import get_logger
+from src.utils.search_index import SearchIndex
+
+logger = get_logger(__name__)
+
+HTML_HEADER = b"<html>\n<body>\n"
+HTML_FOOTER = b"</body>\n</html>"
+CHAPTER_SEPARATOR = b"\n<hr>\n"
 
 class FileHandler:
     """Handles file operations for the book scraper."""
@@ -9,67 +23,220 @@ class FileHandler:
     def __init__(self, base_path: Path):
         self.base_path = Path(base_path)
         self.books_file = self.base_path / 'books.pkl'
+        self.catalog_file = self.base_path / 'library.db'
+        self.search_index_file = self.base_path / 'search.db'
+        self.chapter_index_file = self.base_path / 'chapters.db'
         self.base_path.mkdir(parents=True, exist_ok=True)
+        self._catalog: Optional[Catalog] = None
+        self._search_index: Optional[SearchIndex] = None
+        self._chapter_index: Optional[ChapterIndex] = None
+        self._packs: Dict[str, ChapterPack] = {}
     
-    def save_books(self, books: List[Book]) -> None:
-        """Save books list to pickle file."""
-        with open(self.books_file, 'wb') as f:
-            pickle.dump(books, f)
+    @property
+    def catalog(self) -> Catalog:
+        """The library catalog, opened (and migrated from books.pkl) on first use."""
+        if self._catalog is None:
+            self._catalog = Catalog(self.catalog_file)
+            if migrated := self._catalog.migrate_pickle(self.books_file):
+                logger.info("Migrated %d books from %s to %s", migrated, self.books_file.name, self.catalog_file.name)
+        return self._catalog
     
-    def load_books(self) -> List[Book]:
-        """Load books list from pickle file."""
-        if not self.books_file.exists():
-            return []
-        
-        try:
-            with open(self.books_file, 'rb') as f:
-                return pickle.load(f)
-        except Exception as e:
-            print(f"Error loading books: {str(e)}")
-            return []
+    @property
+    def search_index(self) -> SearchIndex:
+        """Full-text index of every novel seen in search and hot-list results, opened on first use."""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.search_index_file)
+        return self._search_index
+    
+    @property
+    def chapter_index(self) -> ChapterIndex:
+        """Full-text index of downloaded chapter text, opened on first use."""
+        if self._chapter_index is None:
+            self._chapter_index = ChapterIndex(self.chapter_index_file, read_chapter=self._read_chapter)
+        return self._chapter_index
+    
+    def get_book(self, formatted_title: str) -> Optional[Book]:
+        """Look up a single book by its formatted title."""
+        return self.catalog.get(formatted_title)
+    
+    def save_book(self, book: Book) -> None:
+        """Insert or update a single book in the catalog."""
+        self.catalog.upsert(book)
+    
+    def save_books(self, books: List[Book], keep_chapters: bool = False) -> None:
+        """Insert or update books in one transaction (keep_chapters: only refresh metadata)."""
+        self.catalog.upsert_many(books, keep_chapters=keep_chapters)
+    
+    def load_books(self, order: str = 'title') -> List[Book]:
+        """Load every book in the catalog."""
+        return self.catalog.books(order)
+    
+    def close(self) -> None:
+        if self._catalog is not None:
+            self._catalog.close()
+            self._catalog = None
+        if self._search_index is not None:
+            self._search_index.close()
+            self._search_index = None
+        if self._chapter_index is not None:
+            self._chapter_index.close()
+            self._chapter_index = None
+        for pack in self._packs.values():
+            pack.close()
+        self._packs.clear()
+    
+    def open_journal(self, book: Book) -> ChapterJournal:
+        """Open the per-book chapter journal used to resume interrupted downloads."""
+        return ChapterJournal(self.base_path / book.formatted_title / 'journal.jsonl')
+    
+    def load_chapter_list(self, book: Book) -> Optional[ChapterList]:
+        """The book's cached table of contents, if it has been fetched before."""
+        return ChapterList.load(self.base_path / book.formatted_title / 'toc.json')
+    
+    def save_chapter_list(self, book: Book, chapter_list: ChapterList) -> None:
+        """Cache the book's table of contents next to its chapters."""
+        chapter_list.save(self.base_path / book.formatted_title / 'toc.json')
+    
+    def open_pack(self, book: Book) -> ChapterPack:
+        """The book's packed chapter store, kept open until close()."""
+        return self._open_pack(book.formatted_title)
     
     def save_chapter(self, book: Book, chapter_number: int, content: str) -> bool:
-        """Save chapter content to file."""
-        chapter_dir = self.base_path / book.formatted_title
-        chapter_dir.mkdir(parents=True, exist_ok=True)
-        
+        """Append chapter content to the book's pack and add it to the chapter full-text index."""
         try:
-            chapter_file = chapter_dir / f'chapter_{chapter_number}.html'
-            chapter_file.write_text(content)
-            return True
-        except Exception as e:
-            print(f"Error saving chapter {chapter_number}: {str(e)}")
+            pack = self.open_pack(book)
+            previous = pack.read(chapter_number) if chapter_number in pack else None
+            changed = pack.append(chapter_number, content)
+        except Exception:
+            logger.exception("Error saving %s chapter %d", book.formatted_title, chapter_number)
             return False
+        
+        if changed:
+            try:
+                self.chapter_index.add(book.formatted_title, chapter_number, content, previous)
+            except Exception as e:
+                # The chapter itself is safely stored; only searchability is lost
+                logger.warning("Error indexing %s chapter %d: %s", book.formatted_title, chapter_number, e)
+        return True
+    
+    def flush_index(self) -> None:
+        """Commit chapter index updates still batched up, e.g. once a book is done."""
+        if self._chapter_index is not None:
+            self._chapter_index.flush()
+    
+    def read_chapter(self, book: Book, chapter_number: int) -> Optional[str]:
+        """Content of a stored chapter, from the pack or a legacy chapter file."""
+        return self._read_chapter(book.formatted_title, chapter_number)
     
     def combine_chapters(self, book: Book, start: int, end: int) -> Optional[Path]:
-        """Combine chapter files into a single HTML file."""
+        """
+        Append stored chapters to the book's combined HTML file.
+        
+        Chapters are read from the pack one at a time, so memory use does not grow
+        with the book. Only chapters not yet exported are appended, inserted before
+        the file's closing tags instead of rewriting it. If one of them belongs
+        before a chapter already in the file (a gap filled late, or a chapter whose
+        text changed), the file is rebuilt from the pack in chapter order instead.
+        Loose chapter files left by older versions are moved into the pack first.
+        """
         chapter_dir = self.base_path / book.formatted_title
         if not chapter_dir.exists():
             return None
         
+        pack = self.open_pack(book)
+        output_file = book.html_path
         try:
-            combined_content = ["<html>", "<body>"]
-            
-            for chapter_num in range(start, end + 1):
-                chapter_file = chapter_dir / f'chapter_{chapter_num}.html'
-                if chapter_file.exists():
-                    content = chapter_file.read_text()
-                    combined_content.append(content)
-                    combined_content.append("<hr>")
-            
-            combined_content.extend(["</body>", "</html>"])
+            self._pack_loose_chapters(book, pack, start, end)
+            pending = pack.pending_export(start, end)
+            if not pending:
+                return output_file if output_file.exists() else None
             
-            output_file = book.html_path
-            output_file.write_text("\n".join(combined_content))
-            
-            # Clean up individual chapter files
-            for chapter_num in range(start, end + 1):
-                chapter_file = chapter_dir / f'chapter_{chapter_num}.html'
-                if chapter_file.exists():
-                    chapter_file.unlink()
+            exported = pack.exported()
+            if exported and (pending[0] < exported[-1] or not output_file.exists()):
+                self._rebuild_combined(output_file, pack, sorted(set(exported) | set(pending)))
+            else:
+                with self._open_combined(output_file) as out:
+                    self._write_chapters(out, pack, pending)
+                    out.write(HTML_FOOTER)
+                    out.truncate()
+            pack.mark_exported(pending)
             
             return output_file
             
-        except Exception as e:
-            print(f"Error combining chapters: {str(e)}")
+        except Exception:
+            logger.exception("Error combining chapters of %s", book.formatted_title)
             return None
+    
+    def export_book(self, book: Book, formats: Iterable[str]) -> Dict[str, Path]:
+        """
+        Write every stored chapter of a book to each of formats (see EXPORTERS).
+        
+        The chapters are read from the pack once, in order, and streamed to all
+        exporters together.
+        """
+        pack = self.open_pack(book)
+        try:
+            exporters = [EXPORTERS[fmt](book) for fmt in formats]
+            if not exporters:
+                return {}
+            return export_chapters(pack.iter_chapters(pack.chapters()), exporters)
+        except Exception:
+            logger.exception("Error exporting %s", book.formatted_title)
+            return {}
+    
+    def _open_pack(self, slug: str) -> ChapterPack:
+        pack = self._packs.get(slug)
+        if pack is None:
+            pack = ChapterPack(self.base_path / slug)
+            self._packs[slug] = pack
+        return pack
+    
+    def _read_chapter(self, slug: str, chapter_number: int) -> Optional[str]:
+        content = self._open_pack(slug).read(chapter_number)
+        if content is None:
+            chapter_file = self.base_path / slug / f'chapter_{chapter_number}.html'
+            if chapter_file.exists():
+                content = chapter_file.read_text()
+        return content
+    
+    def _pack_loose_chapters(self, book: Book, pack: ChapterPack, start: int, end: int) -> None:
+        """Move legacy chapter_N.html files in [start, end] into the pack."""
+        chapter_dir = self.base_path / book.formatted_title
+        for chapter_number in range(start, end + 1):
+            chapter_file = chapter_dir / f'chapter_{chapter_number}.html'
+            if chapter_file.exists():
+                # A packed copy is always the newer download
+                if chapter_number not in pack:
+                    pack.append(chapter_number, chapter_file.read_text())
+                chapter_file.unlink()
+    
+    def _write_chapters(self, out: BinaryIO, pack: ChapterPack, chapter_numbers: List[int]) -> None:
+        for _, content in pack.iter_chapters(chapter_numbers):
+            out.write(content.encode('utf-8'))
+            out.write(CHAPTER_SEPARATOR)
+    
+    def _rebuild_combined(self, output_file: Path, pack: ChapterPack, chapter_numbers: List[int]) -> None:
+        """Rewrite the combined file with chapter_numbers in order, replacing it atomically."""
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = output_file.with_name(output_file.name + '.tmp')
+        with open(tmp_file, 'wb') as out:
+            out.write(HTML_HEADER)
+            self._write_chapters(out, pack, chapter_numbers)
+            out.write(HTML_FOOTER)
+        os.replace(tmp_file, output_file)
+    
+    def _open_combined(self, output_file: Path) -> BinaryIO:
+        """Open the combined file positioned where the next chapter should go."""
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        if not output_file.exists():
+            out = open(output_file, 'wb')
+            out.write(HTML_HEADER)
+            return out
+        
+        out = open(output_file, 'r+b')
+        size = out.seek(0, os.SEEK_END)
+        if size >= len(HTML_FOOTER):
+            out.seek(size - len(HTML_FOOTER))
+            if out.read(len(HTML_FOOTER)) == HTML_FOOTER:
+                out.seek(size - len(HTML_FOOTER))
+        return out
@@ -1,35 +1,201 @@
-from typing import Optional
+from typing import Callable, Optional
+from dataclasses import dataclass
+import threading
+import time
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.utils.rate_limiter import RateLimiter
+from src.utils.retry import RetryPolicy
+from src.utils.http_cache import HTTPCache
+from src.utils.log import get_logger
+from src.utils.metrics import Metrics
+
+logger = get_logger(__name__)
+
+@dataclass
+class FetchResponse:
+    """Outcome of a single HTTP request."""
+    url: str
+    status: Optional[int]
+    text: Optional[str]
+    error: Optional[str] = None
+    from_cache: bool = False  # Body served from the HTTP cache (fresh or revalidated)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.text is not None
+
+@dataclass
+class FetcherStats:
+    """Snapshot of request and connection counters for an HTMLFetcher."""
+    requests: int = 0
+    connections_opened: int = 0
+
+    @property
+    def connections_reused(self) -> int:
+        """Requests that were served over an already open keep-alive connection."""
+        return max(self.requests - self.connections_opened, 0)
+
+class _CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every new TCP/TLS connection."""
+
+    def __init__(self, on_new_connection: Callable[[], None], **kwargs):
+        self._on_new_connection = on_new_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_new_connection = self._on_new_connection
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
 
 class HTMLFetcher:
-    """Handles HTTP requests with retry logic and proper error handling."""
-    
-    def __init__(self, timeout: int = 10, max_retries: int = 3):
+    """
+    Handles HTTP requests with retry logic and proper error handling.
+
+    get() performs exactly one request; fetch() applies the retry policy. There
+    are no transport-level retries, so the policy is the only place a request is
+    repeated.
+
+    A single fetcher is meant to be long-lived and shared between threads: the
+    underlying session keeps one keep-alive pool per host, so DNS lookups and
+    TCP/TLS handshakes are paid once per connection instead of once per request.
+    """
+
+    def __init__(
+        self,
+        timeout: int = 10,
+        retry_policy: Optional[RetryPolicy] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        http_cache: Optional[HTTPCache] = None,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        Args:
+            timeout: Request timeout in seconds
+            retry_policy: Policy used by fetch() (default: RetryPolicy())
+            pool_connections: Number of per-host pools kept alive
+            pool_maxsize: Maximum open connections per host
+            pool_block: Wait for a free connection instead of opening extra,
+                non-reusable ones once a host has pool_maxsize connections
+            rate_limiter: Per-host limiter consulted before every request
+            http_cache: Response cache used for conditional (ETag/Last-Modified) requests
+            metrics: Receives fetch timings, status codes and bytes received
+        """
         self.session = requests.Session()
-        retry_strategy = Retry(
-            total=max_retries,
-            backoff_factor=1,
-            status_forcelist=[500, 502, 503, 504],
+        self._stats = FetcherStats()
+        self._stats_lock = threading.Lock()
+        self.rate_limiter = rate_limiter
+        self.http_cache = http_cache
+        self.metrics = metrics or Metrics()
+        self.retry_policy = retry_policy or RetryPolicy()
+        adapter = _CountingHTTPAdapter(
+            self._count_connection,
+            max_retries=0,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         self.timeout = timeout
-    
+
     def fetch(self, url: str) -> Optional[str]:
-        """Fetch HTML content from URL with error handling."""
+        """Fetch HTML content from URL, retrying transient failures per the retry policy."""
+        attempts = 0
+        while True:
+            response = self.get(url)
+            attempts += 1
+            if response.ok:
+                return response.text
+            if not (self.retry_policy.is_retryable(response.status)
+                    and self.retry_policy.should_retry(attempts)):
+                logger.warning("Error fetching %s: %s", url, response.error)
+                return None
+            self.metrics.inc('retries')
+            time.sleep(self.retry_policy.delay(attempts))
+    
+    def get(self, url: str) -> FetchResponse:
+        """Perform a single GET request without retrying, revalidating cached copies."""
+        cached = self.http_cache.get(url) if self.http_cache else None
+        if cached and self.http_cache.is_fresh(cached):
+            self.metrics.inc('http_cache_hits')
+            return FetchResponse(url=url, status=200, text=cached.body, from_cache=True)
+        
+        if self.rate_limiter:
+            with self.metrics.time('rate_limit_wait'):
+                self.rate_limiter.acquire(url)
+        with self._stats_lock:
+            self._stats.requests += 1
         try:
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            return response.text
+            with self.metrics.time('fetch'):
+                response = self.session.get(
+                    url,
+                    timeout=self.timeout,
+                    headers=HTTPCache.conditional_headers(cached)
+                )
         except requests.RequestException as e:
-            print(f"Error fetching {url}: {str(e)}")
-            return None
-    
+            self.metrics.record_status(None)
+            return FetchResponse(url=url, status=None, text=None, error=str(e))
+        
+        self.metrics.record_status(response.status_code)
+        self.metrics.inc('bytes_received', len(response.content))
+        if self.rate_limiter:
+            self.rate_limiter.record(url, response.status_code, response.headers.get('Retry-After'))
+        if response.status_code == 304 and cached:
+            self.metrics.inc('http_cache_revalidated')
+            self.http_cache.refresh(url)
+            return FetchResponse(url=url, status=304, text=cached.body, from_cache=True)
+        try:
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            return FetchResponse(url=url, status=response.status_code, text=None, error=str(e))
+        
+        if self.http_cache:
+            self.http_cache.store(
+                url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified')
+            )
+        return FetchResponse(url=url, status=response.status_code, text=response.text)
+
+    @property
+    def stats(self) -> FetcherStats:
+        """Return a snapshot of the request and connection counters."""
+        with self._stats_lock:
+            return FetcherStats(
+                requests=self._stats.requests,
+                connections_opened=self._stats.connections_opened
+            )
+
+    def _count_connection(self) -> None:
+        with self._stats_lock:
+            self._stats.connections_opened += 1
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
+        if self.http_cache:
+            self.http_cache.close()
+
     def __enter__(self):
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.session.close()
+        self.close()
@@ -0,0 +1,192 @@
+from typing import Dict, Optional
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+@dataclass
+class CachedResponse:
+    """A stored response body together with its HTTP validators."""
+    url: str
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+class HTTPCache:
+    """
+    On-disk HTTP response cache keyed by URL, with conditional revalidation.
+
+    Bodies are zlib-compressed into one file each (sharded by hash prefix) and
+    written atomically; an SQLite index keeps validators, sizes and access times
+    so the least recently used bodies are evicted once max_bytes is exceeded.
+    The index is opened on first use, so commands that never fetch a page do
+    not pay for it.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 512 * 1024 * 1024, ttl: int = 0):
+        """
+        Initialize cache.
+
+        Args:
+            cache_dir: Directory to store bodies and the index
+            max_bytes: Size cap for stored (compressed) bodies
+            ttl: Seconds a response is served without revalidation (0 = always revalidate)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the stored response for url, if any, and mark it recently used."""
+        key = self._key(url)
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                'SELECT etag, last_modified, stored_at FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            if not row:
+                return None
+            db.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            db.commit()
+
+        try:
+            body = zlib.decompress(self._body_path(key).read_bytes()).decode('utf-8')
+        except (OSError, zlib.error, UnicodeDecodeError):
+            # Evicted concurrently or damaged on disk
+            with self._lock:
+                self._delete(key)
+                self._db.commit()
+            return None
+        return CachedResponse(url=url, body=body, etag=row[0], last_modified=row[1], stored_at=row[2])
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        """Whether entry can be served without asking the server."""
+        return self.ttl > 0 and time.time() - entry.stored_at < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CachedResponse]) -> Dict[str, str]:
+        """Request headers that let the server answer 304 Not Modified."""
+        headers = {}
+        if entry and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Store a 200 response. Responses without validators are only kept when a TTL is set."""
+        if not (etag or last_modified or self.ttl):
+            return
+        key = self._key(url)
+        data = zlib.compress(body.encode('utf-8'))
+        if len(data) > self.max_bytes:
+            return
+        body_path = self._body_path(key)
+        body_path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=body_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, body_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            old = db.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, url, etag, last_modified, len(data), now, now)
+            )
+            self._total_bytes += len(data) - (old[0] if old else 0)
+            self._evict()
+            db.commit()
+
+    def refresh(self, url: str) -> None:
+        """Record a successful revalidation (304) so the TTL starts over."""
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                'UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?',
+                (now, now, self._key(url))
+            )
+            db.commit()
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            db = self._connect()
+            for (key,) in db.execute('SELECT key FROM entries').fetchall():
+                self._delete(key)
+            db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            self._connect()
+            return self._total_bytes
+
+    def _connect(self) -> sqlite3.Connection:
+        """The index, opened and its size summed on first use; call with _lock held."""
+        if self._db is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.cache_dir / 'index.db'), check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' key TEXT PRIMARY KEY, url TEXT NOT NULL, etag TEXT, last_modified TEXT,'
+                ' size INTEGER NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+            db.commit()
+            self._total_bytes = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            self._db = db
+        return self._db
+
+    def _evict(self) -> None:
+        """Drop least recently used bodies until the cache fits in max_bytes."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._db.execute(
+                'SELECT key FROM entries ORDER BY accessed_at LIMIT 64'
+            ).fetchall()
+            if not rows:
+                break
+            for (key,) in rows:
+                self._delete(key)
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def _delete(self, key: str) -> None:
+        row = self._db.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+        if row:
+            self._total_bytes -= row[0]
+        self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+        try:
+            self._body_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.z"
@@ -0,0 +1,115 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+import json
+import os
+import threading
+import time
+
+FETCHED = 'fetched'      # Page arrived but did not pass validation
+VALIDATED = 'validated'  # Page downloaded and validated, not yet on disk
+STORED = 'stored'        # Chapter content persisted
+FAILED = 'failed'        # No usable page after all attempts
+
+STATES = (FETCHED, VALIDATED, STORED, FAILED)
+
+class ChapterJournal:
+    """
+    Append-only per-book log of chapter states.
+
+    Each line is a JSON record and the last record for a chapter wins, so a crash
+    can at worst lose the line being written. Loading a 5,000-chapter journal is a
+    single sequential read.
+    """
+
+    def __init__(self, path: Path, compact_ratio: int = 4):
+        """
+        Args:
+            path: Journal file, created on first write
+            compact_ratio: Rewrite the file on open once it holds this many
+                records per chapter
+        """
+        self.path = Path(path)
+        self._states: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._needs_newline = False
+        records = self._load()
+        if self._states and records > compact_ratio * len(self._states):
+            self.compact()
+
+    def record(self, chapter_number: int, state: str, error: Optional[str] = None) -> None:
+        """Append a state change for a chapter."""
+        if state not in STATES:
+            raise ValueError(f"Unknown chapter state: {state}")
+        entry = {'chapter': chapter_number, 'state': state, 'ts': round(time.time(), 3)}
+        if error:
+            entry['error'] = error
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if self._needs_newline:
+                    self._file.write('\n')
+                    self._needs_newline = False
+            self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+            self._states[chapter_number] = state
+
+    def state(self, chapter_number: int) -> Optional[str]:
+        """Latest recorded state for a chapter, or None if never seen."""
+        return self._states.get(chapter_number)
+
+    def stored(self) -> Set[int]:
+        """Chapters whose content has been persisted."""
+        return {n for n, state in self._states.items() if state == STORED}
+
+    def missing(self, chapter_numbers: Iterable[int]) -> List[int]:
+        """Chapters from chapter_numbers that are not stored yet."""
+        return [n for n in chapter_numbers if self._states.get(n) != STORED]
+
+    def compact(self) -> None:
+        """Rewrite the journal with only the latest state of each chapter."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for chapter_number in sorted(self._states):
+                    f.write(json.dumps({'chapter': chapter_number, 'state': self._states[chapter_number]}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._needs_newline = False
+
+    def close(self) -> None:
+        """Flush the journal to stable storage and close it."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def _load(self) -> int:
+        """Replay the journal; returns the number of records read."""
+        if not self.path.exists():
+            return 0
+        records = 0
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                self._needs_newline = not line.endswith('\n')
+                try:
+                    entry = json.loads(line)
+                    self._states[int(entry['chapter'])] = entry['state']
+                    records += 1
+                except (ValueError, KeyError, TypeError):
+                    # A torn final line from an interrupted write
+                    continue
+        return records
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,268 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+PENDING = 'pending'  # Waiting for a worker
+LEASED = 'leased'    # Claimed by a worker until the lease expires
+DONE = 'done'        # Downloaded and validated; content waits to be collected
+FAILED = 'failed'    # Gave up on the chapter
+
+@dataclass
+class QueueJob:
+    """A book download split into chapter leases."""
+    id: int
+    book: str  # Book slug in the owner's library
+    start: int
+    end: int
+    formats: Tuple[str, ...]
+    finished: bool = False  # Collected and combined into the owner's library
+
+@dataclass
+class Lease:
+    """One chapter claimed by a worker until expires."""
+    id: int
+    job: int
+    chapter_number: int
+    url: str
+    attempts: int
+    expires: float
+
+class LeaseQueue(ABC):
+    """
+    Shared queue of chapter leases, the meeting point of a coordinator and its workers.
+
+    A coordinator adds jobs; workers claim leases, and report each chapter as
+    complete or failed before its lease expires; leases of workers that vanish
+    are handed out again once they expire. Completed chapters wait in the queue
+    until the coordinator collects them into its library.
+    """
+
+    @abstractmethod
+    def add_job(self, book: str, start: int, end: int, formats: Sequence[str],
+                chapters: Iterable[Tuple[int, str]]) -> int:
+        """Queue (chapter_number, url) pairs for a book; returns the job id."""
+
+    @abstractmethod
+    def claim(self, worker: str, limit: int, lease_seconds: float) -> List[Lease]:
+        """Lease up to limit chapters, pending ones and expired leases alike."""
+
+    @abstractmethod
+    def renew(self, worker: str, lease_ids: Iterable[int], lease_seconds: float) -> None:
+        """Extend leases the worker still holds."""
+
+    @abstractmethod
+    def complete(self, lease_id: int, content: str) -> bool:
+        """
+        Store a chapter's content; False if it was already completed by another worker.
+
+        Accepted even after the lease expired and went to another worker, as the
+        content is just as good; the first completion wins.
+        """
+
+    @abstractmethod
+    def fail(self, worker: str, lease_id: int, error: str, retryable: bool = True) -> None:
+        """
+        Give a lease the worker holds back; it is retried by any worker unless it
+        is out of attempts. Ignored once the lease has passed to another worker.
+        """
+
+    @abstractmethod
+    def results(self, job_id: int, limit: int = 500) -> List[Tuple[int, int, str]]:
+        """Completed, uncollected (lease_id, chapter_number, content) of a job."""
+
+    @abstractmethod
+    def mark_collected(self, lease_ids: Iterable[int]) -> None:
+        """Drop the content of collected chapters from the queue."""
+
+    @abstractmethod
+    def jobs(self, unfinished: bool = True) -> List[QueueJob]:
+        """Queued jobs, oldest first."""
+
+    @abstractmethod
+    def finish_job(self, job_id: int) -> None:
+        """Mark a job as collected in full."""
+
+    @abstractmethod
+    def progress(self, job_id: Optional[int] = None) -> Dict[str, int]:
+        """Chapter count per state, for one job or the whole queue."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release the backend connection."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+class SQLiteLeaseQueue(LeaseQueue):
+    """
+    LeaseQueue in a single SQLite file, which may live on storage shared by all nodes.
+
+    Claims run in an immediate (write-locked) transaction, so two workers can
+    never lease the same chapter. The rollback journal is used instead of WAL,
+    since WAL needs shared memory that network filesystems do not provide.
+    Content is stored zlib-compressed.
+    """
+
+    def __init__(self, db_path: Path, max_attempts: int = 3, busy_timeout: float = 30.0):
+        """
+        Args:
+            db_path: Queue file, created if missing
+            max_attempts: Leases per chapter (failed or expired) before it is given up
+            busy_timeout: Seconds to wait for another node's write lock
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            str(self.db_path), timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute('PRAGMA journal_mode=DELETE')
+        with self._transaction():
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id INTEGER PRIMARY KEY, book TEXT NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL,'
+                ' formats TEXT NOT NULL, finished INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL)'
+            )
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS leases ('
+                ' id INTEGER PRIMARY KEY, job INTEGER NOT NULL REFERENCES jobs (id),'
+                ' chapter INTEGER NOT NULL, url TEXT NOT NULL,'
+                f" state TEXT NOT NULL DEFAULT '{PENDING}', owner TEXT, expires REAL,"
+                ' attempts INTEGER NOT NULL DEFAULT 0, content BLOB, error TEXT,'
+                ' collected INTEGER NOT NULL DEFAULT 0, UNIQUE (job, chapter))'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS leases_state ON leases (state, expires)')
+
+    def add_job(self, book: str, start: int, end: int, formats: Sequence[str],
+                chapters: Iterable[Tuple[int, str]]) -> int:
+        with self._transaction():
+            job_id = self._db.execute(
+                'INSERT INTO jobs (book, start, end, formats, created) VALUES (?, ?, ?, ?, ?)',
+                (book, start, end, json.dumps(list(formats)), time.time())
+            ).lastrowid
+            self._db.executemany(
+                'INSERT INTO leases (job, chapter, url) VALUES (?, ?, ?)',
+                ((job_id, chapter_number, url) for chapter_number, url in chapters)
+            )
+        return job_id
+
+    def claim(self, worker: str, limit: int, lease_seconds: float) -> List[Lease]:
+        now = time.time()
+        with self._transaction():
+            # Expired leases count as an attempt; chapters that keep losing their
+            # worker are given up instead of being handed out forever
+            self._db.execute(
+                f"UPDATE leases SET state = '{FAILED}', error = 'Lease expired ' || (attempts + 1) || ' times'"
+                f" WHERE state = '{LEASED}' AND expires < ? AND attempts + 1 >= ?",
+                (now, self.max_attempts)
+            )
+            self._db.execute(
+                f"UPDATE leases SET state = '{PENDING}', attempts = attempts + 1"
+                f" WHERE state = '{LEASED}' AND expires < ?",
+                (now,)
+            )
+            rows = self._db.execute(
+                f"SELECT id, job, chapter, url, attempts FROM leases WHERE state = '{PENDING}'"
+                ' ORDER BY id LIMIT ?',
+                (limit,)
+            ).fetchall()
+            expires = now + lease_seconds
+            self._db.executemany(
+                f"UPDATE leases SET state = '{LEASED}', owner = ?, expires = ? WHERE id = ?",
+                ((worker, expires, row[0]) for row in rows)
+            )
+        return [Lease(id=row[0], job=row[1], chapter_number=row[2], url=row[3], attempts=row[4], expires=expires)
+                for row in rows]
+
+    def renew(self, worker: str, lease_ids: Iterable[int], lease_seconds: float) -> None:
+        expires = time.time() + lease_seconds
+        with self._transaction():
+            self._db.executemany(
+                f"UPDATE leases SET expires = ? WHERE id = ? AND owner = ? AND state = '{LEASED}'",
+                ((expires, lease_id, worker) for lease_id in lease_ids)
+            )
+
+    def complete(self, lease_id: int, content: str) -> bool:
+        with self._transaction():
+            cursor = self._db.execute(
+                f"UPDATE leases SET state = '{DONE}', content = ?, error = NULL, expires = NULL"
+                f" WHERE id = ? AND state != '{DONE}'",
+                (zlib.compress(content.encode('utf-8')), lease_id)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, worker: str, lease_id: int, error: str, retryable: bool = True) -> None:
+        with self._transaction():
+            self._db.execute(
+                f"UPDATE leases SET attempts = attempts + 1, error = ?, expires = NULL,"
+                f" state = CASE WHEN ? AND attempts + 1 < ? THEN '{PENDING}' ELSE '{FAILED}' END"
+                f" WHERE id = ? AND owner = ? AND state = '{LEASED}'",
+                (error, retryable, self.max_attempts, lease_id, worker)
+            )
+
+    def results(self, job_id: int, limit: int = 500) -> List[Tuple[int, int, str]]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, chapter, content FROM leases WHERE job = ? AND state = '{DONE}' AND collected = 0"
+                ' ORDER BY chapter LIMIT ?',
+                (job_id, limit)
+            ).fetchall()
+        return [(lease_id, chapter, zlib.decompress(content).decode('utf-8')) for lease_id, chapter, content in rows]
+
+    def mark_collected(self, lease_ids: Iterable[int]) -> None:
+        with self._transaction():
+            self._db.executemany(
+                'UPDATE leases SET collected = 1, content = NULL WHERE id = ?',
+                ((lease_id,) for lease_id in lease_ids)
+            )
+
+    def jobs(self, unfinished: bool = True) -> List[QueueJob]:
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT id, book, start, end, formats, finished FROM jobs'
+                + (' WHERE finished = 0' if unfinished else '') + ' ORDER BY id'
+            ).fetchall()
+        return [QueueJob(id=row[0], book=row[1], start=row[2], end=row[3],
+                         formats=tuple(json.loads(row[4])), finished=bool(row[5])) for row in rows]
+
+    def finish_job(self, job_id: int) -> None:
+        with self._transaction():
+            self._db.execute('UPDATE jobs SET finished = 1 WHERE id = ?', (job_id,))
+
+    def progress(self, job_id: Optional[int] = None) -> Dict[str, int]:
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT state, COUNT(*) FROM leases'
+                + (' WHERE job = ?' if job_id is not None else '') + ' GROUP BY state',
+                (job_id,) if job_id is not None else ()
+            ).fetchall()
+        counts.update(dict(rows))
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Serialize on the connection and hold the database write lock for the block."""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
@@ -0,0 +1,56 @@
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from queue import SimpleQueue
+from typing import Optional
+import atexit
+import logging
+
+from tqdm import tqdm
+
+LOGGER_NAME = 'bookscraper'
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+_listener: Optional[QueueListener] = None
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module, e.g. get_logger(__name__) -> 'bookscraper.core.downloader'."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name.removeprefix('src.')}")
+
+class _TqdmHandler(logging.Handler):
+    """Writes records above any active progress bar instead of through it."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            tqdm.write(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+def setup_logging(level: str = 'WARNING', log_file: Optional[Path] = None) -> None:
+    """
+    Route the package's log records through a queue to a background writer.
+
+    Worker threads only pay for putting a record on the queue; formatting and
+    I/O happen on the listener thread. Records below `level` are dropped at the
+    logger, so disabled debug logging costs a level check. Safe to call again
+    to change the level or destination.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    target = logging.FileHandler(log_file, encoding='utf-8') if log_file else _TqdmHandler()
+    target.setFormatter(logging.Formatter(LOG_FORMAT))
+    queue: SimpleQueue = SimpleQueue()
+    _listener = QueueListener(queue, target)
+    _listener.start()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [QueueHandler(queue)]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+atexit.register(_stop_listener)
@@ -0,0 +1,187 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import bisect
+import json
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _Timer:
+    """Count, sum, extremes and bucketed distribution of one stage's durations."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Last bucket is +Inf
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'mean': round(self.total / self.count, 6) if self.count else 0.0,
+            'min': round(self.min, 6) if self.count else 0.0,
+            'max': round(self.max, 6),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+class Metrics:
+    """
+    Thread-safe in-process metrics for a run.
+
+    Stage timers (fetch, validate, parse, write), counters (bytes, retries,
+    chapters), an HTTP status histogram and gauges (queue depths, with their
+    peak) are recorded by the components they are passed to, and exported as
+    JSON or Prometheus text.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._gauge_peaks: Dict[str, float] = {}
+        self._timers: Dict[str, _Timer] = {}
+        self._statuses: Dict[str, int] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+            if value > self._gauge_peaks.get(name, float('-inf')):
+                self._gauge_peaks[name] = value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = _Timer()
+            timer.observe(seconds)
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one observation of stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def record_status(self, status: Optional[int]) -> None:
+        """Count an HTTP response status (None for requests that got no response)."""
+        key = str(status) if status is not None else 'error'
+        with self._lock:
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict:
+        """All metrics as plain data."""
+        with self._lock:
+            return {
+                'started': self.started,
+                'elapsed': round(time.time() - self.started, 3),
+                'counters': dict(self._counters),
+                'gauges': {
+                    name: {'value': value, 'peak': self._gauge_peaks[name]}
+                    for name, value in self._gauges.items()
+                },
+                'timers': {name: timer.to_dict() for name, timer in self._timers.items()},
+                'http_status': dict(self._statuses),
+            }
+
+    def to_prometheus(self, prefix: str = 'bookscraper') -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                lines += [f'# TYPE {prefix}_{name}_total counter', f'{prefix}_{name}_total {value}']
+            for name, value in sorted(self._gauges.items()):
+                lines += [f'# TYPE {prefix}_{name} gauge', f'{prefix}_{name} {value}',
+                          f'# TYPE {prefix}_{name}_peak gauge', f'{prefix}_{name}_peak {self._gauge_peaks[name]}']
+            if self._statuses:
+                lines.append(f'# TYPE {prefix}_http_responses_total counter')
+                lines += [f'{prefix}_http_responses_total{{status="{status}"}} {count}'
+                          for status, count in sorted(self._statuses.items())]
+            for name, timer in sorted(self._timers.items()):
+                metric = f'{prefix}_{name}_seconds'
+                lines.append(f'# TYPE {metric} histogram')
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, timer.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {timer.count}')
+                lines += [f'{metric}_sum {timer.total}', f'{metric}_count {timer.count}']
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: Path) -> None:
+        """Write the metrics atomically; .prom files get Prometheus text, anything else JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == '.prom':
+            data = self.to_prometheus()
+        else:
+            data = json.dumps(self.snapshot(), indent=2)
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(data)
+        os.replace(tmp_path, path)
+
+class PeriodicExporter:
+    """Writes a Metrics snapshot every `interval` seconds, and once more on stop."""
+
+    def __init__(self, metrics: Metrics, path: Path, interval: float = 10.0):
+        self.metrics = metrics
+        self.path = Path(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> 'PeriodicExporter':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.metrics.write(self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.metrics.write(self.path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+import threading
+import time
+
+@dataclass
+class MirrorStats:
+    """Running record of one mirror host."""
+    health: float = 1.0  # Moving average of attempt outcomes (1 = all succeeded)
+    latency: Optional[float] = None  # Moving average of successful fetch seconds
+    successes: int = 0
+    failures: int = 0
+    updated: float = 0.0  # When health was last averaged; recovery counts from here
+
+class MirrorRouter:
+    """
+    Picks the mirror for each chapter attempt from health and latency scores.
+
+    Every attempt's outcome updates its host's moving averages. A host's score
+    is its health divided by (1 + latency in seconds), so a mirror that errors,
+    throttles or serves broken pages loses traffic, as does one that slows down.
+    The first mirror in preference order whose score is within prefer_within
+    of the best one gets the attempt, so traffic only moves off the preferred
+    site when it is clearly worse. Lost health and measured latency both fade
+    with a half-life of `recovery` seconds, so a mirror that had an outage or
+    slowed down is probed again later instead of being shunned for good; a
+    mirror never measured counts as healthy and fast.
+    """
+
+    def __init__(self, alpha: float = 0.3, recovery: float = 60.0, prefer_within: float = 0.8):
+        """
+        Args:
+            alpha: Weight of the newest outcome in the moving averages
+            recovery: Seconds for a mirror to win back half its lost health
+            prefer_within: Fraction of the best score an earlier mirror needs
+                to keep its traffic
+        """
+        self.alpha = alpha
+        self.recovery = recovery
+        self.prefer_within = prefer_within
+        self._stats: Dict[str, MirrorStats] = {}
+        self._lock = threading.Lock()
+
+    def next_url(self, urls: Sequence[str], tried: List[str]) -> str:
+        """
+        Choose the URL for a chapter's next attempt and append it to tried.
+
+        urls holds the chapter on each mirror, in preference order. Only mirrors
+        not yet tried for this chapter are candidates, until all have been tried.
+        """
+        if len(urls) == 1:
+            url = urls[0]
+        else:
+            candidates = [url for url in urls if url not in tried] or list(urls)
+            with self._lock:
+                now = time.time()
+                scores = [self._score(_host(url), now) for url in candidates]
+            best = max(scores)
+            url = next(url for url, score in zip(candidates, scores) if score >= best * self.prefer_within)
+        tried.append(url)
+        return url
+
+    @staticmethod
+    def untried(urls: Sequence[str], tried: Sequence[str]) -> bool:
+        """Whether some mirror has not been tried for this chapter yet."""
+        return any(url not in tried for url in urls)
+
+    def record(self, url: str, ok: bool, seconds: Optional[float] = None) -> None:
+        """Record an attempt's outcome; seconds is the fetch time of a successful attempt."""
+        with self._lock:
+            stats = self._stats.setdefault(_host(url), MirrorStats())
+            now = time.time()
+            # Fold in the recovery since the last update before averaging
+            stats.health = self._faded(stats.health - 1.0, stats, now) + 1.0
+            stats.health += self.alpha * ((1.0 if ok else 0.0) - stats.health)
+            if stats.latency is not None:
+                stats.latency = self._faded(stats.latency, stats, now)
+            stats.updated = now
+            if ok:
+                stats.successes += 1
+                if stats.latency is None:
+                    stats.latency = seconds
+                elif seconds is not None:
+                    stats.latency += self.alpha * (seconds - stats.latency)
+            else:
+                stats.failures += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Score, health, latency and counts per host."""
+        with self._lock:
+            now = time.time()
+            return {
+                host: {
+                    'score': round(self._score(host, now), 3),
+                    'health': round(self._faded(stats.health - 1.0, stats, now) + 1.0, 3),
+                    'latency': round(self._faded(stats.latency, stats, now), 3) if stats.latency is not None else None,
+                    'successes': stats.successes,
+                    'failures': stats.failures,
+                }
+                for host, stats in self._stats.items()
+            }
+
+    def _faded(self, value: float, stats: MirrorStats, now: float) -> float:
+        """value (a health deficit or a latency) shrunk by the time since the host's last update."""
+        return value * 0.5 ** ((now - stats.updated) / self.recovery)
+
+    def _score(self, host: str, now: float) -> float:
+        stats = self._stats.get(host)
+        if stats is None:
+            return 1.0
+        health = self._faded(stats.health - 1.0, stats, now) + 1.0
+        latency = self._faded(stats.latency, stats, now) if stats.latency is not None else 0.0
+        return health / (1.0 + latency)
+
+def _host(url: str) -> str:
+    return urlparse(url).netloc
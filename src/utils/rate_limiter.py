@@ -0,0 +1,168 @@
+from typing import Any, Dict, Optional
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from datetime import datetime, timezone
+import asyncio
+import threading
+import time
+
+THROTTLE_STATUSES = (429, 503)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class TokenBucket:
+    """
+    Token bucket whose rate adapts AIMD-style to throttling responses.
+
+    Callers reserve a token and are told how long to wait before using it, so the
+    same bucket serves threads (time.sleep) and coroutines (asyncio.sleep).
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        increase: Optional[float] = None,
+        decrease_factor: float = 0.5
+    ):
+        """
+        Args:
+            rate: Sustained requests per second (also the ceiling for recovery)
+            capacity: Burst size in tokens (default: max(1, rate))
+            min_rate: Floor for the rate after repeated throttling
+            increase: Rate added back after each successful request
+            decrease_factor: Multiplier applied to the rate on throttling
+        """
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = capacity or max(1.0, self.max_rate)
+        self.min_rate = min_rate or self.max_rate / 16
+        self.increase = increase or self.max_rate / 20
+        self.decrease_factor = decrease_factor
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cut_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return the number of seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            # _updated lies in the future while a Retry-After pause is active
+            return max(self._updated - now, 0.0) + max(-self._tokens, 0.0) / self.rate
+
+    def acquire(self) -> None:
+        """Block the calling thread until a token is available."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Suspend the calling coroutine until a token is available."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        """Additively recover the rate towards its configured ceiling."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicatively cut the rate and pause for Retry-After (or one interval)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Throttled responses to requests already in flight count as one signal
+            if now >= self._cut_until:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self._cut_until = now + 1.0 / self.rate
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, now + pause)
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+class RateLimiter:
+    """
+    Per-host token buckets configured from the sites.* section of the config.
+
+    A site name matches every host that contains it as a label, so 'novelfull'
+    covers both novelfull.com and novelfull.net; each host gets its own bucket.
+    Hosts without a configured rate are not limited unless default_rate is set.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default_rate: Optional[float] = None):
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, sites: Optional[Dict[str, Dict[str, Any]]]) -> 'RateLimiter':
+        """Build a limiter from the sites.<name>.rate_limit config keys."""
+        rates = {
+            name: float(settings['rate_limit'])
+            for name, settings in (sites or {}).items()
+            if isinstance(settings, dict) and settings.get('rate_limit')
+        }
+        return cls(rates)
+
+    def bucket_for(self, url: str) -> Optional[TokenBucket]:
+        """Return the bucket for the URL's host, creating it on first use."""
+        host = (urlparse(url).hostname or '').lower()
+        with self._lock:
+            if host not in self._buckets:
+                rate = self._rate_for_host(host)
+                self._buckets[host] = TokenBucket(rate) if rate else None
+            return self._buckets[host]
+
+    def acquire(self, url: str) -> None:
+        """Block until a request to url is allowed."""
+        bucket = self.bucket_for(url)
+        if bucket:
+            bucket.acquire()
+
+    async def acquire_async(self, url: str) -> None:
+        """Wait without blocking the event loop until a request to url is allowed."""
+        bucket = self.bucket_for(url)
+        if bucket:
+            await bucket.acquire_async()
+
+    def record(self, url: str, status: Optional[int], retry_after: Optional[str] = None) -> None:
+        """Feed a response status (and Retry-After header) back into the host's bucket."""
+        bucket = self.bucket_for(url)
+        if not bucket or status is None:
+            return
+        if status in THROTTLE_STATUSES:
+            bucket.on_throttle(parse_retry_after(retry_after))
+        elif status < 400:
+            bucket.on_success()
+
+    def _rate_for_host(self, host: str) -> Optional[float]:
+        if host in self.rates:
+            return self.rates[host]
+        labels = host.split('.')
+        for name, rate in self.rates.items():
+            if name in labels:
+                return rate
+        return self.default_rate
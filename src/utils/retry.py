@@ -0,0 +1,98 @@
+from typing import Any, List, Optional, Tuple
+from dataclasses import dataclass
+import heapq
+import itertools
+import random
+import threading
+import time
+
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+@dataclass
+class RetryPolicy:
+    """
+    The single retry policy for all HTTP work.
+
+    Transport-level retries are disabled, so max_attempts is the total number of
+    requests a URL can cost in the main pass; dead_letter_attempts are added once
+    at the end of a run for whatever is still failing.
+    """
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    jitter: float = 0.1
+    budget_ratio: float = 0.2  # Retries allowed per first attempt across a run
+    min_budget: int = 10  # Retries always allowed, even for tiny runs
+    dead_letter_attempts: int = 1
+
+    def is_retryable(self, status: Optional[int]) -> bool:
+        """Network errors (no status), throttling and server errors are worth retrying."""
+        return status is None or status in RETRYABLE_STATUSES
+
+    def should_retry(self, attempts: int) -> bool:
+        """Whether another attempt is allowed after `attempts` failed ones."""
+        return attempts < self.max_attempts
+
+    def delay(self, attempts: int) -> float:
+        """Exponential backoff with jitter before the attempt following `attempts` failures."""
+        backoff = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return backoff + random.random() * self.jitter
+
+    def new_budget(self) -> 'RetryBudget':
+        return RetryBudget(self.budget_ratio, self.min_budget)
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of first attempts, so an outage cannot multiply
+    the request volume of a run. Thread-safe.
+    """
+
+    def __init__(self, ratio: float, minimum: int):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.first_attempts = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record_attempt(self) -> None:
+        """Record a first attempt, which earns `ratio` retries."""
+        with self._lock:
+            self.first_attempts += 1
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; False when it is exhausted."""
+        with self._lock:
+            if self.retries >= self.minimum + self.ratio * self.first_attempts:
+                return False
+            self.retries += 1
+            return True
+
+class DelayQueue:
+    """Min-heap of items that become ready at a given monotonic time."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def push(self, item: Any, delay: float) -> None:
+        with self._lock:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), item))
+
+    def pop_ready(self) -> Optional[Any]:
+        """Return the earliest item whose delay has elapsed, or None."""
+        with self._lock:
+            if self._heap and self._heap[0][0] <= time.monotonic():
+                return heapq.heappop(self._heap)[2]
+            return None
+
+    def next_ready_in(self) -> Optional[float]:
+        """Seconds until the earliest item is ready (None if empty)."""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(self._heap[0][0] - time.monotonic(), 0.0)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
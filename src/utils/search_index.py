@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional
+import re
+import sqlite3
+import threading
+import time
+
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+def match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query, quoting words so none act as operators."""
+    return ' '.join(f'"{token}"*' for token in TOKEN.findall(query))
+
+@dataclass
+class SearchEntry:
+    """A novel as seen in search or hot-list results."""
+    title: str
+    url: str
+    author: Optional[str] = None
+    description: Optional[str] = None
+
+class SearchIndex:
+    """
+    Local full-text index (SQLite FTS5) of every novel seen in listings.
+
+    Entries are keyed by URL; later sightings refresh the title and fill in an
+    author or description that earlier listings lacked. Queries are ranked with
+    bm25, weighting title matches over author and description matches.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        with self._db:
+            self._db.executescript('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, title TEXT NOT NULL,
+                    author TEXT, description TEXT, seen_at REAL NOT NULL);
+                CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                    title, author, description,
+                    content='entries', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2');
+                CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                    INSERT INTO entries_fts (rowid, title, author, description)
+                    VALUES (new.id, new.title, new.author, new.description);
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                    INSERT INTO entries_fts (entries_fts, rowid, title, author, description)
+                    VALUES ('delete', old.id, old.title, old.author, old.description);
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE ON entries BEGIN
+                    INSERT INTO entries_fts (entries_fts, rowid, title, author, description)
+                    VALUES ('delete', old.id, old.title, old.author, old.description);
+                    INSERT INTO entries_fts (rowid, title, author, description)
+                    VALUES (new.id, new.title, new.author, new.description);
+                END;
+            ''')
+
+    def add(self, entries: Iterable[SearchEntry]) -> None:
+        """Insert or refresh entries in one transaction."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT INTO entries (url, title, author, description, seen_at) VALUES (?, ?, ?, ?, ?)'
+                ' ON CONFLICT (url) DO UPDATE SET title = excluded.title,'
+                ' author = COALESCE(excluded.author, author),'
+                ' description = COALESCE(excluded.description, description),'
+                ' seen_at = excluded.seen_at',
+                [(e.url, e.title, e.author, e.description, now) for e in entries]
+            )
+
+    def search(self, query: str, limit: int = 10) -> List[SearchEntry]:
+        """Ranked lookup; every word of query must match (as a prefix) somewhere."""
+        match = match_expression(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT e.title, e.url, e.author, e.description'
+                ' FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid'
+                ' WHERE entries_fts MATCH ?'
+                ' ORDER BY bm25(entries_fts, 10.0, 5.0, 1.0) LIMIT ?',
+                (match, limit)
+            ).fetchall()
+        return [SearchEntry(*row) for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
@@ -9,6 +9,7 @@ class URLBuilder:
         self.templates: Dict[str, str] = {
             'novelfull': "https://novelfull.com/{book_name}/chapter-{chapter_number}.html",
             'novelusb': "https://novelusb.com/novel-book/{book_name}/chapter-{chapter_number}",
+            'book': "https://novelfull.com/{book_name}.html?page={page}",
             'search': "https://novelfull.net/search?keyword={search_term}",
             'hot_novels': "https://novelfull.net/hot-novel?page={page}"
         }
@@ -28,6 +29,10 @@ class URLBuilder:
             raise ValueError(f"No URL template found for site: {site}")
         return template.format(book_name=book_name, chapter_number=chapter_number)
     
+    def get_book_url(self, book_name: str, page: int = 1) -> str:
+        """Generate URL for a page of a book's chapter list."""
+        return self.templates['book'].format(book_name=book_name, page=page)
+    
     def get_search_url(self, search_term: str) -> str:
         """Generate search URL."""
         return self.templates['search'].format(search_term=search_term.replace(' ', '%20'))
@@ -32,12 +32,24 @@ class ContentValidator:
             content: Raw HTML content
             chapter_number: Chapter number for reference
         """
+        try:
+            soup = BeautifulSoup(content, 'lxml')
+        except Exception as e:
+            return ValidationResult(is_valid=False, errors=[f"Validation error: {str(e)}"], warnings=[])
+        return self.validate_soup(soup, chapter_number)
+    
+    def validate_soup(self, soup: BeautifulSoup, chapter_number: int) -> ValidationResult:
+        """
+        Validate an already parsed chapter page.
+        
+        Args:
+            soup: Parsed page, shared with the chapter parser to avoid a second parse
+            chapter_number: Chapter number for reference
+        """
         errors = []
         warnings = []
         
         try:
-            soup = BeautifulSoup(content, 'html.parser')
-            
             # 1. Check for chapter content div
             chapter_content = soup.find('div', id='chapter-content')
             if not chapter_content:
@@ -0,0 +1,59 @@
+"""
+Shared fixtures: fake novel sites served in-process and downloaders for both engines.
+"""
+from typing import List
+import pytest
+
+from benchmarks.fake_site import FakeSite, SiteConfig
+from src.core.async_downloader import AsyncChapterDownloader
+from src.core.downloader import ChapterDownloader, ChapterTask
+from src.utils.retry import RetryPolicy
+
+ENGINES = ('thread', 'async')
+
+def chapter_tasks(site: FakeSite, chapters, book: str = 'test-book', mirrors=()) -> List[ChapterTask]:
+    """Tasks for chapters of one book on site, optionally mirrored on other sites."""
+    return [
+        ChapterTask(n, f"{site.base_url}/{book}/chapter-{n}.html", book,
+                    tuple(f"{mirror.base_url}/{book}/chapter-{n}.html" for mirror in mirrors))
+        for n in chapters
+    ]
+
+@pytest.fixture
+def fake_site():
+    """Start a FakeSite with the given SiteConfig fields (no latency, short chapters); stopped after the test."""
+    sites = []
+
+    def start(**config) -> FakeSite:
+        config.setdefault('chapters', 20)
+        config.setdefault('paragraphs', 5)
+        config.setdefault('latency', 0.0)
+        site = FakeSite(SiteConfig(**config)).start()
+        sites.append(site)
+        return site
+
+    yield start
+    for site in sites:
+        site.stop()
+
+@pytest.fixture(params=ENGINES)
+def engine(request) -> str:
+    return request.param
+
+@pytest.fixture
+def downloader(engine):
+    """Build a downloader of the test's engine; backoffs are shortened to keep tests fast."""
+    downloaders = []
+
+    def make(workers: int = 4, retry_policy=None, **kwargs):
+        retry_policy = retry_policy or RetryPolicy(base_delay=0.01, max_delay=0.05, jitter=0.0)
+        if engine == 'async':
+            instance = AsyncChapterDownloader(max_concurrency=workers, retry_policy=retry_policy, **kwargs)
+        else:
+            instance = ChapterDownloader(max_workers=workers, chunk_size=workers, retry_policy=retry_policy, **kwargs)
+        downloaders.append(instance)
+        return instance
+
+    yield make
+    for instance in downloaders:
+        instance.close()
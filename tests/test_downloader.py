@@ -0,0 +1,96 @@
+"""
+Both download engines against the fake site: the sliding window, retries,
+the retry budget and dead letters, mirror failover and undecodable pages.
+"""
+from src.utils.mirrors import MirrorRouter
+from src.utils.retry import RetryPolicy
+from tests.conftest import chapter_tasks
+
+def chapter_requests(site) -> int:
+    return site.stats()['requests']
+
+def test_downloads_every_chapter(fake_site, downloader):
+    site = fake_site()
+    results = list(downloader().iter_tasks(chapter_tasks(site, range(1, 21))))
+
+    assert sorted(result.chapter_number for result in results) == list(range(1, 21))
+    assert all(result.error is None and result.content for result in results)
+    assert {result.book for result in results} == {'test-book'}
+    assert chapter_requests(site) == 20
+
+def test_window_pulls_tasks_lazily(fake_site, downloader):
+    site = fake_site(chapters=200)
+    pulled = 0
+
+    def tasks():
+        nonlocal pulled
+        for task in chapter_tasks(site, range(1, 201)):
+            pulled += 1
+            yield task
+
+    results = downloader(workers=4).iter_tasks(tasks())
+    next(results)
+    # In flight, plus finished results waiting for the consumer
+    assert pulled <= 3 * 4
+    results.close()
+    assert chapter_requests(site) < 200
+
+def test_retries_transient_errors(fake_site, downloader):
+    site = fake_site(error_rate=0.3, throttle_rate=0.1, retry_after=0.0, seed=1)
+    policy = RetryPolicy(max_attempts=12, base_delay=0.01, max_delay=0.05, jitter=0.0, min_budget=100)
+    results = list(downloader(retry_policy=policy).iter_tasks(chapter_tasks(site, range(1, 21))))
+
+    assert all(result.error is None for result in results)
+    assert any(result.attempts > 1 for result in results)
+    assert site.stats()['statuses'].get(500, 0) > 0
+
+def test_exhausted_chapters_get_a_dead_letter_pass(fake_site, downloader):
+    site = fake_site(error_rate=1.0)
+    policy = RetryPolicy(max_attempts=2, base_delay=0.01, jitter=0.0, dead_letter_attempts=1)
+    instance = downloader(retry_policy=policy)
+    results = list(instance.iter_tasks(chapter_tasks(site, range(1, 6))))
+
+    assert len(results) == 5
+    assert all(result.error.startswith("Failed after 3 attempts") for result in results)
+    assert all(result.attempts == 3 for result in results)
+    assert instance.metrics.counter('dead_letters') == 5
+    assert chapter_requests(site) == 15
+
+def test_retry_budget_caps_retries(fake_site, downloader):
+    site = fake_site(error_rate=1.0)
+    policy = RetryPolicy(max_attempts=5, base_delay=0.01, jitter=0.0,
+                         budget_ratio=0.0, min_budget=2, dead_letter_attempts=1)
+    results = list(downloader(retry_policy=policy).iter_tasks(chapter_tasks(site, range(1, 11))))
+
+    assert all(result.error for result in results)
+    # A first attempt and a dead-letter attempt each, plus the two retries the budget allows
+    assert chapter_requests(site) == 2 * 10 + 2
+
+def test_missing_page_is_not_retried(fake_site, downloader):
+    site = fake_site(chapters=5)
+    [result] = downloader().iter_tasks(chapter_tasks(site, [9]))
+
+    assert result.error and not result.retryable
+    assert result.attempts == 1
+    assert site.stats()['statuses'] == {404: 1}
+
+def test_fails_over_to_a_mirror(fake_site, downloader):
+    down, up = fake_site(error_rate=1.0), fake_site()
+    router = MirrorRouter()
+    instance = downloader(workers=2, router=router)
+    results = list(instance.iter_tasks(chapter_tasks(down, range(1, 21), mirrors=[up])))
+
+    assert all(result.error is None for result in results)
+    assert instance.metrics.counter('mirror_failovers') >= 1
+    # Once the primary has failed, the router sends new chapters to the mirror first
+    assert chapter_requests(down) < 20
+    assert chapter_requests(up) == 20
+    hosts = router.snapshot()
+    assert hosts[down.base_url.split('//')[1]]['failures'] == chapter_requests(down)
+
+def test_pages_that_are_not_utf8(fake_site, downloader):
+    site = fake_site(bad_byte_rate=1.0)
+    results = list(downloader().iter_tasks(chapter_tasks(site, range(1, 11))))
+
+    assert all(result.error is None for result in results)
+    assert all('\ufffd' in result.content for result in results)
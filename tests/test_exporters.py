@@ -0,0 +1,79 @@
+"""
+Whole-book exporters: chapter blocks, plain text, EPUB, and all-or-nothing writes.
+"""
+from xml.etree import ElementTree
+import zipfile
+
+import pytest
+
+from src.models.book import Book
+from src.utils.exporters import (
+    EpubExporter, TextExporter, chapter_blocks, export_chapters, plain_text, xml_text
+)
+
+CHAPTERS = [
+    (1, '<h3>Chapter 1: Tom &amp; Jerry</h3><p>It&#x27;s a &quot;test&quot;.</p><p>&lt;b&gt;</p>'),
+    (2, '<p>No heading&nbsp;here.</p>'),
+]
+
+@pytest.fixture
+def book(tmp_path):
+    return Book(title='Test Book', folder_path=tmp_path / 'test-book', author='A. Writer')
+
+def test_chapter_blocks():
+    title, paragraphs = chapter_blocks(*CHAPTERS[0])
+    assert title == 'Chapter 1: Tom &amp; Jerry'
+    assert paragraphs == ['It&#x27;s a &quot;test&quot;.', '&lt;b&gt;']
+    assert chapter_blocks(*CHAPTERS[1]) == ('Chapter 2', ['No heading&nbsp;here.'])
+    assert chapter_blocks(3, 'Just text') == ('Chapter 3', ['Just text'])
+
+def test_block_escaping():
+    assert plain_text('It&#x27;s &lt;b&gt; &amp;amp;') == "It's <b> &amp;"
+    assert plain_text('a&nbsp;b') == 'a\xa0b'
+    assert xml_text('Tom &amp; Jerry') == 'Tom &amp; Jerry'
+    assert xml_text('a&nbsp;b &lt;') == 'a\xa0b &lt;'
+
+def test_text_export(book):
+    [(_, path)] = export_chapters(CHAPTERS, [TextExporter(book)]).items()
+
+    assert path == book.export_path('txt')
+    text = path.read_text(encoding='utf-8')
+    assert text.startswith('Test Book\n')
+    assert 'Chapter 1: Tom & Jerry\n======================\n\nIt\'s a "test".\n\n<b>\n\n' in text
+    assert 'No heading\xa0here.' in text
+
+def test_epub_export(book):
+    path = export_chapters(CHAPTERS, [EpubExporter(book)])['epub']
+
+    with zipfile.ZipFile(path) as epub:
+        first = epub.infolist()[0]
+        assert (first.filename, first.compress_type) == ('mimetype', zipfile.ZIP_STORED)
+        assert epub.read('mimetype') == b'application/epub+zip'
+        # Every document must be well-formed XML
+        documents = {name: ElementTree.fromstring(epub.read(name))
+                     for name in epub.namelist() if name.endswith(('.xhtml', '.opf', '.xml'))}
+
+    assert {'OEBPS/chapter_1.xhtml', 'OEBPS/chapter_2.xhtml', 'OEBPS/nav.xhtml'} <= set(documents)
+    opf = {'opf': 'http://www.idpf.org/2007/opf', 'dc': 'http://purl.org/dc/elements/1.1/'}
+    package = documents['OEBPS/content.opf']
+    assert package.find('.//dc:title', opf).text == 'Test Book'
+    assert package.find('.//dc:creator', opf).text == 'A. Writer'
+    assert package.find(".//opf:meta[@property='dcterms:modified']", opf).text.endswith('Z')
+    assert [item.get('idref') for item in package.iterfind('.//opf:itemref', opf)] == ['c1', 'c2']
+    body = ElementTree.tostring(documents['OEBPS/chapter_1.xhtml'], encoding='unicode')
+    assert 'Tom &amp; Jerry' in body
+
+def test_failed_export_keeps_the_previous_files(book):
+    export_chapters(CHAPTERS, [TextExporter(book), EpubExporter(book)])
+    before = book.export_path('txt').read_bytes()
+
+    def chapters():
+        yield CHAPTERS[0]
+        raise IOError('pack is corrupt')
+
+    with pytest.raises(IOError):
+        export_chapters(chapters(), [TextExporter(book), EpubExporter(book)])
+    assert book.export_path('txt').read_bytes() == before
+    with zipfile.ZipFile(book.export_path('epub')) as epub:
+        assert epub.testzip() is None
+    assert sorted(p.name for p in book.folder_path.iterdir()) == ['test-book.epub', 'test-book.txt']
@@ -0,0 +1,107 @@
+"""
+The SQLite lease queue, and LeaseWorker draining it from the fake site with either engine.
+"""
+import time
+
+import pytest
+
+from src.core.lease_worker import LeaseWorker
+from src.utils.lease_queue import DONE, FAILED, LEASED, PENDING, SQLiteLeaseQueue
+from src.utils.retry import RetryPolicy
+
+@pytest.fixture
+def queue(tmp_path):
+    instance = SQLiteLeaseQueue(tmp_path / 'queue.db', max_attempts=2)
+    yield instance
+    instance.close()
+
+def add_job(queue, chapters=range(1, 6), base_url='http://127.0.0.1:9') -> int:
+    return queue.add_job('test-book', chapters.start, chapters.stop - 1, ['html'],
+                         ((n, f"{base_url}/test-book/chapter-{n}.html") for n in chapters))
+
+def test_claims_never_overlap(queue):
+    add_job(queue)
+    first = queue.claim('a', 3, 60)
+    second = queue.claim('b', 3, 60)
+
+    assert [lease.chapter_number for lease in first] == [1, 2, 3]
+    assert [lease.chapter_number for lease in second] == [4, 5]
+    assert queue.claim('c', 3, 60) == []
+    assert queue.progress() == {PENDING: 0, LEASED: 5, DONE: 0, FAILED: 0}
+
+def test_expired_leases_are_handed_out_again(queue):
+    add_job(queue, range(1, 2))
+    [lease] = queue.claim('a', 1, 0.05)
+    time.sleep(0.1)
+
+    [again] = queue.claim('b', 1, 0.05)
+    assert (again.id, again.attempts) == (lease.id, 1)
+    # Expiring as often as max_attempts gives the chapter up
+    time.sleep(0.1)
+    assert queue.claim('c', 1, 60) == []
+    assert queue.progress()[FAILED] == 1
+
+def test_renewal_keeps_a_lease(queue):
+    add_job(queue, range(1, 2))
+    [lease] = queue.claim('a', 1, 0.5)
+    time.sleep(0.3)
+    queue.renew('a', [lease.id], 0.5)
+    queue.renew('b', [lease.id], 0.0)  # Not the owner: ignored
+    time.sleep(0.3)
+
+    assert queue.claim('b', 1, 60) == []
+    assert queue.progress()[LEASED] == 1
+
+def test_only_the_owner_can_fail_a_lease(queue):
+    add_job(queue, range(1, 2))
+    [lease] = queue.claim('a', 1, 0.05)
+    time.sleep(0.1)
+    queue.claim('b', 1, 60)
+
+    # The first worker's late report must not take the lease from the second
+    queue.fail('a', lease.id, 'timed out')
+    assert queue.progress()[LEASED] == 1
+    queue.fail('b', lease.id, 'HTTP 500')
+    assert queue.progress()[FAILED] == 1
+
+def test_failed_leases_are_retried_until_out_of_attempts(queue):
+    add_job(queue, range(1, 3))
+    first, second = queue.claim('a', 2, 60)
+    queue.fail('a', first.id, 'HTTP 500', retryable=True)
+    queue.fail('a', second.id, 'HTTP 404', retryable=False)
+    assert queue.progress() == {PENDING: 1, LEASED: 0, DONE: 0, FAILED: 1}
+
+    [again] = queue.claim('a', 2, 60)
+    queue.fail('a', again.id, 'HTTP 500', retryable=True)
+    assert queue.progress()[FAILED] == 2
+
+def test_first_completion_wins(queue):
+    job = add_job(queue, range(1, 2))
+    [lease] = queue.claim('a', 1, 0.05)
+    time.sleep(0.1)
+    queue.claim('b', 1, 60)
+
+    assert queue.complete(lease.id, '<p>from b</p>')
+    assert not queue.complete(lease.id, '<p>from a, late</p>')
+    assert queue.results(job) == [(lease.id, 1, '<p>from b</p>')]
+    queue.mark_collected([lease.id])
+    assert queue.results(job) == []
+
+def test_worker_drains_the_queue(queue, fake_site, downloader):
+    site = fake_site(chapters=8)
+    job = add_job(queue, range(1, 11), site.base_url)
+    stats = LeaseWorker(queue, downloader(), batch_size=4, lease_seconds=30).run(poll_interval=0.01)
+
+    assert (stats.claimed, stats.completed, stats.failed) == (10, 8, 2)
+    assert queue.progress(job) == {PENDING: 0, LEASED: 0, DONE: 8, FAILED: 2}
+    assert [chapter for _, chapter, _ in queue.results(job)] == list(range(1, 9))
+
+def test_worker_does_not_requeue_after_local_retries(queue, fake_site, downloader):
+    site = fake_site(error_rate=1.0)
+    add_job(queue, range(1, 3), site.base_url)
+    policy = RetryPolicy(max_attempts=2, base_delay=0.01, jitter=0.0, dead_letter_attempts=1)
+    stats = LeaseWorker(queue, downloader(retry_policy=policy), lease_seconds=30).run(poll_interval=0.01)
+
+    assert (stats.claimed, stats.failed) == (2, 2)
+    assert queue.progress()[FAILED] == 2
+    assert site.stats()['requests'] == 2 * 3
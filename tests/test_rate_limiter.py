@@ -0,0 +1,99 @@
+"""
+AIMD rate limiting and mirror routing.
+"""
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+
+from src.utils.mirrors import MirrorRouter
+from src.utils.rate_limiter import RateLimiter, TokenBucket, parse_retry_after
+from src.utils.retry import RetryPolicy
+from tests.conftest import chapter_tasks
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 28 <= parse_retry_after(later) <= 30
+    assert parse_retry_after('Mon, 01 Jan 2001 00:00:00 GMT') == 0.0
+
+def test_throttling_cuts_the_rate_multiplicatively():
+    bucket = TokenBucket(rate=16, min_rate=2)
+    bucket.on_throttle()
+    assert bucket.rate == 8
+    # Responses to requests already in flight are the same signal
+    bucket.on_throttle()
+    assert bucket.rate == 8
+
+    for _ in range(4):
+        time.sleep(1.0 / bucket.rate)
+        bucket.on_throttle()
+    assert bucket.rate == 2  # The floor
+
+def test_success_recovers_the_rate_additively():
+    bucket = TokenBucket(rate=20, increase=2)
+    bucket.on_throttle()
+    assert bucket.rate == 10
+
+    bucket.on_success()
+    assert bucket.rate == 12
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 20  # The ceiling
+
+def test_bursts_then_paces():
+    bucket = TokenBucket(rate=10, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+
+def test_retry_after_pauses_the_bucket():
+    bucket = TokenBucket(rate=100)
+    bucket.on_throttle(retry_after=0.5)
+    assert bucket.reserve() >= 0.45
+
+def test_limiter_matches_sites_by_host_label():
+    limiter = RateLimiter({'novelfull': 5})
+    com, net = limiter.bucket_for('https://novelfull.com/a'), limiter.bucket_for('https://www.novelfull.net/b')
+    assert com is not net and com.rate == net.rate == 5
+    assert limiter.bucket_for('https://novelfull.com/c') is com
+    assert limiter.bucket_for('https://example.com/') is None
+    assert RateLimiter(default_rate=2).bucket_for('https://example.com/').rate == 2
+
+def test_engines_back_off_when_throttled(fake_site, downloader):
+    site = fake_site(throttle_rate=1.0, retry_after=0.0)
+    limiter = RateLimiter(default_rate=200)
+    policy = RetryPolicy(max_attempts=2, base_delay=0.01, jitter=0.0, dead_letter_attempts=0)
+    results = list(downloader(retry_policy=policy, rate_limiter=limiter).iter_tasks(chapter_tasks(site, range(1, 6))))
+
+    assert all(result.error for result in results)
+    bucket = limiter.bucket_for(site.base_url)
+    assert bucket.rate < bucket.max_rate
+
+def test_router_prefers_the_first_healthy_mirror():
+    router = MirrorRouter()
+    urls = ['http://a/1', 'http://b/1']
+    assert router.next_url(urls, []) == 'http://a/1'
+
+    router.record('http://a/1', ok=False)
+    assert router.next_url(urls, []) == 'http://b/1'
+    # Only untried mirrors are candidates, until every one has been tried
+    assert router.next_url(urls, ['http://b/1']) == 'http://a/1'
+
+def test_router_moves_off_a_slow_mirror():
+    router = MirrorRouter()
+    urls = ['http://a/1', 'http://b/1']
+    router.record('http://a/1', ok=True, seconds=2.0)
+    router.record('http://b/1', ok=True, seconds=0.1)
+    assert router.next_url(urls, []) == 'http://b/1'
+
+def test_router_probes_a_failed_mirror_again():
+    router = MirrorRouter(recovery=0.05)
+    for _ in range(3):
+        router.record('http://a/1', ok=False)
+    assert router.next_url(['http://a/1', 'http://b/1'], []) == 'http://b/1'
+
+    time.sleep(0.3)
+    assert router.next_url(['http://a/1', 'http://b/1'], []) == 'http://a/1'
@@ -0,0 +1,61 @@
+"""
+BookScraper end to end against the fake site: resuming from the journal and batch downloads.
+"""
+import pytest
+
+from benchmarks.fake_site import url_templates
+from src.core.batch import BatchJob
+from src.core.scraper import BookScraper
+from src.utils.journal import STORED
+from src.utils.retry import RetryPolicy
+
+@pytest.fixture
+def site(fake_site):
+    return fake_site(chapters=30, toc_page_size=10)
+
+@pytest.fixture
+def scraper(tmp_path, site, engine):
+    instance = BookScraper(tmp_path / 'novels', max_workers=4, engine=engine, http_cache_bytes=0,
+                           retry_policy=RetryPolicy(base_delay=0.01, jitter=0.0))
+    instance.url_builder.templates.update(url_templates(site.base_url))
+    yield instance
+    instance.close()
+
+def test_resume_fetches_only_missing_chapters(scraper, site):
+    assert scraper.download_book('test book', 1, 10).exists()
+
+    site.reset()
+    output = scraper.download_book('test book', 1, 15)
+    # The chapter list is cached, so only chapters 11-15 are requested
+    assert site.stats()['requests'] == 5
+    assert scraper.get_book('test book').chapters == list(range(1, 16))
+    html = output.read_text(encoding='utf-8')
+    assert [n for n in range(1, 16) if f"Chapter {n}:" in html] == list(range(1, 16))
+
+def test_resume_after_an_interrupted_run(scraper, site):
+    book = scraper.get_book('test book')
+    # An earlier run stored chapters 1-3 and died before saving the book
+    with scraper.file_handler.open_journal(book) as journal:
+        for n in range(1, 4):
+            scraper.file_handler.save_chapter(book, n, f"<h3>Chapter {n}: Early</h3><p>Text {n}</p>")
+            journal.record(n, STORED)
+
+    output = scraper.download_book('test book', 1, 6)
+    statuses = site.stats()['statuses']
+    assert statuses == {200: 3 + 3}  # Three chapter list pages and chapters 4-6
+    html = output.read_text(encoding='utf-8')
+    assert html.index('Chapter 1: Early') < html.index('Chapter 4:') < html.index('Chapter 6:')
+
+def test_batch_finishes_every_book(scraper, site):
+    scraper.download_book('done book', 1, 5)
+    site.reset()
+    progress = scraper.download_books([
+        BatchJob('done book', 1, 5),
+        BatchJob('first book', 1, 8, formats=('html', 'txt')),
+        BatchJob('second book', 3, 6),
+    ])
+
+    assert progress['done-book'].finished and progress['done-book'].skipped == 5
+    assert (progress['first-book'].stored, progress['second-book'].stored) == (8, 4)
+    assert all(book.finished and book.output.exists() for book in progress.values())
+    assert scraper.get_book('first book').export_path('txt').exists()
@@ -0,0 +1,211 @@
+"""
+On-disk storage: the chapter pack and its crash recovery, the journal, the
+combined HTML file and the chapter index.
+"""
+import shutil
+
+import pytest
+
+from src.models.book import Book
+from src.utils.chapter_pack import ChapterPack
+from src.utils.file_handler import HTML_FOOTER, HTML_HEADER, FileHandler
+from src.utils.journal import FAILED, STORED, VALIDATED, ChapterJournal
+
+def chapter(n: int, text: str = 'text') -> str:
+    return f"<h3>Chapter {n}</h3><p>{text} of chapter {n}</p>"
+
+def in_order(text: str, parts) -> bool:
+    positions = [text.index(part) for part in parts]
+    return positions == sorted(positions)
+
+@pytest.fixture
+def pack(tmp_path):
+    instance = ChapterPack(tmp_path / 'book')
+    yield instance
+    instance.close()
+
+@pytest.fixture
+def handler(tmp_path):
+    instance = FileHandler(tmp_path / 'novels')
+    yield instance
+    instance.close()
+
+@pytest.fixture
+def book(handler):
+    return Book(title='test-book', folder_path=handler.base_path / 'test-book')
+
+def test_pack_round_trip(tmp_path, pack):
+    for n in (3, 1, 2):
+        assert pack.append(n, chapter(n))
+    pack.close()
+
+    reopened = ChapterPack(tmp_path / 'book')
+    assert reopened.chapters() == [1, 2, 3]
+    assert reopened.read(2) == chapter(2)
+    assert reopened.read(4) is None
+    reopened.close()
+
+def test_pack_keeps_identical_content(pack):
+    pack.append(1, chapter(1))
+    pack.mark_exported([1])
+    size = pack.pack_path.stat().st_size
+
+    assert not pack.append(1, chapter(1))
+    assert pack.exported() == [1]
+    assert pack.pack_path.stat().st_size == size
+
+    assert pack.append(1, chapter(1, 'new text'))
+    assert pack.read(1) == chapter(1, 'new text')
+    assert pack.pending_export(1, 1) == [1]
+
+def test_pack_compaction_drops_superseded_blocks(tmp_path, pack):
+    for version in range(5):
+        for n in range(1, 4):
+            pack.append(n, chapter(n, f"version {version}"))
+    pack.mark_exported([1, 2])
+    size = pack.pack_path.stat().st_size
+
+    pack.compact()
+    assert pack.pack_path.stat().st_size < size / 4
+    assert [pack.read(n) for n in range(1, 4)] == [chapter(n, 'version 4') for n in range(1, 4)]
+    assert pack.exported() == [1, 2]
+    pack.append(4, chapter(4))
+    pack.close()
+
+    reopened = ChapterPack(tmp_path / 'book')
+    assert reopened.chapters() == [1, 2, 3, 4]
+    assert reopened.exported() == [1, 2]
+    reopened.close()
+
+def test_pack_ignores_a_torn_index_record(tmp_path, pack):
+    pack.append(1, chapter(1))
+    pack.append(2, chapter(2))
+    pack.close()
+    with open(pack.index_path, 'ab') as f:
+        f.write(b'\x03\x00\x00')
+
+    reopened = ChapterPack(tmp_path / 'book')
+    assert reopened.chapters() == [1, 2]
+    assert pack.index_path.stat().st_size == 2 * ChapterPack.RECORD.size
+    reopened.append(3, chapter(3))
+    reopened.close()
+    assert ChapterPack(tmp_path / 'book').chapters() == [1, 2, 3]
+
+def test_pack_ignores_records_past_the_end_of_the_pack(tmp_path, pack):
+    pack.append(1, chapter(1))
+    pack.append(2, chapter(2))
+    pack.close()
+    # The index record made it to disk, the end of the block did not
+    with open(pack.pack_path, 'r+b') as f:
+        f.truncate(pack.pack_path.stat().st_size - 1)
+
+    reopened = ChapterPack(tmp_path / 'book')
+    assert reopened.chapters() == [1]
+    reopened.close()
+
+def test_pack_recovers_from_an_interrupted_compaction(tmp_path, pack):
+    for version in range(3):
+        pack.append(1, chapter(1, f"version {version}"))
+    pack.append(2, chapter(2))
+    pack.close()
+    # Compact a copy to get the files compaction writes
+    shutil.copytree(tmp_path / 'book', tmp_path / 'copy')
+    compacted = ChapterPack(tmp_path / 'copy')
+    compacted.compact()
+    compacted.close()
+
+    # Crash before either rename: the temporary files are discarded
+    shutil.copy(compacted.pack_path, pack.pack_path.with_suffix('.pack.tmp'))
+    shutil.copy(compacted.index_path, pack.index_path.with_suffix('.idx.tmp'))
+    reopened = ChapterPack(tmp_path / 'book')
+    assert reopened.read(1) == chapter(1, 'version 2')
+    reopened.close()
+    assert not pack.pack_path.with_suffix('.pack.tmp').exists()
+    assert not pack.index_path.with_suffix('.idx.tmp').exists()
+
+    # Crash between the renames: the new pack is in place, its index is moved after it
+    shutil.copy(compacted.pack_path, pack.pack_path)
+    shutil.copy(compacted.index_path, pack.index_path.with_suffix('.idx.tmp'))
+    reopened = ChapterPack(tmp_path / 'book')
+    assert [reopened.read(n) for n in (1, 2)] == [chapter(1, 'version 2'), chapter(2)]
+    reopened.close()
+    assert not pack.index_path.with_suffix('.idx.tmp').exists()
+
+def test_journal_replays_the_latest_state(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    with ChapterJournal(path) as journal:
+        journal.record(1, VALIDATED)
+        journal.record(1, STORED)
+        journal.record(2, FAILED, 'HTTP 500')
+        journal.record(3, STORED)
+        with pytest.raises(ValueError):
+            journal.record(4, 'lost')
+
+    with ChapterJournal(path) as journal:
+        assert journal.stored() == {1, 3}
+        assert journal.state(2) == FAILED
+        assert journal.missing(range(1, 5)) == [2, 4]
+
+def test_journal_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    with ChapterJournal(path) as journal:
+        journal.record(1, STORED)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"chapter": 2, "sta')
+
+    with ChapterJournal(path) as journal:
+        assert journal.stored() == {1}
+        journal.record(3, STORED)
+    with ChapterJournal(path) as journal:
+        assert journal.stored() == {1, 3}
+
+def test_journal_compacts_on_open(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    with ChapterJournal(path) as journal:
+        for state in (VALIDATED, FAILED, VALIDATED, STORED, STORED):
+            journal.record(1, state)
+
+    with ChapterJournal(path, compact_ratio=2) as journal:
+        assert journal.stored() == {1}
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 1
+
+def test_combined_file_is_appended_to(handler, book):
+    for n in (1, 2):
+        handler.save_chapter(book, n, chapter(n))
+    handler.combine_chapters(book, 1, 10)
+    handler.save_chapter(book, 3, chapter(3))
+    output = handler.combine_chapters(book, 1, 10)
+
+    html = output.read_bytes()
+    assert html.startswith(HTML_HEADER) and html.endswith(HTML_FOOTER)
+    assert html.count(HTML_FOOTER) == 1
+    assert in_order(html.decode('utf-8'), [chapter(n) for n in (1, 2, 3)])
+
+def test_combined_file_is_rebuilt_for_out_of_order_chapters(handler, book):
+    for n in (1, 2, 4):
+        handler.save_chapter(book, n, chapter(n))
+    handler.combine_chapters(book, 1, 10)
+
+    # A gap filled late and a chapter whose text changed both belong before chapter 4
+    handler.save_chapter(book, 3, chapter(3))
+    handler.save_chapter(book, 2, chapter(2, 'corrected text'))
+    html = handler.combine_chapters(book, 1, 10).read_text(encoding='utf-8')
+
+    assert in_order(html, [chapter(1), chapter(2, 'corrected text'), chapter(3), chapter(4)])
+    assert chapter(2) not in html
+    assert html.count('</html>') == 1
+    assert not book.html_path.with_name(book.html_path.name + '.tmp').exists()
+
+def test_chapter_index_snippets_come_from_the_pack(handler, book):
+    handler.save_chapter(book, 1, '<p>The elder raised his sword.</p>')
+    handler.save_chapter(book, 2, '<p>A quiet chapter.</p>')
+    handler.flush_index()
+
+    [hit] = handler.chapter_index.search('sword')
+    assert (hit.book, hit.chapter_number) == ('test-book', 1)
+    assert 'sword' in hit.snippet
+
+    handler.save_chapter(book, 1, '<p>The elder raised his spear.</p>')
+    assert handler.chapter_index.search('sword') == []
+    assert [hit.chapter_number for hit in handler.chapter_index.search('spear')] == [1]
+    assert len(handler.chapter_index) == 2